@@ -5,6 +5,14 @@ let currentTitleTags = []; // Tags de título no modal
 let activeSeedCodes = []; // Códigos das seeds ativas (lista)
 let allSeeds = []; // Todas as seeds salvas
 
+// Índice web (gerado por scripts/indice_web.py em data/web/)
+let webIndexVersion = ''; // Versão do resumo, usada nos pedidos dos fragmentos e detalhes
+const seedResultsCache = {}; // Resultados pré-calculados das seeds (código -> Promise do ficheiro)
+let availableShards = new Set(); // Fragmentos do índice que existem
+const indexShards = {}; // Fragmentos já pedidos (chave -> Promise)
+const detailsCache = {}; // Detalhes já pedidos (id -> Promise)
+let filterRequest = 0; // Número da pesquisa mais recente (as respostas de pesquisas anteriores são ignoradas)
+
 // Variáveis para ordenação
 let currentSortColumn = null;
 let currentSortDirection = 'asc';
@@ -18,7 +26,8 @@ function loadProcedimentos() {
     error.style.display = 'none';
     tableContainer.style.display = 'none';
 
-    fetch('data/ativos.json')
+    // Apenas o resumo (colunas da tabela e campos das seeds); os detalhes são pedidos ao expandir cada linha
+    fetch('data/web/resumo.json')
         .then(response => {
             if (!response.ok) {
                 throw new Error('Arquivo não encontrado');
@@ -27,13 +36,21 @@ function loadProcedimentos() {
         })
         .then(data => {
             loading.style.display = 'none';
-            allProcedimentos = data; // Armazenar todos os procedimentos
-            filteredProcedimentos = data; // Inicialmente, mostrar todos
+            webIndexVersion = data.versao;
+            availableShards = new Set(data.fragmentos);
+            // Cada linha passa a objeto com os nomes dos campos; _pos é a posição usada no índice
+            const procedimentos = data.linhas.map((row, pos) => {
+                const proc = { _pos: pos };
+                data.campos.forEach((field, i) => { proc[field] = row[i]; });
+                return proc;
+            });
+            allProcedimentos = procedimentos; // Armazenar todos os procedimentos
+            filteredProcedimentos = procedimentos; // Inicialmente, mostrar todos
 
             // Aplicar ordenação padrão por data de publicação (mais recente primeiro)
             currentSortColumn = 'publicacao';
             currentSortDirection = 'desc';
-            const sortedProcedimentos = sortProcedimentos(data, 'publicacao', 'desc');
+            const sortedProcedimentos = sortProcedimentos(procedimentos, 'publicacao', 'desc');
 
             displayProcedimentos(sortedProcedimentos);
         })
@@ -44,43 +61,22 @@ function loadProcedimentos() {
         });
 }
 
-function filterProcedimentos() {
-    const searchTerm = document.getElementById('searchInput').value.toLowerCase().trim();
+async function filterProcedimentos() {
+    const request = ++filterRequest;
+    const searchTerm = document.getElementById('searchInput').value.trim();
 
     console.log('🔍 Filtrando procedimentos...');
     console.log('📝 Termo de pesquisa:', searchTerm);
     console.log('🌱 Seeds ativas:', activeSeedCodes);
 
-    // Primeiro filtrar por termo de pesquisa
+    // Primeiro filtrar por termo de pesquisa (no índice: todas as palavras, como início de um termo)
     let filtered = allProcedimentos;
 
     if (searchTerm !== '') {
-        filtered = allProcedimentos.filter(proc => {
-            // Criar uma string com todos os campos para pesquisa
-            const searchableText = [
-                proc.descricao || '',
-                proc.designacao_contrato || '',
-                proc.entidade || '',
-                proc.entidade_adjudicante || '',
-                proc.plataforma_eletronica || '',
-                proc.preco_base || '',
-                proc.prazo_apresentacao_propostas || '',
-                proc.nipc || '',
-                proc.distrito || '',
-                proc.concelho || '',
-                proc.freguesia || '',
-                proc.site || '',
-                proc.email || '',
-                proc.numero_procedimento || '',
-                proc.prazo_execucao || '',
-                proc.fundos_eu || '',
-                proc.autor_nome || '',
-                proc.autor_cargo || '',
-                extractPublicationDate(proc.detalhes_completos) || ''
-            ].join(' ').toLowerCase();
-
-            return searchableText.includes(searchTerm);
-        });
+        const positions = await searchIndex(searchTerm);
+        if (positions !== null) {
+            filtered = filtered.filter(proc => positions.has(proc._pos));
+        }
 
         console.log('📊 Após pesquisa por termo:', filtered.length, 'procedimentos');
     }
@@ -88,10 +84,16 @@ function filterProcedimentos() {
     // Depois filtrar por seeds ativas (deve corresponder a QUALQUER uma das seeds ativas)
     if (activeSeedCodes.length > 0) {
         const beforeSeedFilter = filtered.length;
-        filtered = filtered.filter(proc => procedureMatchesSeeds(proc));
+        const seedResults = {};
+        const sets = await Promise.all(activeSeedCodes.map(code => loadSeedResults(code)));
+        activeSeedCodes.forEach((code, i) => { seedResults[code] = sets[i]; });
+        filtered = filtered.filter(proc => procedureMatchesSeeds(proc, seedResults));
         console.log('🌱 Após filtro de seeds:', filtered.length, 'procedimentos (removidos:', beforeSeedFilter - filtered.length, ')');
     }
 
+    // Entretanto começou outra pesquisa (ex: mais uma tecla): o resultado desta já não interessa
+    if (request !== filterRequest) return;
+
     filteredProcedimentos = filtered;
 
     // Aplicar ordenação atual se existir
@@ -106,6 +108,7 @@ function filterProcedimentos() {
 }
 
 function clearSearch() {
+    filterRequest++;
     document.getElementById('searchInput').value = '';
     filteredProcedimentos = allProcedimentos;
 
@@ -142,18 +145,84 @@ function formatPrice(priceStr) {
     return priceStr.replace(/EUR/g, '€').replace(/eur/g, '€');
 }
 
-function extractPublicationDate(detalhesCompletos) {
-    if (!detalhesCompletos) return 'N/A';
+function formatPublicationDate(publicacao) {
+    // Data de envio do anúncio, já em DD/MM/YYYY no resumo
+    return publicacao || 'N/A';
+}
+
+// --- Índice de pesquisa ---
+// A normalização é a mesma de scripts/normalizacao.py: o índice guarda os termos já normalizados
+
+const PLURAL_SUFFIXES = [
+    ['oes', 'ao'], ['aes', 'ao'], ['ais', 'al'], ['eis', 'el'], ['ois', 'ol'],
+    ['res', 'r'], ['ses', 's'], ['zes', 'z'], ['ns', 'm']
+];
+const MIN_STEM_LENGTH = 4;
+
+function foldText(text) {
+    // Minúsculas sem acentos
+    return String(text).toLowerCase().normalize('NFKD').replace(/\p{M}/gu, '');
+}
+
+function stemWord(word) {
+    // Radical leve: remove o plural e a vogal final de género
+    if (word.length <= MIN_STEM_LENGTH - 1 || !/^\p{L}+$/u.test(word)) return word;
+    const plural = PLURAL_SUFFIXES.find(([suffix]) => word.endsWith(suffix) && word.length > MIN_STEM_LENGTH);
+    if (plural) {
+        word = word.slice(0, -plural[0].length) + plural[1];
+    } else if (word.endsWith('s') && !word.endsWith('ss')) {
+        word = word.slice(0, -1);
+    }
+    if (word.length > MIN_STEM_LENGTH && 'aeo'.includes(word[word.length - 1])) {
+        word = word.slice(0, -1);
+    }
+    return word;
+}
+
+function tokenizeText(text) {
+    return (foldText(text || '').match(/[\p{L}\p{N}_]+/gu) || []).map(stemWord);
+}
+
+function shardKey(term) {
+    const key = term.slice(0, 2);
+    return /^[a-z0-9]{1,2}$/.test(key) ? key : '_';
+}
 
-    // Procurar por "Data de Envio do Anúncio: DD-MM-YYYY"
-    const dateMatch = detalhesCompletos.match(/Data de Envio do Anúncio:\s*(\d{1,2}-\d{1,2}-\d{4})/);
-    if (dateMatch) {
-        const [, dateStr] = dateMatch;
-        // Converter DD-MM-YYYY para DD/MM/YYYY
-        return dateStr.replace(/-/g, '/');
+function loadShard(key) {
+    // Fragmento do índice: { termo: [posições dos procedimentos no resumo] }
+    if (!availableShards.has(key)) return Promise.resolve({});
+    if (!indexShards[key]) {
+        indexShards[key] = fetch(`data/web/indice/${key}.json?v=${webIndexVersion}`)
+            .then(response => response.ok ? response.json() : {})
+            .catch(err => {
+                console.log('Erro ao carregar fragmento do índice:', key, err);
+                delete indexShards[key];
+                return {};
+            });
     }
+    return indexShards[key];
+}
+
+function intersect(a, b) {
+    return a === null ? b : new Set([...a].filter(pos => b.has(pos)));
+}
 
-    return 'N/A';
+// Posições dos procedimentos que têm todas as palavras pesquisadas (cada uma como início de um termo)
+async function searchIndex(searchTerm) {
+    const words = tokenizeText(searchTerm);
+    const shards = await Promise.all(words.map(word => loadShard(shardKey(word))));
+    let result = null;
+    words.forEach((word, i) => {
+        const found = new Set();
+        // Uma palavra de uma letra fica sozinha no seu fragmento: só conta a correspondência exata
+        Object.entries(shards[i]).forEach(([term, positions]) => {
+            if (word.length > 1 ? term.startsWith(word) : term === word) {
+                positions.forEach(pos => found.add(pos));
+            }
+        });
+        result = intersect(result, found);
+    });
+    return result;
 }
 
 function sortProcedimentos(procedimentos, column, direction) {
@@ -176,8 +245,8 @@ function sortProcedimentos(procedimentos, column, direction) {
                 valueB = (b.plataforma_eletronica || '').toLowerCase();
                 break;
             case 'publicacao':
-                valueA = extractPublicationDate(a.detalhes_completos);
-                valueB = extractPublicationDate(b.detalhes_completos);
+                valueA = formatPublicationDate(a.publicacao);
+                valueB = formatPublicationDate(b.publicacao);
                 // Converter datas para comparação
                 if (valueA !== 'N/A' && valueB !== 'N/A') {
                     const dateA = new Date(valueA.split('/').reverse().join('-'));
@@ -264,7 +333,7 @@ function displayProcedimentos(procedimentos) {
         // Linha principal do procedimento
         const mainRow = document.createElement('tr');
         mainRow.className = 'procedure-row';
-        mainRow.onclick = () => toggleRow(index);
+        mainRow.onclick = () => toggleRow(index, proc);
 
         mainRow.innerHTML = `
             <td style="text-align: center; width: 50px;">
@@ -280,7 +349,7 @@ function displayProcedimentos(procedimentos) {
                 <div class="procedure-platform">${proc.plataforma_eletronica || 'N/A'}</div>
             </td>
             <td style="text-align: center;">
-                <div class="publication-date">${extractPublicationDate(proc.detalhes_completos)}</div>
+                <div class="publication-date">${formatPublicationDate(proc.publicacao)}</div>
             </td>
             <td style="text-align: center;">
                 <div class="deadline">${formatDeadline(proc.prazo_apresentacao_propostas)}</div>
@@ -301,81 +370,7 @@ function displayProcedimentos(procedimentos) {
         const isMobile = window.innerWidth <= 768;
         detailsCell.colSpan = isMobile ? 6 : 7;
 
-        detailsCell.innerHTML = `
-            <div class="details-grid">
-                <div class="detail-group">
-                    <h4>Informações da Entidade</h4>
-                    <div class="detail-item">
-                        <span class="detail-label">NIPC:</span>
-                        <span class="detail-value">${proc.nipc || 'N/A'}</span>
-                    </div>
-                    <div class="detail-item">
-                        <span class="detail-label">Distrito:</span>
-                        <span class="detail-value">${proc.distrito || 'N/A'}</span>
-                    </div>
-                    <div class="detail-item">
-                        <span class="detail-label">Concelho:</span>
-                        <span class="detail-value">${proc.concelho || 'N/A'}</span>
-                    </div>
-                    <div class="detail-item">
-                        <span class="detail-label">Freguesia:</span>
-                        <span class="detail-value">${proc.freguesia || 'N/A'}</span>
-                    </div>
-                    <div class="detail-item">
-                        <span class="detail-label">Site:</span>
-                        <span class="detail-value">
-                            ${proc.site ? `<a href="${proc.site}" target="_blank">${proc.site}</a>` : 'N/A'}
-                        </span>
-                    </div>
-                    <div class="detail-item">
-                        <span class="detail-label">Email:</span>
-                        <span class="detail-value">
-                            ${proc.email ? `<a href="mailto:${proc.email}">${proc.email}</a>` : 'N/A'}
-                        </span>
-                    </div>
-                </div>
-                
-                <div class="detail-group">
-                    <h4>Detalhes do Contrato</h4>
-                    <div class="detail-item">
-                        <span class="detail-label">Número:</span>
-                        <span class="detail-value">${proc.numero_procedimento || 'N/A'}</span>
-                    </div>
-                    <div class="detail-item">
-                        <span class="detail-label">Prazo de Execução:</span>
-                        <span class="detail-value">${proc.prazo_execucao || 'N/A'}</span>
-                    </div>
-                    <div class="detail-item">
-                        <span class="detail-label">Fundos EU:</span>
-                        <span class="detail-value">${proc.fundos_eu || 'N/A'}</span>
-                    </div>
-                    <div class="detail-item">
-                        <span class="detail-label">URL do Procedimento:</span>
-                        <span class="detail-value">
-                            ${proc.link ? `<a href="${proc.link}" target="_blank">Ver no DRE</a>` : 'N/A'}
-                        </span>
-                    </div>
-                </div>
-                
-                <div class="detail-group">
-                    <h4>Informações Adicionais</h4>
-                    <div class="detail-item">
-                        <span class="detail-label">Autor:</span>
-                        <span class="detail-value">${proc.autor_nome || 'N/A'}</span>
-                    </div>
-                    <div class="detail-item">
-                        <span class="detail-label">Cargo:</span>
-                        <span class="detail-value">${proc.autor_cargo || 'N/A'}</span>
-                    </div>
-                    <div class="detail-item">
-                        <span class="detail-label">URL Procedimento:</span>
-                        <span class="detail-value">
-                            ${proc.url_procedimento ? `<a href="${proc.url_procedimento}" target="_blank">Aceder</a>` : 'N/A'}
-                        </span>
-                    </div>
-                </div>
-            </div>
-        `;
+        detailsCell.innerHTML = '';
 
         detailsRow.appendChild(detailsCell);
 
@@ -389,7 +384,85 @@ function displayProcedimentos(procedimentos) {
     updateSortIndicators();
 }
 
-function toggleRow(index) {
+function renderDetails(proc) {
+    return `
+        <div class="details-grid">
+            <div class="detail-group">
+                <h4>Informações da Entidade</h4>
+                <div class="detail-item">
+                    <span class="detail-label">NIPC:</span>
+                    <span class="detail-value">${proc.nipc || 'N/A'}</span>
+                </div>
+                <div class="detail-item">
+                    <span class="detail-label">Distrito:</span>
+                    <span class="detail-value">${proc.distrito || 'N/A'}</span>
+                </div>
+                <div class="detail-item">
+                    <span class="detail-label">Concelho:</span>
+                    <span class="detail-value">${proc.concelho || 'N/A'}</span>
+                </div>
+                <div class="detail-item">
+                    <span class="detail-label">Freguesia:</span>
+                    <span class="detail-value">${proc.freguesia || 'N/A'}</span>
+                </div>
+                <div class="detail-item">
+                    <span class="detail-label">Site:</span>
+                    <span class="detail-value">
+                        ${proc.site ? `<a href="${proc.site}" target="_blank">${proc.site}</a>` : 'N/A'}
+                    </span>
+                </div>
+                <div class="detail-item">
+                    <span class="detail-label">Email:</span>
+                    <span class="detail-value">
+                        ${proc.email ? `<a href="mailto:${proc.email}">${proc.email}</a>` : 'N/A'}
+                    </span>
+                </div>
+            </div>
+            
+            <div class="detail-group">
+                <h4>Detalhes do Contrato</h4>
+                <div class="detail-item">
+                    <span class="detail-label">Número:</span>
+                    <span class="detail-value">${proc.numero_procedimento || 'N/A'}</span>
+                </div>
+                <div class="detail-item">
+                    <span class="detail-label">Prazo de Execução:</span>
+                    <span class="detail-value">${proc.prazo_execucao || 'N/A'}</span>
+                </div>
+                <div class="detail-item">
+                    <span class="detail-label">Fundos EU:</span>
+                    <span class="detail-value">${proc.fundos_eu || 'N/A'}</span>
+                </div>
+                <div class="detail-item">
+                    <span class="detail-label">URL do Procedimento:</span>
+                    <span class="detail-value">
+                        ${proc.link ? `<a href="${proc.link}" target="_blank">Ver no DRE</a>` : 'N/A'}
+                    </span>
+                </div>
+            </div>
+            
+            <div class="detail-group">
+                <h4>Informações Adicionais</h4>
+                <div class="detail-item">
+                    <span class="detail-label">Autor:</span>
+                    <span class="detail-value">${proc.autor_nome || 'N/A'}</span>
+                </div>
+                <div class="detail-item">
+                    <span class="detail-label">Cargo:</span>
+                    <span class="detail-value">${proc.autor_cargo || 'N/A'}</span>
+                </div>
+                <div class="detail-item">
+                    <span class="detail-label">URL Procedimento:</span>
+                    <span class="detail-value">
+                        ${proc.url_procedimento ? `<a href="${proc.url_procedimento}" target="_blank">Aceder</a>` : 'N/A'}
+                    </span>
+                </div>
+            </div>
+        </div>
+    `;
+}
+
+function toggleRow(index, proc) {
     const detailsRow = document.getElementById(`details-${index}`);
     const mainRow = detailsRow.previousElementSibling;
 
@@ -408,9 +481,41 @@ function toggleRow(index) {
         // Abrir o selecionado
         detailsRow.classList.add('show');
         mainRow.classList.add('expanded');
+
+        // Detalhes completos pedidos apenas na primeira abertura
+        const detailsCell = detailsRow.querySelector('.details-cell');
+        if (!detailsCell.dataset.loaded) {
+            detailsCell.innerHTML = '<div style="text-align: center; padding: 1rem; color: #666;">A carregar detalhes...</div>';
+            loadDetails(proc.id)
+                .then(details => {
+                    detailsCell.innerHTML = renderDetails(details);
+                    detailsCell.dataset.loaded = 'true';
+                })
+                .catch(err => {
+                    detailsCell.innerHTML = '<div style="text-align: center; padding: 1rem; color: #666;">Não foi possível carregar os detalhes.</div>';
+                    console.error('Erro:', err);
+                });
+        }
     }
 }
 
+function loadDetails(id) {
+    if (!detailsCache[id]) {
+        detailsCache[id] = fetch(`data/web/detalhes/${id}.json?v=${webIndexVersion}`)
+            .then(response => {
+                if (!response.ok) {
+                    throw new Error('Detalhes não encontrados');
+                }
+                return response.json();
+            })
+            .catch(err => {
+                delete detailsCache[id];
+                throw err;
+            });
+    }
+    return detailsCache[id];
+}
+
 // Funções para gerenciar seeds
 function openSeedModal() {
     document.getElementById('seedModal').classList.add('show');
@@ -701,55 +806,95 @@ function updateActiveSeedDisplay() {
 }
 
 // Função para verificar se um procedimento corresponde a QUALQUER uma das seeds ativas
-function procedureMatchesSeeds(procedure) {
+function procedureMatchesSeeds(procedure, seedResults = {}) {
     if (activeSeedCodes.length === 0) return true;
 
     // Se múltiplas seeds estão ativas, o procedimento deve corresponder a PELO MENOS UMA (OR logic)
     return activeSeedCodes.some(code => {
+        // Resultado pré-calculado pelo pipeline; as seeds só deste browser são avaliadas aqui
+        if (seedResults[code]) return seedResults[code].has(procedure.id);
         const seed = allSeeds.find(s => s.code === code);
         if (!seed) return false;
         return procedureMatchesSeedDefinition(procedure, seed);
     });
 }
 
+function seedFileName(code) {
+    // Como seed_file_name em scripts/generate_filtered_rss.py: códigos com outros caracteres
+    // levam um hash curto (FNV-1a em UTF-8) para não partilharem o ficheiro de outra seed
+    code = String(code);
+    const name = code.replace(/[^A-Za-z0-9_-]/gu, '_');
+    if (name === code) return name;
+    let hash = 0x811c9dc5;
+    for (const byte of new TextEncoder().encode(code)) {
+        hash = Math.imul(hash ^ byte, 0x01000193) >>> 0;
+    }
+    return `${name}-${hash.toString(16).padStart(8, '0')}`;
+}
+
+function seedDefinitionKey(seed) {
+    return JSON.stringify([seed.tags || [], seed.titleTags || [], seed.district || '']);
+}
+
+function loadSeedResults(code) {
+    // Ids dos procedimentos da seed, calculados pelo pipeline (data/web/seeds/<código>.json).
+    // Devolve null se o ficheiro não existir ou se a seed local tiver outra definição
+    const seed = allSeeds.find(s => s.code === code);
+    if (!seed) return Promise.resolve(null);
+    if (!seedResultsCache[code]) {
+        seedResultsCache[code] = fetch(`data/web/seeds/${seedFileName(code)}.json?v=${webIndexVersion}`)
+            .then(response => response.ok ? response.json() : null)
+            .catch(() => null);
+    }
+    return seedResultsCache[code].then(data =>
+        data && seedDefinitionKey(data.definicao || {}) === seedDefinitionKey(seed) ? new Set(data.ids) : null);
+}
+
+// Campos (além do título) onde as tags globais são procuradas, como em scripts/seed_matcher.py
+const SEED_OTHER_FIELDS = ['entidade', 'entidade_adjudicante', 'plataforma_eletronica', 'nipc', 'concelho', 'freguesia'];
+
+function procedureTokens(procedure) {
+    // Palavras normalizadas do título e dos restantes campos (calculadas uma vez por procedimento)
+    if (!procedure._tokens) {
+        const title = tokenizeText(procedure.descricao);
+        const other = tokenizeText(SEED_OTHER_FIELDS.map(field => procedure[field]).filter(Boolean).join(' '));
+        procedure._tokens = { title, full: title.concat(other) };
+    }
+    return procedure._tokens;
+}
+
+const tagPhrases = new Map(); // Tags já normalizadas (repetem-se em todos os procedimentos)
+
+function containsTag(tokens, tag) {
+    // A tag (normalizada) tem de aparecer como sequência de palavras consecutivas
+    if (!tagPhrases.has(tag)) tagPhrases.set(tag, tokenizeText(tag));
+    const phrase = tagPhrases.get(tag);
+    if (phrase.length === 0) return true;
+    return tokens.some((token, i) => token === phrase[0] && phrase.every((word, j) => tokens[i + j] === word));
+}
+
 // Função para verificar se um procedimento corresponde a uma definição de seed específica
+// (mesmas regras de scripts/seed_matcher.py: sem distinção de acentos, plurais e género)
 function procedureMatchesSeedDefinition(procedure, seed) {
     // 1. Verificar Distrito (se definido na seed)
     if (seed.district && seed.district !== '') {
-        const procedureDistrict = (procedure.distrito || '').toLowerCase();
-        const seedDistrict = seed.district.toLowerCase();
-
-        if (procedureDistrict !== seedDistrict) {
+        if (foldText(procedure.distrito || '') !== foldText(seed.district)) {
             return false;
         }
     }
 
-    // 2. Extrair informações para busca
-    const titleText = (procedure.descricao || procedure.designacao_contrato || '').toLowerCase();
-
-    const otherText = [
-        procedure.entidade || '',
-        procedure.entidade_adjudicante || '',
-        procedure.plataforma_eletronica || '',
-        procedure.nipc || '',
-        procedure.concelho || '',
-        procedure.freguesia || '',
-        procedure.autor_nome || '',
-        procedure.autor_cargo || ''
-    ].join(' ').toLowerCase();
+    // 2. Palavras normalizadas do procedimento
+    const tokens = procedureTokens(procedure);
 
     // 3. Verificar Tags
     // Se a seed tiver 'titleTags', elas DEVEM aparecer no título
     if (seed.titleTags && seed.titleTags.length > 0) {
-        const titleMatch = seed.titleTags.some(tag => titleText.includes(tag.toLowerCase()));
-        if (!titleMatch) return false;
+        if (!seed.titleTags.some(tag => containsTag(tokens.title, tag))) return false;
     }
 
     // Se a seed tiver 'tags' genéricas, elas podem aparecer em qualquer lugar (inclusive título)
     if (seed.tags && seed.tags.length > 0) {
-        const fullText = titleText + ' ' + otherText;
-        const tagMatch = seed.tags.some(tag => fullText.includes(tag.toLowerCase()));
-        return tagMatch;
+        return seed.tags.some(tag => containsTag(tokens.full, tag));
     }
 
     // Se não tiver tags mas passou no distrito, é válido
@@ -0,0 +1,459 @@
+#!/usr/bin/env python3
+"""
+Arquivo histórico de procedimentos em SQLite.
+
+Cada procedimento é guardado uma única vez (a versão mais recente), com as datas do primeiro e
+do último snapshot diário em que apareceu, e colunas indexadas para consultas por NIPC, distrito,
+concelho, CPV, prazo e preço, sem carregar os ficheiros JSON diários.
+
+Um índice invertido (SQLite FTS5) sobre a entidade, a designação do contrato, a descrição e o
+CPV, com o texto normalizado (sem acentos, plurais e género reduzidos), é mantido à medida que
+os snapshots são registados e permite pesquisa de texto livre com resultados ordenados (BM25).
+
+Uso:
+    python arquivo_procedimentos.py importar [diretorio_data] [--reimportar]
+    python arquivo_procedimentos.py consultar --distrito Braga --preco-min 100000 --ativos
+    python arquivo_procedimentos.py pesquisar "contentores enterrados OR ecoilha" [--ativos]
+    python arquivo_procedimentos.py pesquisar "entidade:lisboa limpez*" --limite 10
+"""
+
+import argparse
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+if script_dir not in sys.path:
+    sys.path.append(script_dir)
+
+from cache_detalhes import cache_key
+from detalhes_parser import ensure_parsed
+from normalizacao import fold, normalize, stem, tokenize
+from publicar import get_root_dir
+from snapshots import SnapshotStore
+
+ARCHIVE_FILENAME = "arquivo.sqlite"
+
+# Colunas indexáveis extraídas de cada procedimento (o registo completo fica em `dados`)
+COLUMNS = [
+    'link', 'numero_referencia', 'entidade', 'nipc', 'distrito', 'concelho', 'freguesia',
+    'cpv', 'nut_iii', 'tipo_procedimento', 'designacao_contrato', 'preco_base_valor',
+    'prazo_propostas_iso', 'data_envio_iso'
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS procedimentos (
+    chave TEXT PRIMARY KEY,
+    link TEXT,
+    numero_referencia TEXT,
+    entidade TEXT,
+    nipc TEXT,
+    distrito TEXT COLLATE NOCASE,
+    concelho TEXT COLLATE NOCASE,
+    freguesia TEXT COLLATE NOCASE,
+    cpv TEXT,
+    nut_iii TEXT,
+    tipo_procedimento TEXT,
+    designacao_contrato TEXT,
+    preco_base_valor REAL,
+    prazo_propostas_iso TEXT,
+    data_envio_iso TEXT,
+    primeiro_dia TEXT NOT NULL,
+    ultimo_dia TEXT NOT NULL,
+    dias INTEGER NOT NULL DEFAULT 1,
+    dados TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_proc_nipc ON procedimentos (nipc);
+CREATE INDEX IF NOT EXISTS idx_proc_distrito_prazo ON procedimentos (distrito, prazo_propostas_iso);
+CREATE INDEX IF NOT EXISTS idx_proc_concelho ON procedimentos (concelho);
+CREATE INDEX IF NOT EXISTS idx_proc_cpv ON procedimentos (cpv);
+CREATE INDEX IF NOT EXISTS idx_proc_prazo ON procedimentos (prazo_propostas_iso);
+CREATE INDEX IF NOT EXISTS idx_proc_preco ON procedimentos (preco_base_valor);
+CREATE INDEX IF NOT EXISTS idx_proc_ultimo_dia ON procedimentos (ultimo_dia);
+CREATE VIRTUAL TABLE IF NOT EXISTS pesquisa USING fts5(
+    entidade, designacao_contrato, descricao, cpv, prefix='2 3'
+);
+CREATE TABLE IF NOT EXISTS ficheiros (
+    nome TEXT PRIMARY KEY,
+    dia TEXT NOT NULL,
+    procedimentos INTEGER NOT NULL,
+    importado REAL NOT NULL
+);
+"""
+
+# Um procedimento repetido noutro dia só estende o intervalo de datas (e conta mais um dia);
+# os dados são substituídos apenas quando o snapshot não é mais antigo do que o já guardado
+UPSERT = f"""
+INSERT INTO procedimentos (chave, {', '.join(COLUMNS)}, primeiro_dia, ultimo_dia, dias, dados)
+VALUES (?, {', '.join('?' for _ in COLUMNS)}, ?, ?, 1, ?)
+ON CONFLICT(chave) DO UPDATE SET
+    {', '.join(f"{c} = CASE WHEN excluded.ultimo_dia >= ultimo_dia THEN excluded.{c} ELSE {c} END" for c in COLUMNS)},
+    dados = CASE WHEN excluded.ultimo_dia >= ultimo_dia THEN excluded.dados ELSE dados END,
+    primeiro_dia = MIN(primeiro_dia, excluded.primeiro_dia),
+    ultimo_dia = MAX(ultimo_dia, excluded.ultimo_dia),
+    dias = dias + CASE WHEN excluded.ultimo_dia > ultimo_dia OR excluded.primeiro_dia < primeiro_dia THEN 1 ELSE 0 END
+"""
+
+# Campos do índice de pesquisa e o respetivo peso na ordenação (BM25)
+SEARCH_FIELDS = {
+    'entidade': 2.0,
+    'designacao_contrato': 3.0,
+    'descricao': 1.0,
+    'cpv': 2.0,
+}
+SEARCH_FIELD_ALIASES = {'designacao': 'designacao_contrato'}
+SEARCH_OPERATORS = {'AND', 'OR', 'NOT'}
+_QUERY_TOKEN_RE = re.compile(r'(?:(\w+):)?("[^"]*"|\S+)')
+_WORD_RE = re.compile(r'\w+')
+
+def get_archive_path() -> str:
+    """Caminho da base de dados do arquivo (data/arquivo.sqlite na raiz do projeto)"""
+    return os.path.join(get_root_dir(), 'data', ARCHIVE_FILENAME)
+
+def snapshot_day(filename: str) -> str:
+    """Data ISO (YYYY-MM-DD) de um ficheiro diário DD-MM-YYYY.json (ou .delta.json)"""
+    return datetime.strptime(os.path.basename(filename)[:10], '%d-%m-%Y').date().isoformat()
+
+def snapshot_name(filename: str) -> str:
+    """Nome com que um dia fica registado como importado, igual para snapshots completos e deltas"""
+    return f"{os.path.basename(filename)[:10]}.json"
+
+def _search_row(proc: Dict) -> tuple:
+    """Texto normalizado de cada campo do índice de pesquisa"""
+    return (
+        normalize(proc.get('entidade') or proc.get('entidade_adjudicante') or ''),
+        normalize(proc.get('designacao_contrato') or ''),
+        normalize(proc.get('descricao') or ''),
+        proc.get('cpv') or '',
+    )
+
+def _match_term(term: str) -> str:
+    """Um termo da pesquisa em sintaxe FTS5: palavra, frase entre aspas ou prefixo terminado em *"""
+    if term.startswith('"'):
+        words = tokenize(term.strip('"'))
+        return f'"{" ".join(words)}"' if words else ''
+    if term.endswith('*'):
+        # O prefixo não é reduzido ao radical (já é uma palavra incompleta)
+        words = _WORD_RE.findall(fold(term[:-1]))
+        if not words:
+            return ''
+        head = ' '.join(stem(w) for w in words[:-1])
+        return f'"{head} {words[-1]}"*' if head else f'"{words[-1]}"*'
+    words = tokenize(term)
+    return f'"{" ".join(words)}"' if words else ''
+
+def build_match_query(query: str) -> str:
+    """
+    Converte uma pesquisa em texto livre numa expressão FTS5. Os termos são combinados com AND
+    por omissão; aceita OR e NOT, frases entre aspas, prefixos (limp*) e campos (entidade:lisboa).
+    Os termos são normalizados como o texto indexado.
+    NOT exclui o que vem a seguir do que vem antes: uma pesquisa que comece por NOT (ou com OR NOT)
+    não tem equivalente no FTS5 e é rejeitada com ValueError, em vez de o NOT ser ignorado.
+    """
+    parts = []
+    for field, term in _QUERY_TOKEN_RE.findall(query):
+        if not field and term.upper() in SEARCH_OPERATORS:
+            operator = term.upper()
+            if operator == 'NOT' and (not parts or parts[-1] == 'OR'):
+                raise ValueError(f"Pesquisa inválida: NOT tem de vir depois de um termo ({query!r})")
+            if operator == 'NOT' and parts[-1] == 'AND':
+                # "a AND NOT b" é o mesmo que "a NOT b"
+                parts[-1] = operator
+            elif parts and parts[-1] not in SEARCH_OPERATORS:
+                # Restantes operadores só entre dois termos
+                parts.append(operator)
+            continue
+        match = _match_term(term)
+        if not match:
+            continue
+        field = SEARCH_FIELD_ALIASES.get(field.lower(), field.lower()) if field else ''
+        if field in SEARCH_FIELDS:
+            match = f"{field} : {match}"
+        parts.append(match)
+    while parts and parts[-1] in SEARCH_OPERATORS:
+        parts.pop()
+    return ' '.join(parts)
+
+def _row(proc: Dict, day: str) -> tuple:
+    ensure_parsed(proc)
+    values = [proc.get(c) if c != 'entidade' else (proc.get('entidade') or proc.get('entidade_adjudicante'))
+              for c in COLUMNS]
+    return (cache_key(proc.get('link', '')), *values, day, day, json.dumps(proc, ensure_ascii=False))
+
+
+class ProcedureArchive:
+    """
+    Base de dados SQLite com um registo por procedimento e as datas em que foi visto
+    """
+    def __init__(self, path: str = None):
+        self.path = path or get_archive_path()
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        self.conn = sqlite3.connect(self.path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+        # Ordenação do índice (coluna rank): BM25 com os pesos de cada campo
+        weights = ', '.join(str(w) for w in SEARCH_FIELDS.values())
+        with self.conn:
+            self.conn.execute("INSERT INTO pesquisa (pesquisa, rank) VALUES ('rank', ?)", (f"bm25({weights})",))
+        # Arquivos criados antes do índice de pesquisa: indexar os registos existentes
+        if self.conn.execute("SELECT 1 FROM pesquisa LIMIT 1").fetchone() is None and len(self):
+            self.rebuild_search_index()
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM procedimentos").fetchone()[0]
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+    def add_snapshot(self, procedures: Iterable[Dict], day: str, name: str = None) -> int:
+        """
+        Regista os procedimentos de um snapshot diário (day em ISO). Repetir o mesmo dia atualiza
+        os registos sem contar o dia duas vezes. Se `name` for dado, o ficheiro fica marcado como
+        importado (import_date_files passa a ignorá-lo).
+        """
+        procedures = [proc for proc in procedures if proc.get('link')]
+        rows = [_row(proc, day) for proc in procedures]
+        with self.conn:
+            self.conn.executemany(UPSERT, rows)
+            self._index(procedures, rows, day)
+            if name:
+                self.conn.execute("INSERT OR REPLACE INTO ficheiros (nome, dia, procedimentos, importado) VALUES (?, ?, ?, ?)",
+                                  (name, day, len(rows), time.time()))
+        return len(rows)
+
+    def _index(self, procedures: List[Dict], rows: List[tuple], day: str):
+        """
+        Atualiza o índice de pesquisa dos procedimentos cuja versão guardada passou a ser a deste
+        snapshot (um snapshot mais antigo do que o já guardado não altera o índice)
+        """
+        entries = []
+        for proc, row in zip(procedures, rows):
+            found = self.conn.execute("SELECT rowid FROM procedimentos WHERE chave = ? AND ultimo_dia = ?",
+                                      (row[0], day)).fetchone()
+            if found:
+                entries.append((found[0], *_search_row(proc)))
+        self.conn.executemany("DELETE FROM pesquisa WHERE rowid = ?", [(e[0],) for e in entries])
+        self.conn.executemany(f"INSERT INTO pesquisa (rowid, {', '.join(SEARCH_FIELDS)}) VALUES (?, ?, ?, ?, ?)",
+                              entries)
+
+    def rebuild_search_index(self) -> int:
+        """Reconstrói o índice de pesquisa a partir dos registos guardados (ex: arquivos anteriores ao índice)"""
+        with self.conn:
+            self.conn.execute("DELETE FROM pesquisa")
+            entries = [(row['rowid'], *_search_row(json.loads(row['dados'])))
+                       for row in self.conn.execute("SELECT rowid, dados FROM procedimentos")]
+            self.conn.executemany(f"INSERT INTO pesquisa (rowid, {', '.join(SEARCH_FIELDS)}) VALUES (?, ?, ?, ?, ?)",
+                                  entries)
+            self.conn.execute("INSERT INTO pesquisa (pesquisa) VALUES ('optimize')")
+        return len(entries)
+
+    def import_date_files(self, data_dir: str, reimport: bool = False) -> int:
+        """
+        Importa os dias (snapshots completos ou deltas) ainda não importados (todos, com reimport=True)
+        """
+        if reimport:
+            with self.conn:
+                self.conn.execute("DELETE FROM procedimentos")
+                self.conn.execute("DELETE FROM ficheiros")
+                self.conn.execute("DELETE FROM pesquisa")
+        imported_names = {row[0] for row in self.conn.execute("SELECT nome FROM ficheiros")}
+        store = SnapshotStore(data_dir)
+
+        imported = 0
+        for date in store.dates():
+            name = snapshot_name(date)
+            if name in imported_names:
+                continue
+            try:
+                procedures = store.load(date)
+            except Exception as e:
+                print(f"❌ Erro ao importar {date} para o arquivo: {e}")
+                continue
+            imported += self.add_snapshot(procedures, snapshot_day(date), name=name)
+        return imported
+
+    def query(self, nipc: str = None, distrito: str = None, concelho: str = None, cpv: str = None,
+              prazo_desde: str = None, prazo_ate: str = None, preco_min: float = None, preco_max: float = None,
+              ativos: bool = False, visto_desde: str = None, limit: int = None,
+              com_dados: bool = False) -> List[Dict]:
+        """
+        Procura procedimentos pelos campos indexados. cpv aceita um prefixo ('45' = obras);
+        prazo_* e visto_desde são datas ISO; ativos=True limita a prazos ainda não terminados.
+        Com com_dados=True devolve o registo completo (incluindo detalhes_completos).
+        """
+        where, params = [], []
+        if nipc:
+            where.append("nipc = ?"); params.append(nipc)
+        if distrito:
+            where.append("distrito = ?"); params.append(distrito)
+        if concelho:
+            where.append("concelho = ?"); params.append(concelho)
+        if cpv:
+            where.append("cpv LIKE ?"); params.append(f"{cpv}%")
+        if prazo_desde:
+            where.append("prazo_propostas_iso >= ?"); params.append(prazo_desde)
+        if prazo_ate:
+            where.append("prazo_propostas_iso <= ?"); params.append(prazo_ate)
+        if ativos:
+            where.append("prazo_propostas_iso >= ?"); params.append(datetime.now().isoformat(timespec='seconds'))
+        if preco_min is not None:
+            where.append("preco_base_valor >= ?"); params.append(preco_min)
+        if preco_max is not None:
+            where.append("preco_base_valor <= ?"); params.append(preco_max)
+        if visto_desde:
+            where.append("ultimo_dia >= ?"); params.append(visto_desde)
+
+        columns = "dados, primeiro_dia, ultimo_dia, dias" if com_dados else \
+            f"chave, {', '.join(COLUMNS)}, primeiro_dia, ultimo_dia, dias"
+        sql = f"SELECT {columns} FROM procedimentos"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY prazo_propostas_iso IS NULL, prazo_propostas_iso"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+
+        results = []
+        for row in self.conn.execute(sql, params):
+            if com_dados:
+                record = json.loads(row['dados'])
+                record.update(primeiro_dia=row['primeiro_dia'], ultimo_dia=row['ultimo_dia'], dias=row['dias'])
+                results.append(record)
+            else:
+                results.append(dict(row))
+        return results
+
+    def search(self, query: str, limit: int = 20, ativos: bool = False, com_dados: bool = False) -> List[Dict]:
+        """
+        Pesquisa de texto livre no índice (ver build_match_query), ordenada por relevância:
+        BM25 com os pesos de SEARCH_FIELDS. Cada resultado inclui a pontuação (maior = mais relevante).
+        """
+        match = build_match_query(query)
+        if not match:
+            return []
+        columns = "p.dados, p.primeiro_dia, p.ultimo_dia, p.dias" if com_dados else \
+            f"p.chave, {', '.join('p.' + c for c in COLUMNS)}, p.primeiro_dia, p.ultimo_dia, p.dias"
+        if ativos:
+            sql = (f"SELECT {columns}, -pesquisa.rank AS pontuacao FROM pesquisa "
+                   f"JOIN procedimentos p ON p.rowid = pesquisa.rowid "
+                   f"WHERE pesquisa MATCH ? AND p.prazo_propostas_iso >= ? ORDER BY pesquisa.rank LIMIT ?")
+            params = [match, datetime.now().isoformat(timespec='seconds'), int(limit)]
+        else:
+            # Ordenar e limitar dentro do índice; só os melhores resultados são lidos da tabela
+            sql = (f"SELECT {columns}, -r.rank AS pontuacao FROM "
+                   f"(SELECT rowid, rank FROM pesquisa WHERE pesquisa MATCH ? ORDER BY rank LIMIT ?) r "
+                   f"JOIN procedimentos p ON p.rowid = r.rowid ORDER BY r.rank")
+            params = [match, int(limit)]
+
+        results = []
+        for row in self.conn.execute(sql, params):
+            if com_dados:
+                record = json.loads(row['dados'])
+                record.update(primeiro_dia=row['primeiro_dia'], ultimo_dia=row['ultimo_dia'], dias=row['dias'],
+                              pontuacao=row['pontuacao'])
+                results.append(record)
+            else:
+                results.append(dict(row))
+        return results
+
+    def summary(self) -> str:
+        files, first, last = self.conn.execute("SELECT COUNT(*), MIN(dia), MAX(dia) FROM ficheiros").fetchone()
+        return f"{len(self)} procedimentos únicos de {files} snapshots ({first or '-'} a {last or '-'})"
+
+
+def open_archive(data_dir: str = None) -> ProcedureArchive:
+    """
+    Abre o arquivo e importa os ficheiros diários que ainda não estejam lá
+    """
+    archive = ProcedureArchive()
+    data_dir = data_dir or os.path.dirname(archive.path)
+    imported = archive.import_date_files(data_dir)
+    if imported:
+        print(f"🗄️ Arquivo: importados {imported} registos de {data_dir}")
+    return archive
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='comando', required=True)
+
+    imp = sub.add_parser('importar', help='importar os ficheiros diários de data/')
+    imp.add_argument('data_dir', nargs='?')
+    imp.add_argument('--reimportar', action='store_true', help='apagar e reconstruir o arquivo')
+
+    q = sub.add_parser('consultar', help='procurar procedimentos no arquivo')
+    q.add_argument('--nipc')
+    q.add_argument('--distrito')
+    q.add_argument('--concelho')
+    q.add_argument('--cpv', help='código CPV ou prefixo')
+    q.add_argument('--prazo-desde')
+    q.add_argument('--prazo-ate')
+    q.add_argument('--preco-min', type=float)
+    q.add_argument('--preco-max', type=float)
+    q.add_argument('--ativos', action='store_true')
+    q.add_argument('--limite', type=int, default=50)
+    q.add_argument('--json', action='store_true', help='mostrar os registos completos em JSON')
+
+    s = sub.add_parser('pesquisar', help='pesquisa de texto livre (índice invertido)')
+    s.add_argument('texto', help='termos (AND por omissão), OR, NOT, "frases", prefixos* e campo:termo')
+    s.add_argument('--ativos', action='store_true')
+    s.add_argument('--limite', type=int, default=20)
+    s.add_argument('--json', action='store_true', help='mostrar os registos completos em JSON')
+    s.add_argument('--reindexar', action='store_true', help='reconstruir o índice antes de pesquisar')
+    args = parser.parse_args()
+
+    archive = ProcedureArchive()
+    try:
+        if args.comando == 'importar':
+            data_dir = args.data_dir or os.path.dirname(archive.path)
+            start = time.perf_counter()
+            imported = archive.import_date_files(data_dir, reimport=args.reimportar)
+            print(f"✅ {imported} registos importados em {time.perf_counter() - start:.1f}s")
+            print(f"🗄️ {archive.summary()}")
+            return
+
+        if args.comando == 'pesquisar':
+            if args.reindexar:
+                start = time.perf_counter()
+                indexed = archive.rebuild_search_index()
+                print(f"🔁 {indexed} procedimentos indexados em {time.perf_counter() - start:.1f}s")
+            start = time.perf_counter()
+            try:
+                results = archive.search(args.texto, limit=args.limite, ativos=args.ativos, com_dados=args.json)
+            except ValueError as e:
+                print(f"❌ {e}")
+                return
+            elapsed = (time.perf_counter() - start) * 1000
+            if args.json:
+                print(json.dumps(results, ensure_ascii=False, indent=2))
+            else:
+                for r in results:
+                    print(f"{r['pontuacao']:6.2f}  {r['ultimo_dia']:<10}  {(r['entidade'] or '-')[:35]:<35}  "
+                          f"{(r['designacao_contrato'] or '-')[:60]:<60} {r['link']}")
+            print(f"\n🔎 {len(results)} resultados para {build_match_query(args.texto)!r} em {elapsed:.2f} ms")
+            return
+
+        start = time.perf_counter()
+        results = archive.query(nipc=args.nipc, distrito=args.distrito, concelho=args.concelho, cpv=args.cpv,
+                                prazo_desde=args.prazo_desde, prazo_ate=args.prazo_ate,
+                                preco_min=args.preco_min, preco_max=args.preco_max,
+                                ativos=args.ativos, limit=args.limite, com_dados=args.json)
+        elapsed = (time.perf_counter() - start) * 1000
+        if args.json:
+            print(json.dumps(results, ensure_ascii=False, indent=2))
+        else:
+            for r in results:
+                preco = f"{r['preco_base_valor']:,.2f} EUR" if r['preco_base_valor'] is not None else "N/A"
+                print(f"{r['prazo_propostas_iso'] or '-':<20} {preco:>18}  {r['distrito'] or '-':<12} "
+                      f"{(r['entidade'] or '-')[:40]:<40} {r['link']}")
+        print(f"\n🔎 {len(results)} resultados em {elapsed:.1f} ms")
+    finally:
+        archive.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Benchmark do parser de detalhes_completos: parser de passagem única (detalhes_parser)
+contra a abordagem antiga de uma regex por campo, sobre todo o histórico em data/.
+
+Uso:
+    python benchmark_parser.py [diretorio_data] [--repeat N]
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+if script_dir not in sys.path:
+    sys.path.append(script_dir)
+
+from detalhes_parser import parse_detalhes, FIELD_LABELS
+from snapshots import SnapshotStore
+
+# Abordagem antiga: uma regex por campo, compilada e pesquisada no texto inteiro a cada chamada
+LEGACY_PATTERNS = {
+    'entidade_adjudicante': r'Designação da entidade adjudicante:\s*(.+?)(?:\n|$)',
+    'nipc': r'NIPC:\s*(\d+)',
+    'distrito': r'Distrito:\s*(.+?)(?:\n|$)',
+    'concelho': r'Concelho:\s*(.+?)(?:\n|$)',
+    'freguesia': r'Freguesia:\s*(.+?)(?:\n|$)',
+    'site': r'Endereço da Entidade \(URL\):\s*(.+?)(?:\n|$)',
+    'email': r'Endereço Eletrónico:\s*(.+?)(?:\n|$)',
+    'designacao_contrato': r'Designação do contrato:\s*(.+?)(?:\n|$)',
+    'descricao': r'Descrição:\s*(.+?)(?:\n|$)',
+    'preco_base': r'Preço base s/IVA:\s*(.+?)(?:\n|$)',
+    'prazo_execucao': r'Prazo de execução do contrato:\s*(.+?)(?:\n|$)',
+    'prazo_apresentacao_propostas': r'Prazo para apresentação das propostas:\s*(.+?)(?:\n|$)',
+    'fundos_eu': r'Têm fundos EU\?\s*(.+?)(?:\n|$)',
+    'plataforma_eletronica': r'Plataforma eletrónica utilizada pela entidade adjudicante:\s*(.+?)(?:\n|$)',
+    'url_procedimento': r'URL para Apresentação:\s*(.+?)(?:\n|$)',
+    'numero_procedimento': r'Número de referência interna:\s*(.+?)(?:\n|$)',
+    'autor_nome': r'28 - IDENTIFICAÇÃO DO\(S\) AUTOR\(ES\) DE ANÚNCIO\nNome:\s*(.+?)(?:\n|$)',
+    'autor_cargo': r'Cargo:\s*(.+?)(?:\n|$)',
+    'data_envio_anuncio': r'Data de Envio do Anúncio:\s*(\d{2}-\d{2}-\d{4})',
+}
+
+def legacy_parse(details_text: str) -> dict:
+    record = {}
+    for field, pattern in LEGACY_PATTERNS.items():
+        match = re.search(pattern, details_text, re.MULTILINE | re.DOTALL)
+        record[field] = re.sub(r'\s+', ' ', match.group(1).strip()) if match else None
+    return record
+
+def load_corpus(data_dir: str) -> list:
+    texts = []
+    for _, procedures in SnapshotStore(data_dir).iter():
+        for proc in procedures:
+            if proc.get('detalhes_completos'):
+                texts.append(proc['detalhes_completos'])
+    return texts
+
+def run(label: str, func, texts: list, repeat: int) -> float:
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in texts:
+            func(text)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    rate = len(texts) / best if best else 0.0
+    print(f"  {label:<28} {best:8.3f}s  {rate:10.0f} textos/s  {best / len(texts) * 1e6:8.1f} µs/texto")
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('data_dir', nargs='?', default=os.path.join(script_dir, '..', 'data'))
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"📂 A carregar corpus de {args.data_dir}...")
+    texts = load_corpus(args.data_dir)
+    print(f"   {len(texts)} textos de detalhes ({sum(len(t) for t in texts) / 1e6:.1f} MB)\n")
+    if not texts:
+        return
+
+    print("⏱️ Tempo (melhor de {} execuções):".format(args.repeat))
+    legacy = run("regex por campo (antigo)", legacy_parse, texts, args.repeat)
+    single = run("passagem única (novo)", parse_detalhes, texts, args.repeat)
+    print(f"\n🚀 Speedup: {legacy / single:.2f}x")
+
+    # Verificar que ambos extraem os mesmos valores
+    fields = list(LEGACY_PATTERNS)
+    differences = {field: 0 for field in fields}
+    for text in texts:
+        old = legacy_parse(text)
+        new = parse_detalhes(text)
+        for field in fields:
+            if old[field] != new.get(field):
+                differences[field] += 1
+
+    total = sum(differences.values())
+    print(f"\n🔎 Concordância com a abordagem antiga: {len(texts) * len(fields) - total}/{len(texts) * len(fields)} valores")
+    for field, count in differences.items():
+        if count:
+            print(f"  - {field}: {count} diferenças")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Benchmark offline do pipeline: repete os snapshots diários de data/ pelas etapas que não
+precisam de rede nem de Chrome, com escala sintética (x1, x10, x100 procedimentos).
+
+Etapas medidas:
+    parse_procedimento          (por procedimento)
+    create_rss_feed             (por item escrito)
+    update_ativos_from_date_file (ficheiro de data inteiro)
+    merge_with_existing_ativos  (lista inteira)
+    procedure_matches_seed      (por procedimento, contra todas as seeds, um par de cada vez)
+    SeedMatcher                 (por procedimento, todas as seeds numa única passagem)
+    generate_filtered_rss       (lista inteira)
+
+Para cada etapa e escala mostra o throughput, a latência p50/p95 por procedimento e o pico
+de memória (tracemalloc, numa passagem separada para não afetar os tempos).
+Corre num diretório temporário: nada é escrito em data/ ou RSS/.
+
+Uso:
+    python benchmark_pipeline.py [--days 7] [--scales 1 10 100] [--no-memory] [--json resultados.json]
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+if script_dir not in sys.path:
+    sys.path.append(script_dir)
+
+from json_to_rss_converter import parse_procedimento, write_rss_items
+from gerir_ativos import update_ativos_from_date_file, merge_with_existing_ativos
+from generate_filtered_rss import generate_filtered_rss
+from seed_matcher import SeedMatcher, procedure_matches_seed
+from rss_writer import RSSWriter
+from snapshots import SnapshotStore
+
+
+class TimingWriter(RSSWriter):
+    """RSSWriter que regista o instante de cada item para obter a latência por item"""
+    def __init__(self, out):
+        super().__init__(out)
+        self.marks = []
+
+    def start(self, *args, **kwargs):
+        super().start(*args, **kwargs)
+        self.marks.append(time.perf_counter())
+
+    def item(self, *args, **kwargs):
+        super().item(*args, **kwargs)
+        self.marks.append(time.perf_counter())
+
+
+def load_snapshots(data_dir: str, days: int) -> list:
+    """Procedimentos dos `days` snapshots diários mais recentes, pela ordem dos dias"""
+    store = SnapshotStore(data_dir)
+    procedures = []
+    for date in store.dates()[-days:]:
+        procedures.extend(store.load(date))
+    return procedures
+
+def scale_corpus(procedures: list, factor: int) -> list:
+    """
+    Cópias rasas (os textos são partilhados) com links distintos por réplica,
+    para que o merge e a deduplicação vejam procedimentos diferentes. O número do contrato
+    também muda (prefixo 9 + réplica), porque os ids dos procedimentos vêm dele (cache_key)
+    """
+    scaled = []
+    for k in range(factor):
+        for proc in procedures:
+            copy = dict(proc)
+            if k:
+                link = proc.get('link', '').replace('contrato-publico/', f'contrato-publico/9{k:04d}')
+                copy['link'] = f"{link}#r{k}"
+            scaled.append(copy)
+    return scaled
+
+def percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+# --- Etapas: cada uma recebe a lista escalada e devolve as latências por procedimento (ou None) ---
+
+def stage_parse(procs, ctx):
+    latencies = []
+    for proc in procs:
+        start = time.perf_counter()
+        parse_procedimento(proc)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+def stage_feed(procs, ctx):
+    processed = [parse_procedimento(p) for p in procs]
+    with open(os.devnull, 'w', encoding='utf-8') as f:
+        writer = TimingWriter(f)
+        write_rss_items(writer, processed)
+    return [b - a for a, b in zip(writer.marks, writer.marks[1:])]
+
+def stage_update_ativos(procs, ctx):
+    path = os.path.join(ctx['tmp'], 'snapshot.json')
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(procs, f, ensure_ascii=False)
+    update_ativos_from_date_file(path)
+    return None
+
+def stage_merge(procs, ctx):
+    # Metade dos procedimentos fazem de ativos anteriores e a outra metade de novos do dia
+    half = len(procs) // 2
+    merge_with_existing_ativos(procs[half:], procs[:half])
+    return None
+
+def stage_match(procs, ctx):
+    seeds = ctx['seeds']
+    latencies = []
+    for proc in procs:
+        start = time.perf_counter()
+        for seed in seeds:
+            procedure_matches_seed(proc, seed)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+def stage_matcher(procs, ctx):
+    matcher = SeedMatcher(ctx['seeds'])
+    latencies = []
+    for proc in procs:
+        start = time.perf_counter()
+        matcher.matches(proc)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+def stage_filtered_rss(procs, ctx):
+    # Sem o estado da execução anterior: mede sempre o cálculo completo
+    generate_filtered_rss(procs, incremental=False)
+    return None
+
+STAGES = [
+    ('parse_procedimento', stage_parse),
+    ('create_rss_feed', stage_feed),
+    ('update_ativos_from_date_file', stage_update_ativos),
+    ('merge_with_existing_ativos', stage_merge),
+    ('procedure_matches_seed', stage_match),
+    ('SeedMatcher', stage_matcher),
+    ('generate_filtered_rss', stage_filtered_rss),
+]
+
+
+def run_stage(func, procs, ctx, memory: bool) -> dict:
+    # Cada passagem recebe cópias novas: ensure_parsed e o merge alteram os dicionários
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        latencies = func(scale_corpus(procs, 1), ctx)
+        elapsed = time.perf_counter() - start
+
+        peak = None
+        if memory:
+            work = scale_corpus(procs, 1)
+            tracemalloc.start()
+            func(work, ctx)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+    if not latencies:
+        latencies = [elapsed / len(procs)] if procs else []
+    return {
+        'itens': len(procs),
+        'tempo': elapsed,
+        'itens_por_s': len(procs) / elapsed if elapsed else 0.0,
+        'p50_us': percentile(latencies, 50) * 1e6,
+        'p95_us': percentile(latencies, 95) * 1e6,
+        'pico_mb': peak / 1e6 if peak is not None else None,
+        'por_item': len(latencies) == len(procs),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data-dir', default=os.path.join(script_dir, '..', 'data'))
+    parser.add_argument('--days', type=int, default=7, help='número de snapshots diários (mais recentes) usados como base')
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 10, 100])
+    parser.add_argument('--stages', nargs='+', choices=[name for name, _ in STAGES],
+                        help='correr apenas estas etapas')
+    parser.add_argument('--no-memory', action='store_true', help='não medir o pico de memória')
+    parser.add_argument('--json', help='guardar os resultados neste ficheiro JSON')
+    args = parser.parse_args()
+
+    data_dir = os.path.abspath(args.data_dir)
+    base = load_snapshots(data_dir, args.days)
+    if not base:
+        print(f"❌ Nenhum ficheiro diário encontrado em {data_dir}")
+        return
+    seeds_path = os.path.join(data_dir, 'seeds.json')
+    seeds = []
+    if os.path.exists(seeds_path):
+        with open(seeds_path, 'r', encoding='utf-8') as f:
+            seeds = json.load(f)
+    print(f"📂 Base: {len(base)} procedimentos de {args.days} snapshots, {len(seeds)} seeds\n")
+
+    tmp = tempfile.mkdtemp(prefix='dre-bench-')
+    os.makedirs(os.path.join(tmp, 'data'))
+    os.makedirs(os.path.join(tmp, 'RSS'))
+    if seeds:
+        shutil.copyfile(seeds_path, os.path.join(tmp, 'data', 'seeds.json'))
+    ctx = {'tmp': tmp, 'seeds': seeds}
+    cwd = os.getcwd()
+    os.chdir(tmp)
+
+    results = []
+    try:
+        print(f"{'etapa':<30} {'escala':>6} {'itens':>8} {'tempo (s)':>10} {'itens/s':>10} "
+              f"{'p50 µs':>9} {'p95 µs':>9} {'pico MB':>8}")
+        print("-" * 98)
+        for name, func in STAGES:
+            if args.stages and name not in args.stages:
+                continue
+            for factor in args.scales:
+                procs = scale_corpus(base, factor)
+                result = run_stage(func, procs, ctx, memory=not args.no_memory)
+                result.update({'etapa': name, 'escala': factor})
+                results.append(result)
+                # Etapas sem latência por item mostram a média (tempo / itens) entre parênteses
+                p50 = f"{result['p50_us']:9.1f}" if result['por_item'] else f"({result['p50_us']:.1f})".rjust(9)
+                p95 = f"{result['p95_us']:9.1f}" if result['por_item'] else f"{'-':>9}"
+                peak = f"{result['pico_mb']:8.1f}" if result['pico_mb'] is not None else f"{'-':>8}"
+                print(f"{name:<30} {'x' + str(factor):>6} {result['itens']:>8} {result['tempo']:10.3f} "
+                      f"{result['itens_por_s']:10.0f} {p50} {p95} {peak}")
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'base': len(base), 'dias': args.days, 'seeds': len(seeds), 'resultados': results},
+                      f, ensure_ascii=False, indent=2)
+        print(f"\n💾 Resultados guardados em {args.json}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark da geração do feed RSS: escritor incremental (rss_writer) contra a abordagem antiga
+(ElementTree -> minidom -> um str.replace por item para inserir o CDATA).
+
+Os itens são gerados repetindo os procedimentos reais de um ficheiro de data/.
+
+Uso:
+    python benchmark_rss_writer.py [--sizes 200 5000 50000] [--max-legacy 5000]
+"""
+
+import argparse
+import copy
+import io
+import os
+import sys
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+from xml.dom import minidom
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+if script_dir not in sys.path:
+    sys.path.append(script_dir)
+
+from json_to_rss_converter import parse_procedimento, build_description_html, clean_url, write_rss_items
+from rss_writer import RSSWriter, format_pub_date, format_rss_date
+from snapshots import SnapshotStore
+
+def legacy_create_rss_feed(procedimentos):
+    """Reprodução da implementação antiga de create_rss_feed (quadrática no número de itens)"""
+    ET.register_namespace('atom', 'http://www.w3.org/2005/Atom')
+    rss = ET.Element('rss', version='2.0')
+    channel = ET.SubElement(rss, 'channel')
+    ET.SubElement(channel, 'title').text = 'Feed RSS - Procedimentos DRE'
+    ET.SubElement(channel, 'lastBuildDate').text = format_rss_date()
+    for i, proc in enumerate(procedimentos):
+        item = ET.SubElement(channel, 'item')
+        c_link = clean_url(proc.get('link', ''))
+        ET.SubElement(item, 'title').text = f"[{proc.get('nipc')}] {proc.get('entidade')}"
+        ET.SubElement(item, 'link').text = c_link
+        ET.SubElement(item, 'guid').text = f"{c_link}#{i}"
+        ET.SubElement(item, 'pubDate').text = format_pub_date(None)
+        ET.SubElement(item, 'description').text = f"DESCRIPTION_CDATA_PLACEHOLDER_{i}"
+    xml_str = minidom.parseString(ET.tostring(rss, 'utf-8')).toxml(encoding='UTF-8').decode('utf-8')
+    for i in range(len(procedimentos) - 1, -1, -1):
+        desc_html = build_description_html(procedimentos[i])
+        xml_str = xml_str.replace(f"DESCRIPTION_CDATA_PLACEHOLDER_{i}", f"<![CDATA[{desc_html}]]>")
+    return xml_str
+
+def streaming_create_rss_feed(procedimentos):
+    """Escritor incremental; escreve para um ficheiro nulo como na escrita real em disco"""
+    with open(os.devnull, 'w', encoding='utf-8') as f:
+        write_rss_items(RSSWriter(f), procedimentos)
+
+def load_sample() -> list:
+    store = SnapshotStore(os.path.join(script_dir, '..', 'data'))
+    dates = store.dates()
+    if not dates:
+        return []
+    return [parse_procedimento(p) for p in store.load(dates[-1])]
+
+def measure(func, items):
+    tracemalloc.start()
+    start = time.perf_counter()
+    func(items)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[200, 5000, 50000])
+    parser.add_argument('--max-legacy', type=int, default=5000,
+                        help='tamanho máximo para correr a abordagem antiga (é quadrática)')
+    args = parser.parse_args()
+
+    sample = load_sample()
+    if not sample:
+        print("❌ Nenhum ficheiro de data/ encontrado")
+        return
+    print(f"📂 Amostra: {len(sample)} procedimentos reais\n")
+    print(f"{'itens':>8} | {'antigo (s)':>10} {'pico MB':>8} | {'incremental (s)':>15} {'pico MB':>8} | {'µs/item':>8}")
+    print("-" * 72)
+
+    for size in args.sizes:
+        items = [copy.copy(sample[i % len(sample)]) for i in range(size)]
+        if size <= args.max_legacy:
+            legacy_time, legacy_peak = measure(legacy_create_rss_feed, items)
+            legacy_cols = f"{legacy_time:10.3f} {legacy_peak / 1e6:8.1f}"
+        else:
+            legacy_cols = f"{'ignorado':>10} {'-':>8}"
+        stream_time, stream_peak = measure(streaming_create_rss_feed, items)
+        print(f"{size:>8} | {legacy_cols} | {stream_time:15.3f} {stream_peak / 1e6:8.1f} | {stream_time / size * 1e6:8.1f}")
+
+if __name__ == "__main__":
+    main()
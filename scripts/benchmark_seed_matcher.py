@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Benchmark da correspondência com as seeds: SeedMatcher (todas as seeds numa única passagem)
+contra procedure_matches_seed avaliado para cada par (procedimento, seed), e contra a regra
+antiga (substring em minúsculas, sem normalização) para comparar os resultados.
+
+As seeds são sintéticas: tags e titleTags tiradas das palavras e pares de palavras das
+descrições reais, juntamente com as seeds de data/seeds.json. Os procedimentos repetem os
+snapshots diários de data/ até ao número pedido (cópias sem os termos normalizados, cujo cálculo
+é medido à parte como custo de ingestão). A abordagem par a par é medida numa amostra
+(é proporcional a procedimentos x seeds) e extrapolada; na amostra, os resultados dos
+métodos são comparados.
+
+Uso:
+    python benchmark_seed_matcher.py [--seeds 1000] [--procedures 50000] [--sample 500]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+if script_dir not in sys.path:
+    sys.path.append(script_dir)
+
+from seed_matcher import SeedMatcher, ensure_terms, procedure_matches_seed
+from snapshots import SnapshotStore
+
+DISTRICTS = ['Lisboa', 'Porto', 'Braga', 'Setúbal', 'Aveiro', 'Faro', 'Coimbra', 'Leiria']
+
+def legacy_matches_seed(proc: dict, seed: dict) -> bool:
+    """Regra antiga: substring em minúsculas no texto bruto"""
+    if seed.get('district') and (proc.get('distrito') or '').lower() != seed['district'].lower():
+        return False
+    title_text = (proc.get('descricao') or proc.get('designacao_contrato') or '').lower()
+    other_fields = [proc.get(field, '') for field in
+                    ('entidade', 'entidade_adjudicante', 'plataforma_eletronica', 'nipc', 'concelho', 'freguesia')]
+    full_text = f"{title_text} {' '.join(str(f) for f in other_fields if f).lower()}"
+    title_tags = seed.get('titleTags') or []
+    if title_tags and not any(tag.lower() in title_text for tag in title_tags):
+        return False
+    tags = seed.get('tags') or []
+    if tags and not any(tag.lower() in full_text for tag in tags):
+        return False
+    return True
+
+def load_procedures(data_dir: str, total: int) -> list:
+    """Procedimentos dos snapshots mais recentes, repetidos até `total`"""
+    store = SnapshotStore(data_dir)
+    base = []
+    for date in reversed(store.dates()):
+        base.extend(store.load(date))
+        if len(base) >= total:
+            break
+    if not base:
+        return []
+    procedures = []
+    for i in range(total):
+        proc = dict(base[i % len(base)])
+        proc.pop('termos', None)
+        procedures.append(proc)
+    return procedures
+
+def synthetic_seeds(procedures: list, n: int, real_seeds: list, rng: random.Random) -> list:
+    vocabulary = set()
+    for proc in procedures[:5000]:
+        words = [w.strip('.,;:()"') for w in (proc.get('descricao') or '').lower().split()]
+        words = [w for w in words if len(w) > 3]
+        vocabulary.update(words)
+        vocabulary.update(f"{a} {b}" for a, b in zip(words, words[1:]))
+    vocabulary = sorted(vocabulary)
+
+    seeds = list(real_seeds)
+    for i in range(max(0, n - len(seeds))):
+        seeds.append({
+            'code': f"SEED{i:04d}",
+            'name': f"Seed sintética {i}",
+            'tags': rng.sample(vocabulary, rng.randint(1, 10)),
+            'titleTags': rng.sample(vocabulary, rng.randint(0, 3)),
+            'district': rng.choice(DISTRICTS) if rng.random() < 0.25 else None,
+        })
+    return seeds[:n]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data-dir', default=os.path.join(script_dir, '..', 'data'))
+    parser.add_argument('--seeds', type=int, default=1000)
+    parser.add_argument('--procedures', type=int, default=50000)
+    parser.add_argument('--sample', type=int, default=500,
+                        help='procedimentos usados para medir a abordagem par a par')
+    args = parser.parse_args()
+
+    procedures = load_procedures(args.data_dir, args.procedures)
+    if not procedures:
+        print(f"❌ Nenhum ficheiro diário encontrado em {args.data_dir}")
+        return
+    real_seeds = []
+    seeds_path = os.path.join(args.data_dir, 'seeds.json')
+    if os.path.exists(seeds_path):
+        with open(seeds_path, 'r', encoding='utf-8') as f:
+            real_seeds = json.load(f)
+    seeds = synthetic_seeds(procedures, args.seeds, real_seeds, random.Random(42))
+    n_tags = sum(len(s.get('tags') or []) + len(s.get('titleTags') or []) for s in seeds)
+    print(f"📂 {len(procedures)} procedimentos, {len(seeds)} seeds ({n_tags} tags)\n")
+
+    start = time.perf_counter()
+    matcher = SeedMatcher(seeds)
+    compile_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for proc in procedures:
+        ensure_terms(proc)
+    ingest_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    matched = [matcher.matches(proc) for proc in procedures]
+    matcher_time = time.perf_counter() - start
+    n_matches = sum(len(m) for m in matched)
+
+    sample = procedures[:args.sample]
+    start = time.perf_counter()
+    pairwise = [[seed for seed in seeds if procedure_matches_seed(proc, seed)] for proc in sample]
+    pairwise_time = time.perf_counter() - start
+    pairwise_total = pairwise_time / len(sample) * len(procedures)
+    mismatches = sum(1 for a, b in zip(matched, pairwise) if a != b)
+
+    start = time.perf_counter()
+    legacy = [[seed for seed in seeds if legacy_matches_seed(proc, seed)] for proc in sample]
+    legacy_total = (time.perf_counter() - start) / len(sample) * len(procedures)
+    gained = sum(len({id(s) for s in a} - {id(s) for s in b}) for a, b in zip(matched, legacy))
+    lost = sum(len({id(s) for s in b} - {id(s) for s in a}) for a, b in zip(matched, legacy))
+
+    print(f"{'método':<34} {'tempo (s)':>10} {'proc/s':>10} {'µs/proc':>9}")
+    print("-" * 66)
+    print(f"{'SeedMatcher (compilação)':<34} {compile_time:10.3f}")
+    print(f"{'termos normalizados (ingestão)':<34} {ingest_time:10.3f} {len(procedures) / ingest_time:10.0f} "
+          f"{ingest_time / len(procedures) * 1e6:9.1f}")
+    for label, elapsed in (('SeedMatcher', matcher_time),
+                           ('procedure_matches_seed (estim.)', pairwise_total),
+                           ('regra antiga, substring (estim.)', legacy_total)):
+        print(f"{label:<34} {elapsed:10.3f} {len(procedures) / elapsed:10.0f} "
+              f"{elapsed / len(procedures) * 1e6:9.1f}")
+    print(f"\n⚡ Aceleração face a procedure_matches_seed: x{pairwise_total / (matcher_time + compile_time):.1f}  "
+          f"({n_matches} correspondências; amostra de {len(sample)}: {mismatches} diferenças)")
+    print(f"🔤 Face à regra antiga, na amostra: +{gained} correspondências (acentos, plurais, género), "
+          f"-{lost} (tags que só apareciam dentro de outras palavras)")
+
+if __name__ == "__main__":
+    main()
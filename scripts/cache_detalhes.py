@@ -0,0 +1,194 @@
+import json
+import os
+import re
+import sqlite3
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+# Configuração da cache (pode ser ajustada via variáveis de ambiente)
+DRE_CACHE_TTL_DAYS = float(os.environ.get("DRE_CACHE_TTL_DAYS", 180))
+DRE_CACHE_MAX_MB = float(os.environ.get("DRE_CACHE_MAX_MB", 200))
+# Fração de páginas livres do ficheiro a partir da qual a cache é compactada (VACUUM)
+DRE_CACHE_VACUUM_FREE = float(os.environ.get("DRE_CACHE_VACUUM_FREE", 0.25))
+
+CACHE_FILENAME = "detalhes_cache.sqlite"
+
+def cache_key(link: str) -> str:
+    """
+    Chave estável de um procedimento: o identificador do contrato no link do DRE
+    (ex: 'contrato-publico/32336-983504251'), ou o próprio link se não tiver esse formato
+    """
+    if not link:
+        return ""
+    match = re.search(r'contrato-publico/\d+-\d+', link)
+    return match.group(0) if match else link.strip()
+
+def get_cache_dir() -> str:
+    """
+    Retorna o diretório onde a cache é guardada (data/cache na raiz do projeto)
+    """
+    if os.path.exists('data') or os.path.exists('package.json'):
+        return os.path.join('data', 'cache')
+    if os.path.exists('../data') or os.path.exists('../package.json'):
+        return os.path.join('..', 'data', 'cache')
+    return os.path.join('data', 'cache')
+
+
+class DetailCache:
+    """
+    Cache persistente (SQLite) dos detalhes de procedimentos, partilhada entre execuções.
+    As entradas expiram após `ttl_days` e as menos usadas são removidas quando a cache excede `max_mb`.
+    """
+    def __init__(self, path: str = None, ttl_days: float = DRE_CACHE_TTL_DAYS, max_mb: float = DRE_CACHE_MAX_MB,
+                 vacuum_free: float = DRE_CACHE_VACUUM_FREE):
+        if path is None:
+            path = os.path.join(get_cache_dir(), CACHE_FILENAME)
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path = path
+        self.ttl = ttl_days * 86400
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.vacuum_free = vacuum_free
+        self.stats = {'hits': 0, 'misses': 0, 'expirados': 0, 'escritas': 0, 'removidos': 0}
+
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS detalhes (
+                chave TEXT PRIMARY KEY,
+                dados TEXT NOT NULL,
+                tamanho INTEGER NOT NULL,
+                criado REAL NOT NULL,
+                acedido REAL NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_detalhes_acedido ON detalhes (acedido)")
+        self.conn.commit()
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM detalhes").fetchone()[0]
+
+    def get(self, link: str) -> Optional[Dict]:
+        """Devolve o procedimento guardado para o link, ou None se não existir ou tiver expirado"""
+        key = cache_key(link)
+        row = self.conn.execute("SELECT dados, criado FROM detalhes WHERE chave = ?", (key,)).fetchone()
+        if row is None:
+            self.stats['misses'] += 1
+            return None
+
+        dados, criado = row
+        now = time.time()
+        if self.ttl and now - criado > self.ttl:
+            self.conn.execute("DELETE FROM detalhes WHERE chave = ?", (key,))
+            self.conn.commit()
+            self.stats['expirados'] += 1
+            self.stats['misses'] += 1
+            return None
+
+        self.conn.execute("UPDATE detalhes SET acedido = ? WHERE chave = ?", (now, key))
+        self.stats['hits'] += 1
+        return json.loads(dados)
+
+    def put(self, procedure: Dict, created: float = None, replace: bool = True):
+        """
+        Guarda (ou substitui) um procedimento com detalhes completos.
+        Com replace=False uma entrada já existente não é reescrita (mantém a data de criação, que
+        conta para o TTL) e apenas é marcada como acedida.
+        """
+        key = cache_key(procedure.get('link', ''))
+        if not key or not procedure.get('detalhes_completos'):
+            return
+        now = time.time()
+        if not replace:
+            cursor = self.conn.execute("UPDATE detalhes SET acedido = ? WHERE chave = ?", (now, key))
+            if cursor.rowcount:
+                return
+        dados = json.dumps(procedure, ensure_ascii=False)
+        self.conn.execute(
+            "INSERT OR REPLACE INTO detalhes (chave, dados, tamanho, criado, acedido) VALUES (?, ?, ?, ?, ?)",
+            (key, dados, len(dados.encode('utf-8')), created or now, now)
+        )
+        self.stats['escritas'] += 1
+
+    def evict(self):
+        """Remove entradas expiradas e, se necessário, as menos acedidas até respeitar o tamanho máximo"""
+        removed = 0
+        if self.ttl:
+            cursor = self.conn.execute("DELETE FROM detalhes WHERE criado < ?", (time.time() - self.ttl,))
+            removed += cursor.rowcount
+
+        total = self.conn.execute("SELECT COALESCE(SUM(tamanho), 0) FROM detalhes").fetchone()[0]
+        if self.max_bytes and total > self.max_bytes:
+            excess = total - self.max_bytes
+            to_delete = []
+            for key, size in self.conn.execute("SELECT chave, tamanho FROM detalhes ORDER BY acedido ASC"):
+                if excess <= 0:
+                    break
+                to_delete.append((key,))
+                excess -= size
+            self.conn.executemany("DELETE FROM detalhes WHERE chave = ?", to_delete)
+            removed += len(to_delete)
+
+        self.conn.commit()
+        # VACUUM reescreve o ficheiro todo: só quando as páginas libertadas já pesam no tamanho
+        if removed and self.free_fraction() >= self.vacuum_free:
+            self.conn.execute("VACUUM")
+        self.stats['removidos'] += removed
+        return removed
+
+    def free_fraction(self) -> float:
+        """Fração das páginas do ficheiro que estão livres (espaço que só o VACUUM devolve)"""
+        pages = self.conn.execute("PRAGMA page_count").fetchone()[0]
+        free = self.conn.execute("PRAGMA freelist_count").fetchone()[0]
+        return free / pages if pages else 0.0
+
+    def import_date_files(self, data_dir: str) -> int:
+        """
+        Popula a cache a partir dos snapshots diários de data/ já existentes (completos ou deltas).
+        Ficheiros mais recentes têm prioridade sobre os mais antigos.
+        """
+        from snapshots import SnapshotStore
+
+        # Por ordem cronológica, para que a versão mais recente fique guardada
+        store = SnapshotStore(data_dir)
+        imported = 0
+        for date in store.dates():
+            try:
+                procedures = store.load(date)
+            except Exception as e:
+                print(f"❌ Erro ao importar {date} para a cache: {e}")
+                continue
+            # A data do ficheiro (e não o mtime, que num checkout git é o do clone) marca a criação
+            created = datetime.strptime(date, '%d-%m-%Y').timestamp()
+            for proc in procedures:
+                if proc.get('detalhes_completos'):
+                    self.put(proc, created=created)
+                    imported += 1
+        self.conn.commit()
+        # A importação inicial não conta como escritas da execução
+        self.stats['escritas'] -= imported
+        return imported
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+    def summary(self) -> str:
+        lookups = self.stats['hits'] + self.stats['misses']
+        rate = (self.stats['hits'] / lookups * 100) if lookups else 0.0
+        return (f"{self.stats['hits']} hits, {self.stats['misses']} misses ({rate:.1f}% hit rate), "
+                f"{self.stats['expirados']} expirados, {self.stats['escritas']} escritas, "
+                f"{self.stats['removidos']} removidos, {len(self)} entradas")
+
+
+def open_cache(data_dirs: List[str] = None) -> DetailCache:
+    """
+    Abre a cache de detalhes; se estiver vazia, importa o histórico dos ficheiros diários
+    """
+    cache = DetailCache()
+    if len(cache) == 0:
+        for data_dir in data_dirs or [os.path.dirname(get_cache_dir())]:
+            imported = cache.import_date_files(data_dir)
+            if imported:
+                print(f"📦 Cache de detalhes inicializada com {imported} registos de {data_dir}")
+                break
+    return cache
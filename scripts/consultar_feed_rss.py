@@ -124,6 +124,18 @@ def buscar_por_entidade(procedimentos: List[Dict], termo: str) -> List[Dict]:
     
     return resultados
 
+def pesquisar_arquivo(termo: str, limite: int = 20) -> List[Dict]:
+    """
+    Pesquisa no arquivo histórico (índice invertido de todos os procedimentos já vistos),
+    sem percorrer o feed: aceita OR, NOT, "frases", prefixos* e campo:termo
+    """
+    from arquivo_procedimentos import open_archive
+    archive = open_archive()
+    try:
+        return archive.search(termo, limit=limite)
+    finally:
+        archive.close()
+
 def mostrar_estatisticas(procedimentos: List[Dict]):
     """
     Mostra estatísticas dos procedimentos
@@ -174,11 +186,12 @@ def main():
         print("\nEscolha uma opção:")
         print("1. Mostrar todos os procedimentos")
         print("2. Buscar por entidade")
-        print("3. Mostrar estatísticas")
-        print("4. Sair")
+        print("3. Pesquisar no arquivo histórico")
+        print("4. Mostrar estatísticas")
+        print("5. Sair")
         
         try:
-            opcao = input("\nDigite sua opção (1-4): ").strip()
+            opcao = input("\nDigite sua opção (1-5): ").strip()
             
             if opcao == "1":
                 print(f"\nMostrando todos os {len(procedimentos)} procedimentos:")
@@ -199,14 +212,28 @@ def main():
                     print("Por favor, digite um termo para buscar.")
                     
             elif opcao == "3":
-                mostrar_estatisticas(procedimentos)
+                termo = input("Digite os termos (OR, NOT, \"frase\", prefixo*, entidade:termo): ").strip()
+                if termo:
+                    resultados = pesquisar_arquivo(termo)
+                    if resultados:
+                        print(f"\nEncontrados {len(resultados)} procedimentos (por relevância):")
+                        for i, r in enumerate(resultados, 1):
+                            print(f"  {i:2}. [{r['ultimo_dia']}] {r['entidade'] or 'N/A'} - "
+                                  f"{r['designacao_contrato'] or 'N/A'}\n      {r['link']}")
+                    else:
+                        print("Nenhum procedimento encontrado com esses termos.")
+                else:
+                    print("Por favor, digite um termo para buscar.")
                 
             elif opcao == "4":
+                mostrar_estatisticas(procedimentos)
+                
+            elif opcao == "5":
                 print("👋 Até logo!")
                 break
                 
             else:
-                print("❌ Opção inválida. Digite 1, 2, 3 ou 4.")
+                print("❌ Opção inválida. Digite 1, 2, 3, 4 ou 5.")
                 
         except KeyboardInterrupt:
             print("\n👋 Até logo!")
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Modo daemon do extractor: corre o pipeline (rss_dre_extractor.main) em ciclo, a cada
+DRE_DAEMON_INTERVAL segundos, sempre no mesmo processo.
+
+Entre ciclos ficam em memória o pool de drivers Chrome (os já arrancados continuam abertos), a
+cache de detalhes, os procedimentos da última execução e os ativos (PipelineState), bem como as
+seeds já compiladas (compiled_matcher). Os feeds são pedidos de forma condicional: um ciclo sem
+feeds alterados termina logo após os pedidos; num ciclo com alterações só os procedimentos novos
+são extraídos e só os ficheiros cujo conteúdo mudou são reescritos e publicados.
+
+SIGTERM/SIGINT terminam o daemon no fim do ciclo em curso. O estado fica disponível por HTTP:
+    GET /health   200 se o último ciclo bem-sucedido foi há menos de DRE_DAEMON_STALE_CYCLES
+                  intervalos (ou o daemon arrancou há menos do que isso), 503 caso contrário
+
+Uso:
+    python daemon_dre.py                          # ciclos de DRE_DAEMON_INTERVAL segundos
+    python daemon_dre.py --intervalo 300 --porta 8765
+    python daemon_dre.py --ciclos 1               # um único ciclo (ex: para testar)
+"""
+
+import argparse
+import json
+import os
+import signal
+import sys
+import threading
+import time
+import traceback
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+if script_dir not in sys.path:
+    sys.path.append(script_dir)
+
+from rss_dre_extractor import PipelineState, main as run_pipeline
+
+DRE_DAEMON_INTERVAL = float(os.environ.get("DRE_DAEMON_INTERVAL", 600))
+DRE_DAEMON_HOST = os.environ.get("DRE_DAEMON_HOST", "127.0.0.1")
+DRE_DAEMON_PORT = int(os.environ.get("DRE_DAEMON_PORT", 8765))
+DRE_DAEMON_STALE_CYCLES = float(os.environ.get("DRE_DAEMON_STALE_CYCLES", 3))
+
+def _iso(timestamp: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(timestamp).isoformat(timespec='seconds') if timestamp else None
+
+
+class DaemonStatus:
+    """
+    Estado do daemon exposto em /health. É atualizado pelo ciclo e lido pelas threads do servidor HTTP.
+    """
+    def __init__(self, interval: float, stale_cycles: float = DRE_DAEMON_STALE_CYCLES):
+        self.interval = interval
+        self.stale_after = interval * stale_cycles
+        self.started = time.time()
+        self.cycles = 0
+        self.consecutive_failures = 0
+        self.running = False
+        self.last_start: Optional[float] = None
+        self.last_end: Optional[float] = None
+        self.last_success: Optional[float] = None
+        self.last_summary: Optional[Dict] = None
+        self.last_error: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def begin(self):
+        with self._lock:
+            self.running = True
+            self.last_start = time.time()
+
+    def finish(self, summary: Optional[Dict], error: Optional[str] = None):
+        with self._lock:
+            self.running = False
+            self.cycles += 1
+            self.last_end = time.time()
+            if error is None:
+                self.consecutive_failures = 0
+                self.last_success = self.last_end
+                self.last_summary = summary
+            else:
+                self.consecutive_failures += 1
+                self.last_error = error
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            reference = self.last_success or self.started
+            healthy = time.time() - reference <= self.stale_after
+            return {
+                'estado': 'ok' if healthy else 'atrasado',
+                'iniciado': _iso(self.started),
+                'intervalo': self.interval,
+                'ciclos': self.cycles,
+                'em_curso': self.running,
+                'ultimo_inicio': _iso(self.last_start),
+                'ultimo_fim': _iso(self.last_end),
+                'ultimo_sucesso': _iso(self.last_success),
+                'ultimo_resumo': self.last_summary,
+                'falhas_consecutivas': self.consecutive_failures,
+                'ultimo_erro': self.last_error,
+            }
+
+
+class HealthHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/health':
+            self.send_error(404)
+            return
+        status = self.server.status.snapshot()
+        body = json.dumps(status, ensure_ascii=False).encode('utf-8')
+        self.send_response(200 if status['estado'] == 'ok' else 503)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def start_health_server(host: str, port: int, status: DaemonStatus) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer((host, port), HealthHandler)
+    server.daemon_threads = True
+    server.status = status
+    threading.Thread(target=server.serve_forever, name='dre-health', daemon=True).start()
+    print(f"🩺 Estado em http://{host}:{server.server_address[1]}/health")
+    return server
+
+def run_daemon(interval: float = DRE_DAEMON_INTERVAL, host: str = DRE_DAEMON_HOST, port: int = DRE_DAEMON_PORT,
+               max_cycles: Optional[int] = None) -> DaemonStatus:
+    """
+    Corre o pipeline a cada `interval` segundos (contados desde o início de cada ciclo) até receber
+    SIGTERM/SIGINT ou completar `max_cycles` ciclos. port=0 desativa o endpoint de estado.
+    """
+    stop = threading.Event()
+
+    def handle_signal(signum, frame):
+        print(f"\n🛑 {signal.Signals(signum).name} recebido, a terminar no fim do ciclo em curso...")
+        stop.set()
+
+    signal.signal(signal.SIGTERM, handle_signal)
+    signal.signal(signal.SIGINT, handle_signal)
+
+    status = DaemonStatus(interval)
+    server = start_health_server(host, port, status) if port else None
+    state = PipelineState()
+    print(f"🔁 Daemon iniciado: ciclos a cada {interval:g}s")
+    try:
+        while not stop.is_set():
+            start = time.monotonic()
+            status.begin()
+            print(f"\n===== Ciclo {status.cycles + 1} ({datetime.now().strftime('%d/%m/%Y %H:%M:%S')}) =====")
+            try:
+                summary = run_pipeline(state)
+                status.finish(summary, None if summary is not None else 'feeds indisponíveis ou sem procedimentos')
+            except Exception as e:
+                traceback.print_exc()
+                status.finish(None, f"{type(e).__name__}: {e}")
+
+            if max_cycles and status.cycles >= max_cycles:
+                break
+            # Acorda de imediato se chegar um sinal durante a espera
+            stop.wait(max(0.0, interval - (time.monotonic() - start)))
+    finally:
+        state.close()
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+        print(f"👋 Daemon terminado após {status.cycles} ciclos")
+    return status
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--intervalo', type=float, default=DRE_DAEMON_INTERVAL,
+                        help='segundos entre o início de ciclos consecutivos')
+    parser.add_argument('--host', default=DRE_DAEMON_HOST, help='endereço do endpoint de estado')
+    parser.add_argument('--porta', type=int, default=DRE_DAEMON_PORT, help='porta do endpoint de estado (0 desativa)')
+    parser.add_argument('--ciclos', type=int, help='terminar após este número de ciclos')
+    args = parser.parse_args()
+
+    run_daemon(args.intervalo, args.host, args.porta, args.ciclos)
+
+if __name__ == "__main__":
+    main()
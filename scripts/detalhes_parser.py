@@ -0,0 +1,278 @@
+import re
+from datetime import datetime
+from typing import Dict, List, Optional, TypedDict
+
+# Versão do registo normalizado guardado em cada procedimento.
+# Incrementar sempre que o parser ou os campos normalizados mudarem, para forçar um novo parse.
+PARSER_VERSION = 1
+
+# Rótulos do texto de detalhes do DRE -> nome do campo extraído
+FIELD_LABELS = {
+    'Designação da entidade adjudicante:': 'entidade_adjudicante',
+    'NIPC:': 'nipc',
+    'Distrito:': 'distrito',
+    'Concelho:': 'concelho',
+    'Freguesia:': 'freguesia',
+    'Endereço da Entidade (URL):': 'site',
+    'Endereço Eletrónico:': 'email',
+    'Designação do contrato:': 'designacao_contrato',
+    'Descrição:': 'descricao',
+    'Preço base s/IVA:': 'preco_base',
+    'Prazo de execução do contrato:': 'prazo_execucao',
+    'Prazo para apresentação das propostas:': 'prazo_apresentacao_propostas',
+    'Têm fundos EU?': 'fundos_eu',
+    'Plataforma eletrónica utilizada pela entidade adjudicante:': 'plataforma_eletronica',
+    'URL para Apresentação:': 'url_procedimento',
+    'Número de referência interna:': 'numero_procedimento',
+    'Cargo:': 'autor_cargo',
+    'Data de Envio do Anúncio:': 'data_envio_anuncio',
+    'NUT III:': 'nut_iii',
+    'Vocabulário Principal:': 'cpv',
+    'Tipo de Procedimento:': 'tipo_procedimento',
+}
+
+# Campos devolvidos por parse_detalhes (além das secções)
+FIELDS = list(FIELD_LABELS.values()) + ['autor_nome']
+
+# Secção cujo primeiro campo "Nome:" identifica o autor do anúncio
+AUTHOR_SECTION = '28'
+AUTHOR_LABEL = 'Nome:'
+
+# Uma única regex (compilada uma vez) reconhece, no início de cada linha, os cabeçalhos
+# de secção ("13 - CONDIÇÕES DE APRESENTAÇÃO", com o "Nome:" do autor quando vem logo a seguir)
+# e os rótulos dos campos conhecidos. Começar por '\n' permite ao motor de regex saltar
+# diretamente entre linhas; tal como nas regex antigas, o valor pode estar na linha seguinte.
+_TOKEN_RE = re.compile(
+    r'\n(?:(\d{1,2}) - ([^\n]*)(?:\n' + re.escape(AUTHOR_LABEL) + r'\s*([^\n]+))?'
+    r'|(' + '|'.join(re.escape(label) for label in FIELD_LABELS) + r')\s*([^\n]+))'
+)
+_SECTION_RE = re.compile(r'\n\d{1,2} - ')
+_PAIR_RE = re.compile(r'^([^:?\n]+[:?])[ \t]*([^\n]*)', re.MULTILINE)
+_WHITESPACE_RE = re.compile(r'\s+')
+_DIGITS_RE = re.compile(r'^\d+')
+_DATE_RE = re.compile(r'^\d{2}-\d{2}-\d{4}')
+_PRICE_RE = re.compile(r'\d[\d.]*(?:,\d+)?')
+_CPV_RE = re.compile(r'^\d{8}')
+
+# Campos guardados em cada procedimento -> campo correspondente de parse_detalhes
+RECORD_FIELDS = {
+    'entidade': 'entidade_adjudicante',
+    'nipc': 'nipc',
+    'distrito': 'distrito',
+    'concelho': 'concelho',
+    'freguesia': 'freguesia',
+    'site': 'site',
+    'email': 'email',
+    'designacao_contrato': 'designacao_contrato',
+    'descricao': 'descricao',
+    'preco_base': 'preco_base',
+    'prazo_execucao': 'prazo_execucao',
+    'prazo_apresentacao_propostas': 'prazo_apresentacao_propostas',
+    'fundos_eu': 'fundos_eu',
+    'plataforma_eletronica': 'plataforma_eletronica',
+    'url_procedimento': 'url_procedimento',
+    'autor_nome': 'autor_nome',
+    'autor_cargo': 'autor_cargo'
+}
+
+# Campos normalizados acrescentados a cada procedimento (além de parser_version)
+NORMALIZED_FIELDS = [
+    'numero_referencia', 'preco_base_valor', 'prazo_propostas_iso', 'data_envio_iso',
+    'cpv', 'nut_iii', 'tipo_procedimento'
+]
+
+
+class Seccao(TypedDict):
+    numero: str
+    titulo: str
+
+
+class DetalhesProcedimento(TypedDict, total=False):
+    entidade_adjudicante: Optional[str]
+    nipc: Optional[str]
+    distrito: Optional[str]
+    concelho: Optional[str]
+    freguesia: Optional[str]
+    site: Optional[str]
+    email: Optional[str]
+    designacao_contrato: Optional[str]
+    descricao: Optional[str]
+    preco_base: Optional[str]
+    prazo_execucao: Optional[str]
+    prazo_apresentacao_propostas: Optional[str]
+    fundos_eu: Optional[str]
+    plataforma_eletronica: Optional[str]
+    url_procedimento: Optional[str]
+    numero_procedimento: Optional[str]
+    autor_nome: Optional[str]
+    autor_cargo: Optional[str]
+    data_envio_anuncio: Optional[str]
+    nut_iii: Optional[str]
+    cpv: Optional[str]
+    tipo_procedimento: Optional[str]
+    seccoes: List[Seccao]
+
+
+def _clean(value: str) -> str:
+    return _WHITESPACE_RE.sub(' ', value.strip())
+
+
+def parse_detalhes(details_text: str) -> DetalhesProcedimento:
+    """
+    Faz parse do texto de detalhes_completos numa única passagem.
+    Identifica as secções numeradas ("1 - IDENTIFICAÇÃO...") e preenche os campos
+    conhecidos com a primeira ocorrência de cada rótulo.
+    """
+    record: DetalhesProcedimento = {field: None for field in FIELDS}
+    seccoes: List[Seccao] = []
+    record['seccoes'] = seccoes
+    if not details_text:
+        return record
+
+    for numero, titulo, autor, label, value in _TOKEN_RE.findall('\n' + details_text):
+        if numero:
+            seccoes.append({'numero': numero, 'titulo': titulo.strip()})
+            if numero == AUTHOR_SECTION and autor and record['autor_nome'] is None:
+                record['autor_nome'] = _clean(autor)
+            continue
+
+        field = FIELD_LABELS[label]
+        if record[field] is not None:
+            continue
+
+        if field == 'nipc':
+            digits = _DIGITS_RE.match(value)
+            if digits:
+                record[field] = digits.group(0)
+        elif field == 'data_envio_anuncio':
+            date = _DATE_RE.match(value)
+            if date:
+                record[field] = date.group(0)
+        else:
+            record[field] = _clean(value)
+
+    return record
+
+
+def get_section(record: DetalhesProcedimento, numero: str) -> Optional[Seccao]:
+    """
+    Devolve a secção com o número indicado (ex: '13' para CONDIÇÕES DE APRESENTAÇÃO)
+    """
+    for seccao in record.get('seccoes', []):
+        if seccao['numero'] == numero:
+            return seccao
+    return None
+
+
+def section_fields(details_text: str, numero: str) -> Dict[str, str]:
+    """
+    Pares rótulo/valor de uma secção (primeira ocorrência de cada rótulo), calculados a pedido
+    """
+    heading = re.search(r'(?:^|\n)' + re.escape(numero) + r' - [^\n]*', details_text)
+    if not heading:
+        return {}
+    end = _SECTION_RE.search(details_text, heading.end())
+    fields = {}
+    for match in _PAIR_RE.finditer(details_text, heading.end(), end.start() if end else len(details_text)):
+        label, value = match.groups()
+        fields.setdefault(label[:-1].strip(), value.strip())
+    return fields
+
+
+def parse_preco(value: Optional[str]) -> Optional[float]:
+    """
+    Converte um preço no formato do DRE ("3.726.255,98 EUR") para número
+    """
+    if not value:
+        return None
+    match = _PRICE_RE.search(value)
+    if not match:
+        return None
+    try:
+        return float(match.group(0).replace('.', '').replace(',', '.'))
+    except ValueError:
+        return None
+
+
+def parse_prazo_iso(value: Optional[str]) -> Optional[str]:
+    """
+    Converte um prazo "DD-MM-YYYY HH:MM" (ou só "DD-MM-YYYY", até ao fim do dia) para ISO 8601
+    """
+    if not value:
+        return None
+    value = value.strip()
+    for fmt, default_time in (('%d-%m-%Y %H:%M', None), ('%d-%m-%Y', (23, 59))):
+        try:
+            dt = datetime.strptime(value[:16] if default_time is None else value[:10], fmt)
+        except ValueError:
+            continue
+        if default_time:
+            dt = dt.replace(hour=default_time[0], minute=default_time[1])
+        return dt.isoformat()
+    return None
+
+
+def parse_data_iso(value: Optional[str]) -> Optional[str]:
+    """
+    Converte uma data "DD-MM-YYYY" para ISO 8601 (YYYY-MM-DD)
+    """
+    if not value:
+        return None
+    try:
+        return datetime.strptime(value[:10], '%d-%m-%Y').date().isoformat()
+    except ValueError:
+        return None
+
+
+def build_record(details_text: str) -> Dict:
+    """
+    Cria o registo estruturado de um procedimento a partir do texto de detalhes:
+    os campos de texto guardados pelo extractor e os campos normalizados (preço numérico,
+    prazo e data de envio em ISO, CPV, NUT III, tipo de procedimento)
+    """
+    parsed = parse_detalhes(details_text)
+    record = {field: parsed.get(source) for field, source in RECORD_FIELDS.items()}
+    cpv = _CPV_RE.match(parsed.get('cpv') or '')
+    record.update({
+        'numero_referencia': parsed.get('numero_procedimento'),
+        'preco_base_valor': parse_preco(parsed.get('preco_base')),
+        'prazo_propostas_iso': parse_prazo_iso(parsed.get('prazo_apresentacao_propostas')),
+        'data_envio_iso': parse_data_iso(parsed.get('data_envio_anuncio')),
+        'cpv': cpv.group(0) if cpv else None,
+        'nut_iii': parsed.get('nut_iii'),
+        'tipo_procedimento': parsed.get('tipo_procedimento'),
+        'parser_version': PARSER_VERSION
+    })
+    return record
+
+
+def ensure_parsed(proc: Dict) -> Dict:
+    """
+    Garante que o procedimento tem o registo normalizado da versão atual do parser.
+    Só volta a fazer parse de detalhes_completos quando a versão guardada é diferente.
+    Atualiza e devolve o próprio dicionário.
+    """
+    if proc.get('parser_version') == PARSER_VERSION:
+        return proc
+    if proc.get('detalhes_completos'):
+        proc.update(build_record(proc['detalhes_completos']))
+    else:
+        # Sem texto de detalhes, normalizar a partir dos campos que existirem
+        proc.update({
+            'preco_base_valor': parse_preco(proc.get('preco_base')),
+            'prazo_propostas_iso': parse_prazo_iso(proc.get('prazo_apresentacao_propostas')),
+            'parser_version': PARSER_VERSION
+        })
+    return proc
+
+
+def get_data_envio(proc: Dict) -> Optional[str]:
+    """
+    Data de envio do anúncio (DD-MM-YYYY) de um procedimento, usando o campo normalizado
+    quando existe e fazendo parse de detalhes_completos apenas quando necessário
+    """
+    if proc.get('data_envio_iso'):
+        return datetime.strptime(proc['data_envio_iso'], '%Y-%m-%d').strftime('%d-%m-%Y')
+    if proc.get('data_envio_anuncio'):
+        return proc['data_envio_anuncio']
+    return parse_detalhes(proc.get('detalhes_completos') or '').get('data_envio_anuncio')
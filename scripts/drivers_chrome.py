@@ -0,0 +1,350 @@
+"""
+Drivers Chrome (Selenium) usados no scraping das páginas de detalhe.
+
+O caminho do chromedriver é resolvido pelo webdriver-manager uma única vez por processo e guardado
+em data/cache/chromedriver.json, pelo que as execuções seguintes não voltam a verificar a versão
+enquanto o ficheiro existir e tiver menos de DRE_CHROMEDRIVER_MAX_AGE_DAYS dias (se o Chrome for
+atualizado e o driver guardado deixar de arrancar, o caminho é resolvido de novo). DRE_CHROMEDRIVER
+indica um chromedriver já instalado e dispensa o webdriver-manager.
+
+O DriverPool mantém até `size` drivers partilhados entre as threads de scraping:
+- os drivers podem ser arrancados em segundo plano antes de serem precisos (warm, DRE_DRIVER_PREWARM);
+- um driver é substituído depois de DRE_DRIVER_MAX_PAGES páginas ou quando o Chrome (chromedriver
+  e processos filhos) ocupa mais de DRE_DRIVER_MAX_MEMORY_MB;
+- uma sessão morta (Chrome terminou ou deixou de responder) é substituída por um driver novo;
+- cada posição do pool regista páginas, arranques, reciclagens, reinícios e memória.
+A memória é lida de /proc, pelo que só é medida em Linux.
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+from typing import Dict, List, Optional
+
+from selenium import webdriver
+from selenium.common.exceptions import SessionNotCreatedException
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+from webdriver_manager.chrome import ChromeDriverManager
+
+from cache_detalhes import get_cache_dir
+from instrumentacao import count, timer
+
+# Caminho de um chromedriver já instalado (dispensa o webdriver-manager)
+DRE_CHROMEDRIVER = os.environ.get("DRE_CHROMEDRIVER", "")
+DRE_CHROMEDRIVER_MAX_AGE_DAYS = float(os.environ.get("DRE_CHROMEDRIVER_MAX_AGE_DAYS", 7))
+
+# Reciclagem dos drivers (0 desativa o respetivo limite)
+DRE_DRIVER_MAX_PAGES = int(os.environ.get("DRE_DRIVER_MAX_PAGES", 200))
+DRE_DRIVER_MAX_MEMORY_MB = float(os.environ.get("DRE_DRIVER_MAX_MEMORY_MB", 1024))
+# Arrancar em segundo plano os drivers de todos os workers quando a primeira página chega ao Selenium
+# (ou logo de início, com DRE_HTTP_FIRST=0); por omissão cada driver só arranca quando é pedido
+DRE_DRIVER_PREWARM = os.environ.get("DRE_DRIVER_PREWARM", "0") == "1"
+
+DRIVER_PATH_FILENAME = "chromedriver.json"
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36"
+
+_driver_path: Optional[str] = None
+# Se o caminho em memória foi resolvido agora pelo webdriver-manager (e não lido do ficheiro)
+_driver_path_fresh = False
+_driver_path_lock = threading.Lock()
+
+def get_driver_path_file() -> str:
+    return os.path.join(get_cache_dir(), DRIVER_PATH_FILENAME)
+
+def _read_saved_driver_path() -> Optional[str]:
+    path = get_driver_path_file()
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        return None
+    driver_path = saved.get('caminho')
+    age = time.time() - saved.get('resolvido', 0)
+    if not driver_path or not os.access(driver_path, os.X_OK):
+        return None
+    if DRE_CHROMEDRIVER_MAX_AGE_DAYS and age > DRE_CHROMEDRIVER_MAX_AGE_DAYS * 86400:
+        return None
+    return driver_path
+
+def _save_driver_path(driver_path: str):
+    path = get_driver_path_file()
+    try:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'caminho': driver_path, 'resolvido': time.time()}, f)
+    except OSError as e:
+        print(f"⚠️ Não foi possível guardar o caminho do chromedriver: {e}")
+
+def resolve_driver_path(refresh: bool = False) -> str:
+    """
+    Caminho do chromedriver: DRE_CHROMEDRIVER, o já resolvido neste processo, o guardado em
+    data/cache/ ou, em último caso (ou com refresh=True), o instalado pelo webdriver-manager
+    """
+    global _driver_path, _driver_path_fresh
+    if DRE_CHROMEDRIVER:
+        return DRE_CHROMEDRIVER
+    with _driver_path_lock:
+        if _driver_path and not refresh:
+            return _driver_path
+        saved = None if refresh else _read_saved_driver_path()
+        if saved:
+            _driver_path, _driver_path_fresh = saved, False
+            count('driver.caminho_guardado')
+        else:
+            with timer('driver.instalar'):
+                _driver_path = ChromeDriverManager().install()
+            _driver_path_fresh = True
+            _save_driver_path(_driver_path)
+        print(f"Usando Chrome WebDriver: {_driver_path}")
+        return _driver_path
+
+def chrome_options() -> Options:
+    options = Options()
+    options.add_argument("--headless")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--window-size=1920,1080")
+    options.add_argument("--disable-extensions")
+    options.add_argument("--disable-images")
+    options.add_argument("--log-level=3")
+    options.add_argument("--silent")
+    options.add_argument(f"user-agent={USER_AGENT}")
+    return options
+
+def setup_driver():
+    """
+    Configura e retorna um driver do Chrome (headless) com o chromedriver de resolve_driver_path
+    """
+    driver_path = resolve_driver_path()
+    try:
+        with timer('driver.iniciar'):
+            return webdriver.Chrome(service=Service(driver_path), options=chrome_options())
+    except SessionNotCreatedException:
+        # O driver guardado já não corresponde à versão do Chrome: resolver de novo e tentar outra vez
+        if DRE_CHROMEDRIVER or _driver_path_fresh:
+            raise
+        print("⚠️ O chromedriver guardado não arrancou, a resolver a versão de novo...")
+        driver_path = resolve_driver_path(refresh=True)
+        with timer('driver.iniciar'):
+            return webdriver.Chrome(service=Service(driver_path), options=chrome_options())
+
+def driver_alive(driver) -> bool:
+    """Se a sessão do driver ainda responde (o chromedriver está vivo e o Chrome executa comandos)"""
+    process = getattr(getattr(driver, 'service', None), 'process', None)
+    if process is not None and process.poll() is not None:
+        return False
+    try:
+        driver.execute_script("return 1")
+        return True
+    except Exception:
+        return False
+
+def _process_tree(root_pid: int) -> List[int]:
+    """O processo e todos os seus descendentes (lidos de /proc)"""
+    children: Dict[int, List[int]] = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat', 'r') as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # O nome do processo (2.º campo) pode ter espaços: os campos seguintes vêm depois do último ')'
+        ppid = int(stat.rsplit(')', 1)[1].split()[1])
+        children.setdefault(ppid, []).append(int(entry))
+    tree, pending = [], [root_pid]
+    while pending:
+        pid = pending.pop()
+        tree.append(pid)
+        pending.extend(children.get(pid, []))
+    return tree
+
+def driver_memory_mb(driver) -> Optional[float]:
+    """
+    Memória residente (MB) do chromedriver e dos processos Chrome que arrancou, ou None se não
+    for possível medir (sem /proc ou sem o processo do serviço)
+    """
+    process = getattr(getattr(driver, 'service', None), 'process', None)
+    if process is None or not os.path.isdir('/proc'):
+        return None
+    page_size = os.sysconf('SC_PAGE_SIZE')
+    total = 0
+    for pid in _process_tree(process.pid):
+        try:
+            with open(f'/proc/{pid}/statm', 'r') as f:
+                total += int(f.read().split()[1]) * page_size
+        except (OSError, IndexError, ValueError):
+            continue
+    return total / (1024 * 1024)
+
+
+class PooledDriver:
+    """
+    Driver em uso numa posição do pool, com o número de páginas servidas desde que arrancou
+    """
+    def __init__(self, driver, slot: int):
+        self.driver = driver
+        self.slot = slot
+        self.pages = 0
+        self.started = time.time()
+
+
+class DriverPool:
+    """
+    Pool limitado de drivers Chrome partilhado entre as threads de scraping.
+    Os drivers são criados a pedido (ou por warm), até ao tamanho máximo do pool, e substituídos
+    quando atingem os limites de páginas ou memória ou quando a sessão morre.
+    """
+    def __init__(self, size: int, max_pages: int = DRE_DRIVER_MAX_PAGES,
+                 max_memory_mb: float = DRE_DRIVER_MAX_MEMORY_MB):
+        self.size = max(1, size)
+        self.max_pages = max_pages
+        self.max_memory_mb = max_memory_mb
+        self._available = queue.Queue()
+        self._drivers: Dict[int, PooledDriver] = {}
+        self._free_slots = list(range(self.size))
+        self._warmers: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self.slots = [{'paginas': 0, 'arranques': 0, 'reciclagens': 0, 'reinicios': 0,
+                       'memoria_mb': None, 'memoria_max_mb': None} for _ in range(self.size)]
+        self.reset_stats()
+
+    def reset_stats(self):
+        """Contadores da execução atual (os de cada posição, em `slots`, acumulam durante a vida do pool)"""
+        self.stats = {'arranques': 0, 'reciclagens': 0, 'reinicios': 0, 'paginas': 0}
+
+    def _bump(self, slot: int, name: str, n: int = 1):
+        with self._lock:
+            self.stats[name] += n
+            self.slots[slot][name] += n
+
+    def _start(self, slot: int) -> PooledDriver:
+        """Arranca um driver na posição `slot` (já reservada); em caso de erro a posição fica livre"""
+        try:
+            driver = setup_driver()
+        except Exception:
+            with self._lock:
+                self._free_slots.append(slot)
+            raise
+        handle = PooledDriver(driver, slot)
+        with self._lock:
+            self._drivers[slot] = handle
+        self._bump(slot, 'arranques')
+        return handle
+
+    def _quit(self, handle: PooledDriver):
+        with self._lock:
+            self._drivers.pop(handle.slot, None)
+        try:
+            handle.driver.quit()
+        except Exception as e:
+            print(f"Erro ao fechar driver: {e}")
+
+    def _warm_slot(self, slot: int):
+        try:
+            self._available.put(self._start(slot))
+        except Exception as e:
+            print(f"⚠️ Erro ao pré-arrancar driver: {e}")
+
+    def warm(self, n: int = None):
+        """Arranca em segundo plano os drivers em falta até `n` (por omissão, o tamanho do pool)"""
+        target = self.size if n is None else min(n, self.size)
+        with self._lock:
+            missing = target - (self.size - len(self._free_slots))
+            slots = [self._free_slots.pop(0) for _ in range(max(0, missing))]
+        for slot in slots:
+            thread = threading.Thread(target=self._warm_slot, args=(slot,), name=f"dre-driver-{slot + 1}", daemon=True)
+            thread.start()
+            self._warmers.append(thread)
+
+    def acquire(self) -> PooledDriver:
+        """Obtém um driver livre, criando um novo se o pool ainda não estiver cheio"""
+        while True:
+            try:
+                return self._available.get_nowait()
+            except queue.Empty:
+                pass
+
+            with self._lock:
+                # Reservar a posição antes de arrancar o Chrome (que é lento)
+                slot = self._free_slots.pop(0) if self._free_slots else None
+            if slot is not None:
+                return self._start(slot)
+
+            # Pool cheio: esperar por um driver, voltando a verificar se entretanto um arranque falhou
+            try:
+                return self._available.get(timeout=1.0)
+            except queue.Empty:
+                continue
+
+    def page_done(self, handle: PooledDriver):
+        """Regista uma página servida pelo driver"""
+        handle.pages += 1
+        self._bump(handle.slot, 'paginas')
+
+    def restart(self, handle: PooledDriver, reason: str, crashed: bool = False) -> Optional[PooledDriver]:
+        """
+        Fecha o driver e arranca outro na mesma posição. Devolve o novo driver, ou None se não
+        arrancou (a posição fica livre para um arranque posterior).
+        """
+        print(f"  ♻️ Driver {handle.slot + 1} {'reiniciado' if crashed else 'reciclado'} "
+              f"após {handle.pages} páginas ({reason})")
+        self._bump(handle.slot, 'reinicios' if crashed else 'reciclagens')
+        self._quit(handle)
+        try:
+            return self._start(handle.slot)
+        except Exception as e:
+            print(f"Erro ao reiniciar driver: {e}")
+            return None
+
+    def _recycle_reason(self, handle: PooledDriver) -> Optional[str]:
+        if self.max_pages and handle.pages >= self.max_pages:
+            return f"limite de {self.max_pages} páginas"
+        memory = driver_memory_mb(handle.driver)
+        if memory is None:
+            return None
+        with self._lock:
+            slot = self.slots[handle.slot]
+            slot['memoria_mb'] = round(memory, 1)
+            slot['memoria_max_mb'] = round(max(memory, slot['memoria_max_mb'] or 0), 1)
+        if self.max_memory_mb and memory > self.max_memory_mb:
+            return f"{memory:.0f} MB de memória"
+        return None
+
+    def release(self, handle: PooledDriver):
+        """Devolve um driver ao pool, substituindo-o antes se atingiu os limites de páginas ou memória"""
+        reason = self._recycle_reason(handle)
+        if reason:
+            handle = self.restart(handle, reason)
+            if handle is None:
+                return
+        self._available.put(handle)
+
+    def close(self):
+        """Fecha todos os drivers criados (incluindo os que ainda estejam a arrancar em segundo plano)"""
+        for thread in self._warmers:
+            thread.join()
+        self._warmers = []
+        with self._lock:
+            handles = list(self._drivers.values())
+            self._free_slots = list(range(self.size))
+        self._available = queue.Queue()
+        for handle in handles:
+            self._quit(handle)
+
+    def summary_lines(self) -> List[str]:
+        lines = []
+        for slot, s in enumerate(self.slots):
+            if not s['arranques']:
+                continue
+            memory = (f"memória {s['memoria_mb']:.0f} MB (pico {s['memoria_max_mb']:.0f} MB)"
+                      if s['memoria_mb'] is not None else "memória n/d")
+            lines.append(f"driver {slot + 1}: {s['paginas']} páginas, {s['arranques']} arranques, "
+                         f"{s['reciclagens']} reciclagens, {s['reinicios']} reinícios, {memory}")
+        return lines
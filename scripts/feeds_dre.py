@@ -0,0 +1,182 @@
+"""
+Leitura dos feeds RSS do Diário da República com pedidos condicionais.
+
+Para cada URL são guardados os validadores da última resposta (ETag e Last-Modified) e o
+conteúdo, em data/cache/. Os pedidos seguintes enviam If-None-Match / If-Modified-Since: um
+feed que não mudou responde 304 sem corpo (ou, se o servidor ignorar os validadores, com o mesmo
+conteúdo, detetado pelo hash) e é reutilizado da cache. Os feeds são pedidos em simultâneo
+(asyncio, com um pedido requests por thread e um limite de DRE_FEED_CONCURRENCY).
+
+O estado só deve ser gravado (save_feed_state) depois de os feeds terem sido processados, para
+que uma execução interrompida volte a tratar os feeds alterados.
+
+Feeds (DRE_FEEDS, separados por vírgulas): URLs completos ou nomes relativos a DRE_RSS_BASE, ex:
+    DRE_FEEDS="serie2&parte=l-html.xml,serie2&parte=h-html.xml"
+
+Uso:
+    python feeds_dre.py           # verificar que feeds mudaram desde a última execução (não grava o estado)
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+
+import requests
+
+from cache_detalhes import get_cache_dir
+from instrumentacao import count, timer
+
+DRE_RSS_BASE = "https://files.diariodarepublica.pt/rss/"
+DRE_FEEDS = os.environ.get("DRE_FEEDS", "serie2&parte=l-html.xml")
+DRE_FEED_TIMEOUT = float(os.environ.get("DRE_FEED_TIMEOUT", 30))
+DRE_FEED_CONCURRENCY = int(os.environ.get("DRE_FEED_CONCURRENCY", 4))
+# Ignorar os validadores guardados e tratar todos os feeds como alterados
+DRE_FEEDS_FORCE = os.environ.get("DRE_FEEDS_FORCE", "0") == "1"
+
+FEED_STATE_FILENAME = "feeds_estado.json"
+FEED_CACHE_DIRNAME = "feeds"
+
+# Estados de um feed depois de pedido
+CHANGED = 'alterado'
+UNCHANGED = 'inalterado'
+FAILED = 'erro'
+
+def feed_urls(spec: str = None) -> List[str]:
+    """URLs dos feeds configurados (os nomes sem esquema são relativos a DRE_RSS_BASE)"""
+    urls = []
+    for entry in (spec if spec is not None else DRE_FEEDS).split(','):
+        entry = entry.strip()
+        if entry:
+            url = entry if '://' in entry else DRE_RSS_BASE + entry
+            if url not in urls:
+                urls.append(url)
+    return urls
+
+def get_feed_state_path() -> str:
+    return os.path.join(get_cache_dir(), FEED_STATE_FILENAME)
+
+def _body_path(url: str) -> str:
+    name = hashlib.sha1(url.encode('utf-8')).hexdigest()[:16]
+    return os.path.join(get_cache_dir(), FEED_CACHE_DIRNAME, f"{name}.xml")
+
+def _digest(content: str) -> str:
+    return hashlib.sha1(content.encode('utf-8')).hexdigest()
+
+def load_feed_state(path: str = None) -> Dict[str, Dict]:
+    path = path or get_feed_state_path()
+    if os.path.exists(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"⚠️ Estado dos feeds ilegível ({e}), a pedir todos os feeds")
+    return {}
+
+def save_feed_state(state: Dict[str, Dict], path: str = None):
+    path = path or get_feed_state_path()
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+def read_cached_body(url: str) -> Optional[str]:
+    path = _body_path(url)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
+def _write_cached_body(url: str, content: str):
+    path = _body_path(url)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(content)
+    os.replace(tmp, path)
+
+def fetch_conditional(url: str, entry: Optional[Dict], timeout: float = DRE_FEED_TIMEOUT) -> Dict:
+    """
+    Pede um feed com os validadores de `entry` (o estado anterior do URL).
+    Devolve {"url", "estado", "conteudo", "entrada"}: "conteudo" é o XML (da resposta ou da cache)
+    e "entrada" o novo estado do URL (None se o pedido falhou).
+    """
+    entry = entry or {}
+    cached = read_cached_body(url) if entry else None
+    headers = {}
+    # Os validadores só são enviados se o conteúdo correspondente ainda estiver em cache
+    if cached is not None:
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+
+    try:
+        response = requests.get(url, headers=headers, timeout=timeout)
+        if response.status_code == 304 and cached is not None:
+            return {'url': url, 'estado': UNCHANGED, 'conteudo': cached, 'entrada': dict(entry, verificado=time.time())}
+        response.raise_for_status()
+    except requests.RequestException as e:
+        print(f"Erro ao fazer fetch do RSS feed {url}: {e}")
+        return {'url': url, 'estado': FAILED, 'conteudo': cached, 'entrada': None}
+
+    content = response.text
+    digest = _digest(content)
+    new_entry = {
+        'etag': response.headers.get('ETag'),
+        'last_modified': response.headers.get('Last-Modified'),
+        'sha1': digest,
+        'verificado': time.time(),
+    }
+    if cached is not None and digest == entry.get('sha1'):
+        # O servidor não suporta pedidos condicionais (ou mudou só os cabeçalhos): o conteúdo é o mesmo
+        return {'url': url, 'estado': UNCHANGED, 'conteudo': cached, 'entrada': new_entry}
+    _write_cached_body(url, content)
+    return {'url': url, 'estado': CHANGED, 'conteudo': content, 'entrada': new_entry}
+
+async def poll_feeds_async(urls: List[str], state: Dict[str, Dict], force: bool = False,
+                           concurrency: int = DRE_FEED_CONCURRENCY) -> List[Dict]:
+    """Pede todos os feeds em simultâneo (até `concurrency` de cada vez), pela ordem de `urls`"""
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def poll(url: str) -> Dict:
+        async with semaphore:
+            return await asyncio.to_thread(fetch_conditional, url, None if force else state.get(url))
+
+    return await asyncio.gather(*(poll(url) for url in urls))
+
+def poll_feeds(urls: List[str] = None, state: Dict[str, Dict] = None,
+               force: bool = DRE_FEEDS_FORCE) -> Tuple[List[Dict], Dict[str, Dict]]:
+    """
+    Pede os feeds (por omissão, os de DRE_FEEDS) e devolve (resultados, novo estado).
+    Com force=True os validadores são ignorados e todos os feeds contam como alterados.
+    """
+    urls = urls or feed_urls()
+    state = load_feed_state() if state is None else state
+    with timer('rss.fetch'):
+        results = asyncio.run(poll_feeds_async(urls, state, force))
+
+    new_state = {url: entry for url, entry in state.items() if url in urls}
+    for result in results:
+        count(f"rss.feeds_{result['estado']}")
+        if result['entrada'] is not None:
+            new_state[result['url']] = result['entrada']
+    return results, new_state
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.parse_args()
+
+    start = time.perf_counter()
+    results, _ = poll_feeds()
+    for result in results:
+        size = len(result['conteudo'] or '')
+        print(f"{result['estado']:<11} {size / 1024:8.1f} KB  {result['url']}")
+    print(f"⏱️ {time.perf_counter() - start:.2f}s")
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,36 @@
+"""
+Feeds RSS das seeds e conjuntos de procedimentos de cada seed.
+
+    RSS/feed_filtros_seeds.xml       todos os procedimentos que correspondem a pelo menos uma seed
+    RSS/seeds/<CODIGO>.xml           feed de uma seed (nome do ficheiro: ver seed_file_name)
+    data/web/seeds/<CODIGO>.json     ids dos procedimentos da seed (usados pela interface)
+
+A correspondência é incremental: o estado da execução anterior (data/cache/seeds_estado.json)
+guarda a impressão digital de cada seed e de cada procedimento e os resultados de cada seed.
+As seeds novas ou alteradas são avaliadas contra todos os procedimentos; as restantes apenas
+contra os procedimentos novos ou alterados. Só são reescritos os ficheiros das seeds cujo
+resultado ou algum dos procedimentos mudou. Sem estado (ou com incremental=False) tudo é recalculado.
+"""
+
+import hashlib
 import json
 import os
-import xml.etree.ElementTree as ET
-from datetime import datetime
-from typing import List, Dict
-import html
 import re
-from xml.dom import minidom
+from typing import List, Dict, Optional, Set, Tuple
+
+from cache_detalhes import get_cache_dir
+from detalhes_parser import get_data_envio
+from indice_web import get_web_dir, procedure_id
+from normalizacao import NORMALIZATION_VERSION
+from rss_writer import RSSWriter, format_pub_date, write_feed_files
+from json_to_rss_converter import get_rss_targets
+from publicar import get_root_dir, publish
+from seed_matcher import SeedMatcher, compiled_matcher, seed_label
+
+SEED_FEEDS_DIRNAME = 'seeds'
+SEED_STATE_FILENAME = 'seeds_estado.json'
+# Campos da seed que determinam o resultado (comparados pela interface antes de usar os ids)
+SEED_DEFINITION_FIELDS = ('tags', 'titleTags', 'district')
 
 def load_seeds() -> List[Dict]:
     """Carrega as seeds do arquivo JSON"""
@@ -33,169 +58,35 @@ def load_seeds() -> List[Dict]:
     except:
         return []
 
-def procedure_matches_seed(proc: Dict, seed: Dict) -> bool:
-    """Verifica se um procedimento corresponde a uma seed"""
-    if seed.get('district'):
-        proc_district = proc.get('distrito', '').lower()
-        seed_district = seed['district'].lower()
-        if proc_district != seed_district:
-            return False
-
-    title_text = (proc.get('descricao') or proc.get('designacao_contrato') or '').lower()
-    
-    other_fields = [
-        proc.get('entidade', ''),
-        proc.get('entidade_adjudicante', ''),
-        proc.get('plataforma_eletronica', ''),
-        proc.get('nipc', ''),
-        proc.get('concelho', ''),
-        proc.get('freguesia', '')
-    ]
-    other_text = " ".join([str(f) for f in other_fields if f]).lower()
-    full_text = f"{title_text} {other_text}"
-
-    title_tags = seed.get('titleTags', [])
-    if title_tags:
-        if not any(tag.lower() in title_text for tag in title_tags):
-            return False
-
-    global_tags = seed.get('tags', [])
-    if global_tags:
-        if not any(tag.lower() in full_text for tag in global_tags):
-            return False
-            
-    return True
-
 def clean_url(url: str) -> str:
     """Limpa URLs de brancos e quebras de linha que invalidam o RSS"""
     if not url: return "https://diariodarepublica.pt"
     return str(url).strip().replace('\n', '').replace('\r', '').replace(' ', '%20')
 
-def generate_filtered_rss():
-    """Gera um arquivo RSS contendo apenas procedimentos que dão match com as seeds"""
-    print("📡 Gerando RSS filtrado personalizado...")
-    
-    # Tentar encontrar a pasta de dados
-    possible_paths = [
-        'data/ativos.json',
-        '../data/ativos.json',
-        'public/data/ativos.json',
-        '../public/data/ativos.json',
-        'ativos.json'
-    ]
-    
-    ativos_json = None
-    for path in possible_paths:
-        if os.path.exists(path):
-            ativos_json = path
-            break
-            
-    if not ativos_json:
-        print("Arquivo ativos.json não encontrado.")
-        return
-
-    try:
-        with open(ativos_json, 'r', encoding='utf-8') as f:
-            procedimentos = json.load(f)
-    except Exception as e:
-        print(f"Erro ao ler ativos.json: {e}")
-        return
-
-    seeds = load_seeds()
-    filtered_items = []
+FEED_TITLE = "DRE Procedimentos Filtrados (Seeds)"
+FEED_DESCRIPTION = "Feed RSS automatizado com base nas sementes de pesquisa parametrizadas."
+FEED_LINK = "https://sotkonhsilva.github.io/DRE-RSS_STK/"
+FEED_SELF_HREF = "https://sotkonhsilva.github.io/DRE-RSS_STK/RSS/feed_filtros_seeds.xml"
 
-    for item in procedimentos:
-        for seed in seeds:
-            if procedure_matches_seed(item, seed):
-                item['matched_seed'] = seed.get('name', seed.get('code'))
-                filtered_items.append(item)
-                break
+SEED_FEED_TITLE = "DRE Procedimentos - Seed {name}"
+SEED_FEED_DESCRIPTION = "Procedimentos ativos que correspondem à seed {code}."
+SEED_FEED_SELF_HREF = "https://sotkonhsilva.github.io/DRE-RSS_STK/RSS/seeds/{file}.xml"
 
-    # Criar elemento raiz do RSS
-    ET.register_namespace('atom', 'http://www.w3.org/2005/Atom')
-    rss = ET.Element('rss', version='2.0')
+def build_filtered_description_html(item: Dict) -> str:
+    """HTML da descrição (CDATA) de um item do feed filtrado"""
+    nipc = item.get('nipc', 'N/A')
+    entidade = item.get('entidade_adjudicante', item.get('entidade', 'N/A'))
+    designacao = item.get('descricao') or item.get('designacao_contrato') or "Procedimento sem título"
+    matched_seed = item.get('matched_seed', 'SEED')
+    price_val = item.get('preco_base', 'N/A')
+    plataforma = item.get('plataforma_eletronica', 'N/A')
+    concelho = item.get('concelho', 'N/A')
+    prazo = item.get('prazo_execucao', 'N/A')
     
-    # Criar canal
-    channel = ET.SubElement(rss, 'channel')
-    
-    ET.SubElement(channel, "title").text = "DRE Procedimentos Filtrados (Seeds)"
-    ET.SubElement(channel, "link").text = "https://sotkonhsilva.github.io/DRE-RSS_STK/"
-    ET.SubElement(channel, "description").text = "Feed RSS automatizado com base nas sementes de pesquisa parametrizadas."
-    ET.SubElement(channel, "language").text = "pt-PT"
-    ET.SubElement(channel, "lastBuildDate").text = datetime.now().strftime("%a, %d %b %Y %H:%M:%S GMT")
-
-    # Adicionar tag do gerador
-    ET.SubElement(channel, "generator").text = "Antigravity RSS Generator 1.0"
-
-    # Link atom para auto-descoberta
-    atom_link = ET.SubElement(channel, '{http://www.w3.org/2005/Atom}link')
-    atom_link.set('href', 'https://sotkonhsilva.github.io/DRE-RSS_STK/RSS/feed_filtros_seeds.xml')
-    atom_link.set('rel', 'self')
-    atom_link.set('type', 'application/rss+xml')
-
-    for i, item in enumerate(filtered_items):
-        rss_item = ET.SubElement(channel, "item")
-        
-        nipc = str(item.get('nipc', 'N/A')).strip()
-        entidade = str(item.get('entidade_adjudicante', item.get('entidade', 'N/A'))).strip()
-        designacao = str(item.get('descricao') or item.get('designacao_contrato') or "Procedimento sem título").strip()
-        matched_seed = str(item.get('matched_seed', 'SEED')).strip()
-        
-        # Escapar e limpar texto básico
-        def clean_text(t):
-            t = str(t)
-            # Remover caracteres de controle
-            t = "".join(ch for ch in t if ord(ch) >= 32 or ch in "\n\r\t")
-            return t
-
-        title_text = clean_text(f"[{matched_seed}] [{nipc}] {entidade} - {designacao}")
-        ET.SubElement(rss_item, "title").text = title_text
-        
-        link = clean_url(item.get('link', ''))
-        ET.SubElement(rss_item, "link").text = link
-        
-        # pubDate é CRITICO para Outlook
-        pub_date_elem = ET.SubElement(rss_item, "pubDate")
-        detalhes = item.get('detalhes_completos', '')
-        envio_match = re.search(r'Data de Envio do Anúncio:\s*(\d{2}-\d{2}-\d{4})', detalhes)
-        if envio_match:
-            try:
-                dt = datetime.strptime(envio_match.group(1), '%d-%m-%Y')
-                pub_date_elem.text = dt.strftime("%a, %d %b %Y 00:00:00 GMT")
-            except:
-                pub_date_elem.text = datetime.now().strftime("%a, %d %b %Y %H:%M:%S GMT")
-        else:
-            pub_date_elem.text = datetime.now().strftime("%a, %d %b %Y %H:%M:%S GMT")
-
-        # Placeholder para descrição
-        ET.SubElement(rss_item, "description").text = f"DESCRIPTION_CDATA_PLACEHOLDER_{i}"
-        
-        # GUID único (adiciona índice para evitar duplicatas se o link for igual)
-        guid = ET.SubElement(rss_item, "guid", isPermaLink="false")
-        guid.text = f"{link}#{i}"
-
-    # Gerar XML com minidom para formatação limpa
-    rough_string = ET.tostring(rss, 'utf-8')
-    reparsed = minidom.parseString(rough_string)
-    xml_str = reparsed.toxml(encoding='UTF-8').decode('utf-8')
+    c_link = clean_url(item.get('link', ''))
+    c_url_proc = clean_url(item.get('url_procedimento', ''))
     
-    # Processar CDATAs (em ordem inversa para evitar problemas com índices como 1 e 11)
-    reconstructed = xml_str
-    for i in range(len(filtered_items) - 1, -1, -1):
-        item = filtered_items[i]
-        nipc = item.get('nipc', 'N/A')
-        entidade = item.get('entidade_adjudicante', item.get('entidade', 'N/A'))
-        designacao = item.get('descricao') or item.get('designacao_contrato') or "Procedimento sem título"
-        matched_seed = item.get('matched_seed', 'SEED')
-        price_val = item.get('preco_base', 'N/A')
-        plataforma = item.get('plataforma_eletronica', 'N/A')
-        concelho = item.get('concelho', 'N/A')
-        prazo = item.get('prazo_execucao', 'N/A')
-        
-        c_link = clean_url(item.get('link', ''))
-        c_url_proc = clean_url(item.get('url_procedimento', ''))
-        
-        desc_html = f"""
+    return f"""
 <div style="font-family: Arial, sans-serif; background-color: #f8f9fa; padding: 15px; border: 1px solid #e0e6ed; border-radius: 8px;">
     <div style="background-color: #ffffff; padding: 12px; border-radius: 8px; margin-bottom: 15px; border-left: 5px solid #2a5298;">
         <div style="font-size: 11px; color: #2a5298; font-weight: bold; text-transform: uppercase;">{entidade}</div>
@@ -229,43 +120,265 @@ def generate_filtered_rss():
     </div>
 </div>
 """.strip()
-        reconstructed = reconstructed.replace(f"DESCRIPTION_CDATA_PLACEHOLDER_{i}", f"<![CDATA[{desc_html}]]>")
 
-    # Salvar o arquivo
-    # Tentar determinar as pastas de destino
-    targets = []
+def write_filtered_items(writer: RSSWriter, filtered_items: List[Dict]):
+    """Escreve o canal e um item por procedimento filtrado"""
+    writer.start(FEED_TITLE, FEED_LINK, FEED_DESCRIPTION, FEED_SELF_HREF)
+
+    for i, item in enumerate(filtered_items):
+        nipc = str(item.get('nipc', 'N/A')).strip()
+        entidade = str(item.get('entidade_adjudicante', item.get('entidade', 'N/A'))).strip()
+        designacao = str(item.get('descricao') or item.get('designacao_contrato') or "Procedimento sem título").strip()
+        matched_seed = str(item.get('matched_seed', 'SEED')).strip()
+        link = clean_url(item.get('link', ''))
+
+        writer.item(
+            title=f"[{matched_seed}] [{nipc}] {entidade} - {designacao}",
+            link=link,
+            # GUID único (adiciona índice para evitar duplicatas se o link for igual)
+            guid=f"{link}#{i}",
+            # pubDate é CRITICO para Outlook
+            pub_date=format_pub_date(get_data_envio(item)),
+            description_html=build_filtered_description_html(item)
+        )
+
+    writer.end()
+
+def write_seed_items(writer: RSSWriter, seed: Dict, items: List[Dict]):
+    """Escreve o feed de uma seed (o GUID é o link: o mesmo procedimento mantém o GUID entre execuções)"""
+    code = str(seed.get('code'))
+    writer.start(SEED_FEED_TITLE.format(name=seed_label(seed)), FEED_LINK,
+                 SEED_FEED_DESCRIPTION.format(code=code),
+                 SEED_FEED_SELF_HREF.format(file=seed_file_name(code)))
+
+    for item in items:
+        nipc = str(item.get('nipc', 'N/A')).strip()
+        entidade = str(item.get('entidade_adjudicante', item.get('entidade', 'N/A'))).strip()
+        designacao = str(item.get('descricao') or item.get('designacao_contrato') or "Procedimento sem título").strip()
+        link = clean_url(item.get('link', ''))
+
+        writer.item(
+            title=f"[{nipc}] {entidade} - {designacao}",
+            link=link,
+            guid=link,
+            pub_date=format_pub_date(get_data_envio(item)),
+            description_html=build_filtered_description_html({**item, 'matched_seed': seed_label(seed)})
+        )
+
+    writer.end()
+
+def seed_file_name(code: str) -> str:
+    """
+    Nome de ficheiro (sem extensão) de uma seed: o código, só com letras, dígitos, '-' e '_'.
+    Se o código tiver outros caracteres, leva também um hash curto (FNV-1a do código em UTF-8),
+    para que códigos como "A B" e "A_B" não partilhem o mesmo ficheiro. Replicado em scripts.js
+    e src/app/page.tsx (seedFileName).
+    """
+    code = str(code)
+    name = re.sub(r'[^A-Za-z0-9_-]', '_', code)
+    if name == code:
+        return name
+    digest = 0x811c9dc5
+    for byte in code.encode('utf-8'):
+        digest = ((digest ^ byte) * 0x01000193) & 0xffffffff
+    return f"{name}-{digest:08x}"
+
+def _fingerprint(data) -> str:
+    encoded = json.dumps(data, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8')
+    return hashlib.sha1(encoded).hexdigest()[:16]
+
+def procedure_fingerprint(proc: Dict) -> str:
+    """Impressão digital do registo (muda quando muda qualquer campo mostrado ou usado nas seeds)"""
+    return _fingerprint({k: v for k, v in proc.items() if k != 'termos'})
+
+def seed_fingerprint(seed: Dict) -> str:
+    """Impressão digital da definição da seed e da versão da normalização usada na correspondência"""
+    return _fingerprint([NORMALIZATION_VERSION, seed.get('name')] + [seed.get(k) for k in SEED_DEFINITION_FIELDS])
+
+def get_seed_state_path() -> str:
+    return os.path.join(get_cache_dir(), SEED_STATE_FILENAME)
+
+def load_seed_state(path: str) -> Dict:
+    if os.path.exists(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            print(f"⚠️ Estado das seeds ilegível ({e}), a recalcular tudo")
+    return {}
+
+def save_seed_state(path: str, state: Dict):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp, path)
+
+def update_seed_results(procedures: Dict[str, Dict], seeds: List[Dict],
+                        state: Dict) -> Tuple[Dict[str, List[str]], Set[str], Dict]:
+    """
+    Ids dos procedimentos de cada seed (pela ordem de `procedures`, {id: procedimento}), a partir
+    dos resultados guardados em `state` e avaliando apenas os pares que podem ter mudado.
+    Devolve (resultados, códigos das seeds cujos ficheiros têm de ser reescritos, novo estado).
+    """
+    proc_fps = {pid: procedure_fingerprint(proc) for pid, proc in procedures.items()}
+    old_procs = state.get('procedimentos', {})
+    changed = {pid for pid, fp in proc_fps.items() if old_procs.get(pid) != fp}
+    removed = set(old_procs) - set(proc_fps)
+
+    seed_fps = {seed['code']: seed_fingerprint(seed) for seed in seeds}
+    old_seeds = state.get('seeds', {})
+    old_results = state.get('resultados', {})
+    fresh = {code for code, fp in seed_fps.items() if old_seeds.get(code) != fp or code not in old_results}
+
+    results: Dict[str, Set[str]] = {}
+    for code in seed_fps:
+        results[code] = set() if code in fresh else set(old_results[code]) - removed - changed
+
+    # Procedimentos novos ou alterados contra todas as seeds
+    if changed:
+        matcher = compiled_matcher(seeds)
+        for pid in changed:
+            for seed in matcher.matches(procedures[pid]):
+                results[seed['code']].add(pid)
+
+    # Seeds novas ou alteradas contra os restantes procedimentos
+    fresh_seeds = [seed for seed in seeds if seed['code'] in fresh]
+    if fresh_seeds and len(changed) < len(procedures):
+        matcher = SeedMatcher(fresh_seeds)
+        for pid, proc in procedures.items():
+            if pid not in changed:
+                for seed in matcher.matches(proc):
+                    results[seed['code']].add(pid)
+
+    dirty = set(fresh)
+    for code, ids in results.items():
+        if ids != set(old_results.get(code, ())) or not ids.isdisjoint(changed):
+            dirty.add(code)
+
+    ordered = {code: [pid for pid in procedures if pid in ids] for code, ids in results.items()}
+    new_state = {'seeds': seed_fps, 'procedimentos': proc_fps, 'resultados': ordered}
+    return ordered, dirty, new_state
+
+def write_seed_outputs(seeds: List[Dict], procedures: Dict[str, Dict], results: Dict[str, List[str]],
+                       dirty: Set[str]) -> Dict[str, int]:
+    """
+    Escreve o feed RSS/seeds/<CODIGO>.xml e data/web/seeds/<CODIGO>.json das seeds em `dirty`
+    (ou cujos ficheiros não existem) e remove os ficheiros das seeds que deixaram de existir
+    """
+    feed_dirs = [os.path.join(rss_dir, SEED_FEEDS_DIRNAME) for rss_dir in get_rss_targets()]
+    web_dir = os.path.join(get_web_dir(os.path.join(get_root_dir(), 'data')), SEED_FEEDS_DIRNAME)
+    os.makedirs(web_dir, exist_ok=True)
+    stats = {'escritas': 0, 'inalteradas': 0, 'removidas': 0}
+
+    for seed in seeds:
+        name = seed_file_name(seed['code'])
+        feed_paths = [os.path.join(d, f"{name}.xml") for d in feed_dirs]
+        result_path = os.path.join(web_dir, f"{name}.json")
+        if seed['code'] not in dirty and os.path.exists(result_path) and all(os.path.exists(p) for p in feed_paths):
+            stats['inalteradas'] += 1
+            continue
+        items = [procedures[pid] for pid in results[seed['code']]]
+        write_feed_files(feed_paths, lambda writer: write_seed_items(writer, seed, items), verbose=False)
+        with open(result_path, 'w', encoding='utf-8') as f:
+            # A definição acompanha os ids: a interface só usa o resultado se a seed local for igual
+            definition = {k: seed.get(k) for k in SEED_DEFINITION_FIELDS}
+            json.dump({'code': seed['code'], 'definicao': definition, 'ids': results[seed['code']]},
+                      f, ensure_ascii=False)
+        stats['escritas'] += 1
+
+    current = {seed_file_name(seed['code']) for seed in seeds}
+    for directory, extension in [(d, '.xml') for d in feed_dirs] + [(web_dir, '.json')]:
+        if not os.path.isdir(directory):
+            continue
+        for filename in os.listdir(directory):
+            name, ext = os.path.splitext(filename)
+            if ext == extension and name not in current:
+                os.remove(os.path.join(directory, filename))
+                stats['removidas'] += 1
+    return stats
+
+def generate_filtered_rss(procedimentos: Optional[List[Dict]] = None, incremental: bool = True):
+    """
+    Gera o RSS com os procedimentos que dão match com as seeds e, para cada seed, o seu feed e
+    o conjunto de ids. procedimentos permite passar os ativos já carregados; se omitido, lê ativos.json.
+    """
+    print("📡 Gerando RSS filtrado personalizado...")
     
-    # Root paths
-    is_root = os.path.exists('package.json') or os.path.exists('RSS')
-    is_parent_root = os.path.exists('../package.json') or os.path.exists('../RSS')
-
-    if is_root:
-        targets.append('RSS')
-    elif is_parent_root:
-        targets.append('../RSS')
+    if procedimentos is None:
+        # Tentar encontrar a pasta de dados
+        possible_paths = [
+            'data/ativos.json',
+            '../data/ativos.json',
+            'public/data/ativos.json',
+            '../public/data/ativos.json',
+            'ativos.json'
+        ]
         
-    # Public paths
-    if os.path.exists('public'):
-        p = 'public/RSS'
-        if p not in targets: targets.append(p)
-    elif os.path.exists('../public'):
-        p = '../public/RSS'
-        if p not in targets: targets.append(p)
-
-    if not targets:
-        targets = ['RSS']
-
-    for rss_dir in targets:
-        output_path = os.path.join(rss_dir, "feed_filtros_seeds.xml")
+        ativos_json = None
+        for path in possible_paths:
+            if os.path.exists(path):
+                ativos_json = path
+                break
+                
+        if not ativos_json:
+            print("Arquivo ativos.json não encontrado.")
+            return
+
         try:
-            os.makedirs(rss_dir, exist_ok=True)
-            with open(output_path, 'w', encoding='utf-8') as f:
-                f.write(reconstructed)
-            print(f"✅ Feed filtrado salvo em: {output_path}")
+            with open(ativos_json, 'r', encoding='utf-8') as f:
+                procedimentos = json.load(f)
         except Exception as e:
-            print(f"❌ Erro ao salvar em {rss_dir}: {e}")
+            print(f"Erro ao ler ativos.json: {e}")
+            return
+
+    # Seeds com código (a primeira de cada código) e procedimentos por id, pela ordem dos ativos
+    seeds = []
+    seen_codes = set()
+    for seed in load_seeds():
+        if seed.get('code') and seed['code'] not in seen_codes:
+            seen_codes.add(seed['code'])
+            seeds.append(seed)
+    procedures: Dict[str, Dict] = {}
+    for item in procedimentos:
+        procedures.setdefault(procedure_id(item), item)
+
+    state_path = get_seed_state_path()
+    state = load_seed_state(state_path) if incremental else {}
+    results, dirty, new_state = update_seed_results(procedures, seeds, state)
+
+    # Feed combinado: cada procedimento uma vez, com todas as seeds a que corresponde
+    matched: Dict[str, List[str]] = {}
+    for seed in seeds:
+        for pid in results[seed['code']]:
+            matched.setdefault(pid, []).append(seed_label(seed))
+    filtered_items = []
+    for pid, item in procedures.items():
+        if pid in matched:
+            # Cópia rasa: a lista de ativos pode ser partilhada com o resto do pipeline
+            filtered_items.append({**item, 'matched_seed': ', '.join(matched[pid])})
+
+    # Salvar o arquivo na pasta RSS/ canónica
+    targets = get_rss_targets()
+
+    output_paths = [os.path.join(rss_dir, "feed_filtros_seeds.xml") for rss_dir in targets]
+    try:
+        write_feed_files(output_paths, lambda writer: write_filtered_items(writer, filtered_items))
+    except Exception as e:
+        print(f"❌ Erro ao salvar feed filtrado: {e}")
         
-    print(f"✅ RSS filtrado gerado em: {output_path} ({len(filtered_items)} itens)")
+    print(f"✅ RSS filtrado gerado em: {output_paths[0]} ({len(filtered_items)} itens)")
+
+    try:
+        stats = write_seed_outputs(seeds, procedures, results, dirty)
+        save_seed_state(state_path, new_state)
+        n_changed = sum(1 for pid, fp in new_state['procedimentos'].items()
+                        if state.get('procedimentos', {}).get(pid) != fp)
+        print(f"🌱 Seeds: {len(seeds)} ({n_changed} procedimentos novos ou alterados); feeds por seed: "
+              f"{stats['escritas']} escritos, {stats['inalteradas']} inalterados, {stats['removidas']} removidos")
+    except Exception as e:
+        print(f"❌ Erro ao gerar os feeds por seed: {e}")
 
 if __name__ == "__main__":
     generate_filtered_rss()
+    publish()
@@ -1,7 +1,27 @@
+"""
+Gestão do ficheiro data/ativos.json (procedimentos com prazo de apresentação ainda válido).
+
+Uso:
+    python gerir_ativos.py                              # teste com um ficheiro diário real
+    python gerir_ativos.py reconstruir [--workers N]    # reconstruir ativos.json a partir de todo o histórico
+    python gerir_ativos.py reconstruir --simular        # reconstruir sem escrever o ficheiro
+"""
+
+import argparse
+import heapq
 import json
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
-from typing import List, Dict
+from typing import Iterable, List, Dict, Optional, Tuple
+
+from detalhes_parser import ensure_parsed
+from indice_web import write_web_index
+from snapshots import SNAPSHOT_PATTERN, SnapshotStore, load_snapshot_file
+
+# Dia dos dados de ativos.json (fica em data/, versionado com o próprio ativos.json)
+ATIVOS_STATE_FILENAME = 'ativos_estado.json'
 
 def parse_date(date_str: str) -> datetime:
     """
@@ -14,23 +34,157 @@ def parse_date(date_str: str) -> datetime:
         # Se não conseguir fazer parse, retornar uma data muito antiga
         return datetime(1900, 1, 1)
 
-def is_procedure_active(procedure: Dict) -> bool:
+def procedure_deadline(procedure: Dict) -> Optional[datetime]:
     """
-    Verifica se um procedimento está ativo (prazo de apresentação ainda válido)
+    Prazo de apresentação de propostas como datetime (None se não existir ou não for válido)
     """
+    # Usar o prazo já normalizado pelo extractor (ISO 8601) quando existe
+    prazo_iso = procedure.get('prazo_propostas_iso')
+    if prazo_iso:
+        try:
+            return datetime.fromisoformat(prazo_iso)
+        except ValueError:
+            pass
+
     prazo_str = procedure.get('prazo_apresentacao_propostas')
     
     if not prazo_str or prazo_str == 'N/A':
-        return False
+        return None
     
-    try:
-        prazo_date = parse_date(prazo_str)
-        current_date = datetime.now()
-        
-        # Procedimento está ativo se o prazo for >= data atual
-        return prazo_date >= current_date
-    except:
+    return parse_date(prazo_str)
+
+def is_procedure_active(procedure: Dict, now: Optional[datetime] = None) -> bool:
+    """
+    Verifica se um procedimento está ativo (prazo de apresentação ainda válido)
+    """
+    prazo_date = procedure_deadline(procedure)
+    if prazo_date is None:
         return False
+    
+    # Procedimento está ativo se o prazo for >= data atual
+    return prazo_date >= (now or datetime.now())
+
+def snapshot_file_day(path: str) -> Optional[str]:
+    """Data ISO (YYYY-MM-DD) de um ficheiro diário DD-MM-YYYY(.delta).json, ou None se o nome não for de um dia"""
+    match = SNAPSHOT_PATTERN.match(os.path.basename(path))
+    if not match:
+        return None
+    return datetime.strptime(match.group(1), '%d-%m-%Y').date().isoformat()
+
+
+class ActiveIndex:
+    """
+    Conjunto incremental de procedimentos ativos, indexado por link e ordenado por prazo.
+
+    O prazo de cada procedimento é convertido uma única vez, ao inserir, e guardado num heap:
+    inserir custa O(log n) e expirar os procedimentos cujo prazo terminou é retirar da frente
+    do heap. Cada procedimento guarda o dia do ficheiro de onde veio, para que um ficheiro
+    antigo (de qualquer dia) nunca substitua uma versão mais recente do mesmo procedimento.
+
+    O índice é construído uma vez por processo (load) e depois atualizado no lugar: no modo
+    daemon fica em PipelineState entre ciclos, pelo que cada ciclo só converte os prazos dos
+    procedimentos do dia.
+    """
+    def __init__(self):
+        self._procs: Dict[str, Dict] = {}               # link -> procedimento (ordem de inserção)
+        self._entries: Dict[str, Tuple[datetime, int]] = {}  # link -> (prazo, sequência) em vigor
+        self._days: Dict[str, Optional[str]] = {}       # link -> dia (ISO) de onde veio o registo
+        self._heap: List[Tuple[datetime, int, str]] = []
+        self._seq = 0
+
+    def __len__(self) -> int:
+        return len(self._procs)
+
+    def __contains__(self, link: str) -> bool:
+        return link in self._procs
+
+    def deadline(self, link: str) -> Optional[datetime]:
+        entry = self._entries.get(link)
+        return entry[0] if entry else None
+
+    def add(self, proc: Dict, day: Optional[str] = None) -> bool:
+        """
+        Insere ou atualiza um procedimento. day é a data ISO do ficheiro de origem
+        (None = dados atuais, contam como de hoje). Devolve True se o link ainda não existia.
+        Procedimentos sem prazo válido são ignorados.
+        """
+        ensure_parsed(proc)
+        deadline = procedure_deadline(proc)
+        if deadline is None:
+            return False
+
+        day = day or datetime.now().date().isoformat()
+        link = proc.get('link', '')
+        is_new = link not in self._procs
+        if not is_new and day < self._days[link]:
+            return False
+
+        self._procs[link] = proc
+        self._days[link] = day
+        current = self._entries.get(link)
+        if current is None or current[0] != deadline:
+            self._seq += 1
+            self._entries[link] = (deadline, self._seq)
+            heapq.heappush(self._heap, (deadline, self._seq, link))
+        return is_new
+
+    def add_many(self, procs: Iterable[Dict], day: Optional[str] = None) -> int:
+        """Insere uma lista de procedimentos; devolve quantos links são novos"""
+        return sum(1 for proc in procs if self.add(proc, day))
+
+    def add_date_file(self, path: str) -> int:
+        """Insere os procedimentos de um ficheiro diário de qualquer dia (completo ou delta)"""
+        return self.add_many(load_snapshot_file(path), snapshot_file_day(path))
+
+    def discard(self, link: str):
+        # A entrada no heap fica obsoleta e é ignorada quando chegar à frente
+        self._procs.pop(link, None)
+        self._entries.pop(link, None)
+        self._days.pop(link, None)
+
+    def expire(self, now: Optional[datetime] = None) -> int:
+        """Remove os procedimentos cujo prazo já terminou; devolve quantos foram removidos"""
+        now = now or datetime.now()
+        removed = 0
+        heap = self._heap
+        while heap and heap[0][0] < now:
+            _, seq, link = heapq.heappop(heap)
+            entry = self._entries.get(link)
+            if entry is not None and entry[1] == seq:
+                self.discard(link)
+                removed += 1
+        # Compactar o heap quando as entradas obsoletas (prazos alterados, removidos) dominam
+        if len(heap) > 2 * len(self._entries) + 64:
+            self._heap = [(deadline, seq, link) for link, (deadline, seq) in self._entries.items()]
+            heapq.heapify(self._heap)
+        return removed
+
+    def latest_day(self) -> Optional[str]:
+        """Dia (ISO) dos dados mais recentes no índice, ou None se estiver vazio"""
+        return max(self._days.values(), default=None)
+
+    def records(self) -> List[Dict]:
+        """Procedimentos no índice pela ordem de inserção, sem expirar os terminados"""
+        return list(self._procs.values())
+
+    def procedures(self, now: Optional[datetime] = None) -> List[Dict]:
+        """Procedimentos ativos (depois de expirar os terminados), pela ordem de inserção"""
+        self.expire(now)
+        return self.records()
+
+    @classmethod
+    def from_ativos(cls, ativos: List[Dict], day: Optional[str] = None) -> 'ActiveIndex':
+        index = cls()
+        index.add_many(ativos, day)
+        return index
+
+    @classmethod
+    def load(cls) -> 'ActiveIndex':
+        """
+        Índice a partir do ativos.json existente. Os registos ficam com o dia dos dados guardado
+        com o ficheiro (ver save_ativos), para que só dados desse dia ou mais recentes os substituam.
+        """
+        return cls.from_ativos(load_existing_ativos(), load_ativos_day())
 
 def get_all_data_dirs():
     """
@@ -84,12 +238,33 @@ def load_existing_ativos() -> List[Dict]:
             return []
     return []
 
-def save_ativos(procedimentos_ativos: List[Dict]) -> str:
+def load_ativos_day() -> Optional[str]:
     """
-    Salva a lista de procedimentos ativos no arquivo ativos.json em todas as localizações encontradas
+    Dia (ISO) dos dados de ativos.json, guardado ao lado do ficheiro (o mtime não serve: num
+    checkout git é a hora do clone). Sem esse registo (ficheiros anteriores), usa o último
+    ficheiro diário de data/, escrito pela mesma execução que atualizou ativos.json.
     """
-    targets = get_all_data_dirs()
+    data_dir = get_data_dir()
+    try:
+        with open(os.path.join(data_dir, ATIVOS_STATE_FILENAME), 'r', encoding='utf-8') as f:
+            day = json.load(f).get('dia')
+        if day:
+            return day
+    except (OSError, ValueError, AttributeError):
+        pass
+    dates = SnapshotStore(data_dir).dates()
+    return snapshot_file_day(f"{dates[-1]}.json") if dates else None
+
+def save_ativos(procedimentos_ativos: List[Dict], day: Optional[str] = None) -> str:
+    """
+    Salva a lista de procedimentos ativos no arquivo ativos.json da pasta data/ canónica,
+    juntamente com os ficheiros da interface em data/web/ (a cópia em public/ é feita pelo
+    passo de publicação). day é o dia (ISO) dos dados mais recentes da lista (por omissão, hoje)
+    e fica guardado em ativos_estado.json para a próxima leitura (ActiveIndex.load).
+    """
+    targets = [get_data_dir()]
     last_file = ""
+    day = day or datetime.now().date().isoformat()
     
     for data_dir in targets:
         try:
@@ -97,10 +272,19 @@ def save_ativos(procedimentos_ativos: List[Dict]) -> str:
             ativos_file = os.path.join(data_dir, 'ativos.json')
             with open(ativos_file, 'w', encoding='utf-8') as f:
                 json.dump(procedimentos_ativos, f, ensure_ascii=False, indent=2)
+            with open(os.path.join(data_dir, ATIVOS_STATE_FILENAME), 'w', encoding='utf-8') as f:
+                json.dump({'dia': day}, f)
             print(f"✅ Arquivo ativos.json atualizado em: {ativos_file}")
             last_file = ativos_file
         except Exception as e:
             print(f"❌ Erro ao salvar ativos.json em {data_dir}: {e}")
+            continue
+
+        # Ficheiros estáticos da interface (resumo, índice de pesquisa e detalhes) a partir da mesma lista
+        try:
+            write_web_index(procedimentos_ativos, data_dir)
+        except Exception as e:
+            print(f"❌ Erro ao gerar o índice web em {data_dir}: {e}")
             
     return last_file
 
@@ -112,20 +296,30 @@ def update_ativos_from_date_file(date_file_path: str) -> List[Dict]:
     
     # Carregar procedimentos do arquivo de data
     try:
-        with open(date_file_path, 'r', encoding='utf-8') as f:
-            procedimentos = json.load(f)
+        procedimentos = load_snapshot_file(date_file_path)
     except Exception as e:
         print(f"❌ Erro ao carregar {date_file_path}: {e}")
         return []
     
     print(f"Carregados {len(procedimentos)} procedimentos do arquivo de data")
     
+    return filter_active_procedures(procedimentos)
+
+def filter_active_procedures(procedimentos: List[Dict]) -> List[Dict]:
+    """
+    Filtra os procedimentos com prazo de apresentação ainda válido (lista já carregada em memória)
+    """
+    # Registos de versões anteriores do parser ganham os campos normalizados (prazo ISO, preço, ...)
+    for proc in procedimentos:
+        ensure_parsed(proc)
+    
     # Filtrar apenas procedimentos ativos
     procedimentos_ativos = []
     procedimentos_expirados = 0
+    now = datetime.now()
     
     for proc in procedimentos:
-        if is_procedure_active(proc):
+        if is_procedure_active(proc, now):
             procedimentos_ativos.append(proc)
         else:
             procedimentos_expirados += 1
@@ -135,43 +329,119 @@ def update_ativos_from_date_file(date_file_path: str) -> List[Dict]:
     
     return procedimentos_ativos
 
-def merge_with_existing_ativos(procedimentos_ativos: List[Dict]) -> List[Dict]:
+def merge_with_existing_ativos(procedimentos_ativos: List[Dict], existing_ativos: Optional[List[Dict]] = None,
+                               index: Optional[ActiveIndex] = None) -> List[Dict]:
     """
-    Combina novos procedimentos ativos com os existentes, removendo duplicados
+    Combina novos procedimentos ativos com os existentes, removendo duplicados.
+    Com `index` (ex: o índice mantido pelo pipeline), o índice é atualizado no lugar e os
+    prazos dos existentes não voltam a ser convertidos. Sem ele, o índice é construído a partir
+    de existing_ativos ou, se omitido, de ativos.json (ActiveIndex.load).
+    Um procedimento que já existia é atualizado com a versão mais recente (ex: prazo prorrogado).
     """
-    existing_ativos = load_existing_ativos()
-    
-    if not existing_ativos:
-        return procedimentos_ativos
-    
-    print(f"Combinando com {len(existing_ativos)} procedimentos ativos existentes...")
+    if index is None:
+        index = ActiveIndex.load() if existing_ativos is None else ActiveIndex.from_ativos(existing_ativos)
     
-    # Criar um set de links para verificar duplicados
-    existing_links = {proc.get('link', '') for proc in existing_ativos}
+    if len(index):
+        print(f"Combinando com {len(index)} procedimentos ativos existentes...")
+    novos_procedimentos = index.add_many(procedimentos_ativos)
     
-    # Adicionar apenas procedimentos que não existem
-    novos_procedimentos = []
-    for proc in procedimentos_ativos:
-        if proc.get('link', '') not in existing_links:
-            novos_procedimentos.append(proc)
-    
-    # Combinar existentes + novos
-    todos_ativos = existing_ativos + novos_procedimentos
-    
-    # Verificar novamente quais estão ativos (pode ter expirado desde a última verificação)
-    ativos_finais = []
-    for proc in todos_ativos:
-        if is_procedure_active(proc):
-            ativos_finais.append(proc)
+    # Retirar os que expiraram desde a última verificação (frente do heap de prazos)
+    ativos_finais = index.procedures()
     
     print(f"✅ Total de procedimentos ativos após merge: {len(ativos_finais)}")
-    print(f"📈 Novos procedimentos adicionados: {len(novos_procedimentos)}")
+    print(f"📈 Novos procedimentos adicionados: {novos_procedimentos}")
     
     return ativos_finais
 
-def main():
+def snapshot_segments(store: SnapshotStore) -> List[List[str]]:
     """
-    Função principal para testar o script com dados reais
+    Divide os dias em segmentos independentes: cada um começa num snapshot completo e inclui
+    os deltas seguintes, que só podem ser reconstruídos a partir dele
+    """
+    segments: List[List[str]] = []
+    for date in store.dates():
+        if not segments or not store.is_delta(date):
+            segments.append([])
+        segments[-1].append(date)
+    return segments
+
+def _scan_segment(data_dir: str, dates: List[str], now: datetime) -> Tuple[List[str], int, Dict[str, tuple]]:
+    """
+    Worker da reconstrução: lê os dias de um segmento e devolve, por link, a versão mais recente
+    como (dia, posição, procedimento), com procedimento None se essa versão já expirou
+    """
+    store = SnapshotStore(data_dir)
+    latest: Dict[str, tuple] = {}
+    total = 0
+    for date in dates:
+        day = snapshot_file_day(f"{date}.json")
+        procedures = store.load(date)
+        total += len(procedures)
+        for position, proc in enumerate(procedures):
+            latest[proc.get('link', '')] = (day, position, proc)
+    # Só os ativos viajam de volta ao processo principal; os expirados ficam como marca
+    for link, (day, position, proc) in latest.items():
+        ensure_parsed(proc)
+        if not is_procedure_active(proc, now):
+            latest[link] = (day, position, None)
+    return dates, total, latest
+
+def rebuild_ativos(data_dir: str = None, workers: int = None, save: bool = True) -> List[Dict]:
+    """
+    Reconstrói ativos.json a partir de todos os ficheiros diários: lê os segmentos de snapshots
+    em paralelo (pool de processos), fica com a versão mais recente de cada link e mantém
+    apenas os procedimentos com prazo ainda válido
+    """
+    data_dir = data_dir or get_data_dir()
+    store = SnapshotStore(data_dir)
+    segments = snapshot_segments(store)
+    if not segments:
+        print(f"❌ Nenhum ficheiro diário encontrado em {data_dir}")
+        return []
+
+    n_files = sum(len(segment) for segment in segments)
+    print(f"🔁 Reconstruindo ativos.json a partir de {n_files} ficheiros diários "
+          f"({len(segments)} segmentos, {workers or os.cpu_count()} processos)...")
+    start = time.perf_counter()
+    now = datetime.now()
+
+    latest: Dict[str, tuple] = {}
+    total = 0
+    done = 0
+    next_report = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_scan_segment, data_dir, segment, now) for segment in segments]
+        for future in as_completed(futures):
+            dates, count, segment_latest = future.result()
+            total += count
+            done += len(dates)
+            for link, entry in segment_latest.items():
+                current = latest.get(link)
+                if current is None or entry[:2] > current[:2]:
+                    latest[link] = entry
+            # Progresso a cada ~5% dos ficheiros
+            if done >= next_report or done == n_files:
+                print(f"  [{done}/{n_files}] {total} registos lidos, {len(latest)} procedimentos distintos "
+                      f"({time.perf_counter() - start:.1f}s)")
+                next_report = done + max(1, n_files // 20)
+
+    # Inserir pela ordem cronológica em que os procedimentos apareceram
+    index = ActiveIndex()
+    for link, (day, position, proc) in sorted(latest.items(), key=lambda kv: kv[1][:2]):
+        if proc is not None:
+            index.add(proc, day)
+    ativos = index.procedures(now)
+    elapsed = time.perf_counter() - start
+
+    print(f"📊 {total} registos lidos, {len(latest)} procedimentos distintos, {len(ativos)} ativos")
+    print(f"⏱️ Reconstrução concluída em {elapsed:.2f}s")
+    if save:
+        save_ativos(ativos, index.latest_day())
+    return ativos
+
+def test_with_real_data():
+    """
+    Testa o script com dados reais (um ficheiro diário)
     """
     print("🔍 Testando gestão de procedimentos ativos com dados reais...")
     
@@ -185,14 +455,15 @@ def main():
     if os.path.exists(date_file_path):
         print(f"✅ Arquivo encontrado: {date_file_path}")
         
-        # Atualizar ativos a partir do arquivo real
-        procedimentos_ativos = update_ativos_from_date_file(date_file_path)
-        
-        # Combinar com existentes (se houver)
-        ativos_finais = merge_with_existing_ativos(procedimentos_ativos)
+        # Combinar os procedimentos do ficheiro (de qualquer dia) com os ativos existentes:
+        # um ficheiro mais antigo do que ativos.json não substitui as versões mais recentes
+        index = ActiveIndex.load()
+        novos = index.add_date_file(date_file_path)
+        ativos_finais = index.procedures()
+        print(f"📈 Novos procedimentos adicionados: {novos}")
         
         # Salvar arquivo ativos.json
-        ativos_file_path = save_ativos(ativos_finais)
+        ativos_file_path = save_ativos(ativos_finais, index.latest_day())
         
         if ativos_file_path:
             print(f"\n✅ Teste concluído com sucesso!")
@@ -220,5 +491,19 @@ def main():
                 if file.endswith('.json'):
                     print(f"  - {file}")
 
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest='comando')
+    r = subparsers.add_parser('reconstruir', help='reconstruir ativos.json a partir de todos os ficheiros diários')
+    r.add_argument('--data-dir', help='pasta com os ficheiros diários (por omissão, data/)')
+    r.add_argument('--workers', type=int, help='número de processos (por omissão, um por CPU)')
+    r.add_argument('--simular', action='store_true', help='não escrever ativos.json')
+    args = parser.parse_args()
+
+    if args.comando == 'reconstruir':
+        rebuild_ativos(args.data_dir, args.workers, save=not args.simular)
+    else:
+        test_with_real_data()
+
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
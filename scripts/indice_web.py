@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Ficheiros estáticos da interface web, gerados a partir dos procedimentos ativos.
+
+    data/web/resumo.json           listagem resumida: colunas da tabela e campos das seeds
+    data/web/indice/<xx>.json      índice de pesquisa: termos normalizados começados por "xx"
+    data/web/detalhes/<id>.json    registo completo de um procedimento (carregado ao expandir a linha)
+
+A interface carrega apenas o resumo, que inclui os campos usados pelas seeds (as seeds são
+avaliadas no browser com as regras de seed_matcher.py). Na pesquisa livre, cada palavra é
+normalizada como em normalizacao.py (scripts.js e page.tsx repetem a mesma normalização) e só o
+fragmento do índice com as suas duas primeiras letras é pedido; para cada termo, o índice guarda
+as posições (no resumo) dos procedimentos onde aparece.
+
+Só são reescritos os ficheiros cujo conteúdo mudou; fragmentos e detalhes que deixaram de
+existir são removidos. O resumo é escrito no fim e a sua "versao" (hash do conteúdo) é usada
+pela interface para não misturar fragmentos de gerações diferentes.
+
+Uso:
+    python indice_web.py              # gerar a partir de data/ativos.json
+    python indice_web.py --tamanhos   # gerar e comparar o tamanho com o de ativos.json
+"""
+
+import argparse
+import glob
+import gzip
+import hashlib
+import json
+import os
+import re
+from typing import Dict, List, Tuple
+
+from cache_detalhes import cache_key
+from detalhes_parser import get_data_envio
+from normalizacao import tokenize
+from seed_matcher import OTHER_FIELDS
+
+WEB_DIRNAME = 'web'
+
+# Colunas do resumo (nomes dos campos do registo, para a interface os usar sem conversão):
+# as colunas da tabela e os campos das seeds. "descricao" é o título (descrição ou designação)
+SUMMARY_FIELDS = ['id', 'descricao', 'plataforma_eletronica', 'distrito', 'preco_base',
+                  'prazo_apresentacao_propostas', 'publicacao'] + OTHER_FIELDS
+
+# Campos da pesquisa livre da interface
+SEARCH_FIELDS = ['descricao', 'designacao_contrato', 'entidade', 'entidade_adjudicante', 'plataforma_eletronica',
+                 'preco_base', 'prazo_apresentacao_propostas', 'nipc', 'distrito', 'concelho', 'freguesia',
+                 'site', 'email', 'numero_procedimento', 'prazo_execucao', 'fundos_eu', 'autor_nome',
+                 'autor_cargo', 'publicacao']
+
+# Campos internos do pipeline que não vão para os ficheiros de detalhes
+DETAIL_EXCLUDED = ('termos',)
+
+_SHARD_KEY_RE = re.compile(r'^[a-z0-9]{1,2}$')
+
+def get_web_dir(data_dir: str = None) -> str:
+    if data_dir is None:
+        from gerir_ativos import get_data_dir
+        data_dir = get_data_dir()
+    return os.path.join(data_dir, WEB_DIRNAME)
+
+def procedure_id(proc: Dict) -> str:
+    """
+    Identificador estável usado no nome do ficheiro de detalhes: o número do contrato no link
+    do DRE (ex: '32336-983504251') ou, se o link não tiver esse formato, um hash do link
+    """
+    key = cache_key(proc.get('link') or '')
+    match = re.search(r'contrato-publico/(\d+-\d+)$', key)
+    if match:
+        return match.group(1)
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+
+def shard_key(term: str) -> str:
+    """Fragmento do índice onde fica um termo (as duas primeiras letras; '_' para outros caracteres)"""
+    key = term[:2]
+    return key if _SHARD_KEY_RE.match(key) else '_'
+
+def publication_date(proc: Dict) -> str:
+    """Data de envio do anúncio como DD/MM/YYYY (ou '' se não existir)"""
+    data_envio = get_data_envio(proc)
+    return data_envio.replace('-', '/') if data_envio else ''
+
+def summary_row(proc: Dict, proc_id: str) -> List:
+    values = {
+        'id': proc_id,
+        'descricao': proc.get('descricao') or proc.get('designacao_contrato') or '',
+        'publicacao': publication_date(proc),
+    }
+    return [values[field] if field in values else (proc.get(field) or '') for field in SUMMARY_FIELDS]
+
+def search_text(proc: Dict, publicacao: str) -> str:
+    """Texto pesquisável de um procedimento (todos os campos da pesquisa livre)"""
+    fields = dict(proc, publicacao=publicacao)
+    return ' '.join(str(fields.get(field)) for field in SEARCH_FIELDS if fields.get(field))
+
+def build_web_index(procedimentos: List[Dict]) -> Tuple[Dict, Dict[str, Dict], Dict[str, Dict]]:
+    """
+    Resumo, fragmentos do índice ({chave: {termo: [posições no resumo]}}) e detalhes ({id: registo}).
+    Os procedimentos ficam no resumo do mais recente para o mais antigo (data de publicação).
+    """
+    rows = []
+    details = {}
+    for proc in procedimentos:
+        proc_id = procedure_id(proc)
+        if proc_id in details:
+            continue
+        details[proc_id] = {k: v for k, v in proc.items() if k not in DETAIL_EXCLUDED}
+        rows.append((proc, summary_row(proc, proc_id)))
+
+    publicacao_col = SUMMARY_FIELDS.index('publicacao')
+    rows.sort(key=lambda item: '-'.join(reversed(item[1][publicacao_col].split('/'))), reverse=True)
+
+    postings: Dict[str, List[int]] = {}
+    for position, (proc, row) in enumerate(rows):
+        for term in set(tokenize(search_text(proc, row[publicacao_col]))):
+            postings.setdefault(term, []).append(position)
+
+    shards: Dict[str, Dict] = {}
+    for term in sorted(postings):
+        shards.setdefault(shard_key(term), {})[term] = postings[term]
+
+    summary = {
+        'campos': SUMMARY_FIELDS,
+        'linhas': [row for _, row in rows],
+        'fragmentos': sorted(shards),
+    }
+    return summary, shards, details
+
+def _dumps(data) -> bytes:
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+def _write_if_changed(path: str, content: bytes) -> bool:
+    if os.path.exists(path) and os.path.getsize(path) == len(content):
+        with open(path, 'rb') as f:
+            if f.read() == content:
+                return False
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(content)
+    os.replace(tmp, path)
+    return True
+
+def _sync_dir(directory: str, files: Dict[str, bytes], stats: Dict[str, int]) -> None:
+    """Escreve os ficheiros alterados e remove os .json que já não fazem parte do conjunto"""
+    os.makedirs(directory, exist_ok=True)
+    for name, content in files.items():
+        if _write_if_changed(os.path.join(directory, name), content):
+            stats['escritos'] += 1
+        else:
+            stats['inalterados'] += 1
+    for path in glob.glob(os.path.join(directory, '*.json')):
+        if os.path.basename(path) not in files:
+            os.remove(path)
+            stats['removidos'] += 1
+
+def write_web_index(procedimentos: List[Dict], data_dir: str = None, verbose: bool = True) -> Dict[str, int]:
+    """
+    Gera os ficheiros estáticos da interface em data/web/ a partir da lista de ativos.
+    Detalhes e fragmentos são escritos antes do resumo, que os referencia.
+    """
+    web_dir = get_web_dir(data_dir)
+    summary, shards, details = build_web_index(procedimentos)
+
+    shard_files = {f"{key}.json": _dumps(terms) for key, terms in shards.items()}
+    detail_files = {f"{proc_id}.json": _dumps(record) for proc_id, record in details.items()}
+
+    version = hashlib.sha1()
+    for name in sorted(shard_files):
+        version.update(name.encode('utf-8'))
+        version.update(shard_files[name])
+    version.update(_dumps(summary))
+    summary = {'versao': version.hexdigest()[:12], **summary}
+
+    stats = {'escritos': 0, 'inalterados': 0, 'removidos': 0}
+    _sync_dir(os.path.join(web_dir, 'detalhes'), detail_files, stats)
+    _sync_dir(os.path.join(web_dir, 'indice'), shard_files, stats)
+    os.makedirs(web_dir, exist_ok=True)
+    if _write_if_changed(os.path.join(web_dir, 'resumo.json'), _dumps(summary)):
+        stats['escritos'] += 1
+    else:
+        stats['inalterados'] += 1
+
+    if verbose:
+        print(f"🔎 Índice web em {web_dir}: {len(summary['linhas'])} procedimentos, {len(shard_files)} fragmentos "
+              f"({stats['escritos']} escritos, {stats['inalterados']} inalterados, {stats['removidos']} removidos)")
+    return stats
+
+def _sizes(paths: List[str]) -> Tuple[int, int]:
+    """Tamanho total em bytes, sem compressão e com gzip"""
+    raw = packed = 0
+    for path in paths:
+        with open(path, 'rb') as f:
+            content = f.read()
+        raw += len(content)
+        packed += len(gzip.compress(content))
+    return raw, packed
+
+def print_sizes(data_dir: str) -> None:
+    """Compara o que a interface descarrega ao abrir a página antes (ativos.json) e agora (resumo.json)"""
+    web_dir = get_web_dir(data_dir)
+    shard_paths = glob.glob(os.path.join(web_dir, 'indice', '*.json'))
+    detail_paths = glob.glob(os.path.join(web_dir, 'detalhes', '*.json'))
+    rows = [
+        ('ativos.json', [os.path.join(data_dir, 'ativos.json')]),
+        ('resumo.json', [os.path.join(web_dir, 'resumo.json')]),
+        (f'índice ({len(shard_paths)} fragmentos)', shard_paths),
+        (f'detalhes ({len(detail_paths)} ficheiros)', detail_paths),
+    ]
+    print(f"\n{'ficheiro':<32} {'KB':>10} {'KB gzip':>10} {'KB/ficheiro':>12}")
+    print("-" * 67)
+    for label, paths in rows:
+        paths = [p for p in paths if os.path.exists(p)]
+        if not paths:
+            continue
+        raw, packed = _sizes(paths)
+        print(f"{label:<32} {raw / 1024:10.1f} {packed / 1024:10.1f} {raw / 1024 / len(paths):12.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data-dir', help='pasta data/ (por omissão, a da raiz do projeto)')
+    parser.add_argument('--tamanhos', action='store_true', help='mostrar o tamanho dos ficheiros gerados')
+    args = parser.parse_args()
+
+    from gerir_ativos import get_data_dir
+    data_dir = args.data_dir or get_data_dir()
+    ativos_file = os.path.join(data_dir, 'ativos.json')
+    if not os.path.exists(ativos_file):
+        print(f"❌ {ativos_file} não encontrado")
+        return
+    with open(ativos_file, 'r', encoding='utf-8') as f:
+        ativos = json.load(f)
+
+    write_web_index(ativos, data_dir)
+    if args.tamanhos:
+        print_sizes(data_dir)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+import cProfile
+import functools
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Perfilagem opcional: "cpu" (cProfile), "mem" (tracemalloc) ou "all"/"1" para ambos
+DRE_PROFILE = os.environ.get("DRE_PROFILE", "")
+DRE_PROFILE_TOP = int(os.environ.get("DRE_PROFILE_TOP", 25))
+
+REPORTS_DIRNAME = "relatorios"
+
+def get_reports_dir() -> str:
+    """
+    Retorna o diretório dos relatórios de execução (data/relatorios na raiz do projeto)
+    """
+    if os.path.exists('data') or os.path.exists('package.json'):
+        return os.path.join('data', REPORTS_DIRNAME)
+    if os.path.exists('../data') or os.path.exists('../package.json'):
+        return os.path.join('..', 'data', REPORTS_DIRNAME)
+    return os.path.join('data', REPORTS_DIRNAME)
+
+def parse_profile_modes(value: str) -> set:
+    modes = {m.strip().lower() for m in value.split(',') if m.strip()}
+    if modes & {'1', 'all', 'true'}:
+        return {'cpu', 'mem'}
+    return modes & {'cpu', 'mem'}
+
+def peak_rss_mb() -> Optional[float]:
+    """Pico de memória residente do processo (MB), quando o sistema o disponibiliza"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux devolve KB, macOS devolve bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+class RunReport:
+    """
+    Recolhe tempos, contadores e valores de uma execução e escreve-os num relatório JSON.
+    É seguro usar a partir de várias threads (os workers de scraping partilham o mesmo relatório).
+    """
+    def __init__(self, name: str = 'pipeline'):
+        self.name = name
+        self.started = datetime.now()
+        self._start = time.perf_counter()
+        self.timers: Dict[str, Dict[str, float]] = {}
+        self.counters: Dict[str, float] = {}
+        self.values: Dict[str, object] = {}
+        self._lock = threading.Lock()
+        self._profiler = None
+        self._tracemalloc = False
+        self.profile: Dict[str, object] = {}
+
+    def add_time(self, name: str, seconds: float):
+        with self._lock:
+            t = self.timers.get(name)
+            if t is None:
+                self.timers[name] = {'total': seconds, 'count': 1, 'min': seconds, 'max': seconds}
+            else:
+                t['total'] += seconds
+                t['count'] += 1
+                t['min'] = min(t['min'], seconds)
+                t['max'] = max(t['max'], seconds)
+
+    @contextmanager
+    def timer(self, name: str):
+        """Mede o bloco e acumula o tempo em `name`"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+
+    def count(self, name: str, n: float = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def update_counters(self, prefix: str, mapping: Dict[str, float]):
+        """Soma um dicionário de contadores (ex: cache.stats) com o prefixo indicado"""
+        for key, value in mapping.items():
+            self.count(f"{prefix}{key}", value)
+
+    def set(self, name: str, value):
+        with self._lock:
+            self.values[name] = value
+
+    def start_profiling(self, modes: str = None):
+        """Ativa cProfile e/ou tracemalloc conforme DRE_PROFILE (desligados por omissão)"""
+        modes = parse_profile_modes(DRE_PROFILE if modes is None else modes)
+        if 'mem' in modes and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._tracemalloc = True
+        if 'cpu' in modes:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+
+    def stop_profiling(self, output_dir: str = None, top: int = DRE_PROFILE_TOP):
+        """Desliga a perfilagem e guarda o resumo no relatório (e o .prof completo em output_dir)"""
+        if self._profiler is not None:
+            self._profiler.disable()
+            stats = pstats.Stats(self._profiler)
+            rows = sorted(stats.stats.items(), key=lambda kv: kv[1][3], reverse=True)[:top]
+            self.profile['cpu'] = [
+                {'funcao': f"{os.path.basename(file)}:{line}({func})", 'chamadas': nc,
+                 'tempo_proprio': round(tt, 4), 'tempo_acumulado': round(ct, 4)}
+                for (file, line, func), (cc, nc, tt, ct, callers) in rows
+            ]
+            if output_dir:
+                os.makedirs(output_dir, exist_ok=True)
+                prof_path = os.path.join(output_dir, f"{self._file_stem()}.prof")
+                stats.dump_stats(prof_path)
+                self.profile['cpu_ficheiro'] = prof_path
+            self._profiler = None
+
+        if self._tracemalloc:
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            self._tracemalloc = False
+            self.profile['mem_pico_mb'] = round(peak / (1024 * 1024), 2)
+            self.profile['mem'] = [
+                {'local': str(stat.traceback), 'mb': round(stat.size / (1024 * 1024), 3), 'blocos': stat.count}
+                for stat in snapshot.statistics('lineno')[:top]
+            ]
+
+    def to_dict(self) -> Dict:
+        peak = peak_rss_mb()
+        with self._lock:
+            timers = {
+                name: {'total': round(t['total'], 4), 'count': t['count'],
+                       'media': round(t['total'] / t['count'], 4),
+                       'min': round(t['min'], 4), 'max': round(t['max'], 4)}
+                for name, t in self.timers.items()
+            }
+            return {
+                'nome': self.name,
+                'inicio': self.started.isoformat(timespec='seconds'),
+                'duracao': round(time.perf_counter() - self._start, 3),
+                'python': sys.version.split()[0],
+                'memoria_pico_rss_mb': round(peak, 1) if peak is not None else None,
+                'tempos': timers,
+                'contadores': dict(self.counters),
+                'valores': dict(self.values),
+                'perfil': dict(self.profile),
+            }
+
+    def _file_stem(self) -> str:
+        return f"{self.name}_{self.started.strftime('%d-%m-%Y_%H%M%S')}"
+
+    def write(self, output_dir: str = None) -> Optional[str]:
+        """Escreve o relatório em data/relatorios/<nome>_DD-MM-YYYY_HHMMSS.json"""
+        output_dir = output_dir or get_reports_dir()
+        self.stop_profiling(output_dir)
+        try:
+            os.makedirs(output_dir, exist_ok=True)
+            path = os.path.join(output_dir, f"{self._file_stem()}.json")
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+            return path
+        except Exception as e:
+            print(f"❌ Erro ao escrever relatório de execução: {e}")
+            return None
+
+    def print_summary(self, prefix: str = 'etapa.'):
+        """Mostra o tempo de cada etapa (timers com o prefixo indicado) e o total"""
+        stages = {name[len(prefix):]: t['total'] for name, t in self.timers.items() if name.startswith(prefix)}
+        total = sum(stages.values())
+        print("⏱️ Tempo por etapa:")
+        for stage, seconds in stages.items():
+            share = (seconds / total * 100) if total else 0.0
+            print(f"  - {stage:<14} {seconds:8.2f}s ({share:4.1f}%)")
+        print(f"  - {'total':<14} {total:8.2f}s")
+        peak = peak_rss_mb()
+        if peak is not None:
+            print(f"  Pico de memória: {peak:.1f} MB")
+
+
+# Relatório da execução atual, partilhado por todos os módulos do pipeline
+run_report = RunReport()
+
+def reset_report(name: str = 'pipeline') -> RunReport:
+    """Começa um novo relatório (ex: uma nova execução dentro do mesmo processo)"""
+    global run_report
+    run_report = RunReport(name)
+    return run_report
+
+def timer(name: str):
+    return run_report.timer(name)
+
+def timed(name: str = None):
+    """Decorador que mede cada chamada no relatório em uso no momento da chamada"""
+    def decorator(func):
+        label = name or func.__name__
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with run_report.timer(label):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def count(name: str, n: float = 1):
+    run_report.count(name, n)
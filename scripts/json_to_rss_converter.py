@@ -1,51 +1,26 @@
+import io
 import json
-import re
-import xml.etree.ElementTree as ET
-from xml.dom import minidom
-from datetime import datetime
 from typing import Dict, List, Optional
 import os
 
+from detalhes_parser import FIELDS, NORMALIZED_FIELDS, parse_detalhes, ensure_parsed, get_data_envio
+from rss_writer import RSSWriter, format_pub_date, write_feed_files
+from publicar import get_root_dir, publish
+
+def _unescape(value: Optional[str]) -> Optional[str]:
+    """Remover caracteres especiais HTML"""
+    if not value:
+        return value
+    return value.replace('&lt;', '<').replace('&gt;', '>').replace('&amp;', '&')
+
 def extract_field_from_details(details_text: str, field_name: str) -> Optional[str]:
     """
-    Extrai um campo específico do texto de detalhes usando regex
+    Extrai um campo específico do texto de detalhes.
+    Para vários campos do mesmo texto, usar parse_detalhes diretamente (faz uma única passagem).
     """
-    patterns = {
-        'entidade_adjudicante': r'Designação da entidade adjudicante:\s*(.+?)(?:\n|$)',
-        'nipc': r'NIPC:\s*(\d+)',
-        'distrito': r'Distrito:\s*(.+?)(?:\n|$)',
-        'concelho': r'Concelho:\s*(.+?)(?:\n|$)',
-        'freguesia': r'Freguesia:\s*(.+?)(?:\n|$)',
-        'site': r'Endereço da Entidade \(URL\):\s*(.+?)(?:\n|$)',
-        'email': r'Endereço Eletrónico:\s*(.+?)(?:\n|$)',
-        'designacao_contrato': r'Designação do contrato:\s*(.+?)(?:\n|$)',
-        'descricao': r'Descrição:\s*(.+?)(?:\n|$)',
-        'preco_base': r'Preço base s/IVA:\s*(.+?)(?:\n|$)',
-        'prazo_execucao': r'Prazo de execução do contrato:\s*(.+?)(?:\n|$)',
-        'prazo_apresentacao_propostas': r'Prazo para apresentação das propostas:\s*(.+?)(?:\n|$)',
-        'fundos_eu': r'Têm fundos EU\?\s*(.+?)(?:\n|$)',
-        'plataforma_eletronica': r'Plataforma eletrónica utilizada pela entidade adjudicante:\s*(.+?)(?:\n|$)',
-        'url_procedimento': r'URL para Apresentação:\s*(.+?)(?:\n|$)',
-        'numero_procedimento': r'Número de referência interna:\s*(.+?)(?:\n|$)',
-        'autor_nome': r'28 - IDENTIFICAÇÃO DO\(S\) AUTOR\(ES\) DE ANÚNCIO\nNome:\s*(.+?)(?:\n|$)',
-        'autor_cargo': r'Cargo:\s*(.+?)(?:\n|$)'
-    }
-    
-    if field_name not in patterns:
+    if field_name not in FIELDS:
         return None
-    
-    pattern = patterns[field_name]
-    match = re.search(pattern, details_text, re.MULTILINE | re.DOTALL)
-    
-    if match:
-        value = match.group(1).strip()
-        # Limpar quebras de linha e espaços extras
-        value = re.sub(r'\s+', ' ', value)
-        # Remover caracteres especiais HTML
-        value = value.replace('&lt;', '<').replace('&gt;', '>').replace('&amp;', '&')
-        return value
-    
-    return None
+    return _unescape(parse_detalhes(details_text).get(field_name))
 
 def clean_url(url: str) -> str:
     """Limpa URLs de brancos e quebras de linha que invalidam o RSS"""
@@ -89,7 +64,9 @@ def parse_procedimento(proc: Dict) -> Dict:
             'autor_cargo': proc.get('autor_cargo', 'N/A')
         }
     
-    # Extrair informações específicas do texto de detalhes
+    # Usar os campos já guardados pelo extractor; o parse do texto só é refeito
+    # quando o registo foi criado por outra versão do parser
+    record = ensure_parsed(proc)
     extracted_info = {}
     fields = [
         'entidade_adjudicante', 'nipc', 'distrito', 'concelho', 'freguesia',
@@ -97,10 +74,14 @@ def parse_procedimento(proc: Dict) -> Dict:
         'prazo_execucao', 'prazo_apresentacao_propostas', 'fundos_eu', 'plataforma_eletronica', 'url_procedimento',
         'autor_nome', 'autor_cargo', 'numero_procedimento'
     ]
+    stored_names = {'entidade_adjudicante': 'entidade', 'numero_procedimento': 'numero_referencia'}
     
     for field in fields:
-        value = extract_field_from_details(detalhes_text, field)
+        value = _unescape(record.get(stored_names.get(field, field)))
         extracted_info[field] = value if value else 'N/A'
+    for field in NORMALIZED_FIELDS:
+        if field not in stored_names.values():
+            extracted_info[field] = record.get(field)
     
     return {
         'numero_procedimento': numero,
@@ -109,98 +90,24 @@ def parse_procedimento(proc: Dict) -> Dict:
         **extracted_info
     }
 
-def create_rss_feed(procedimentos: List[Dict]) -> str:
+FEED_TITLE = 'Feed RSS - Procedimentos DRE'
+FEED_DESCRIPTION = 'Feed RSS com procedimentos do Diário da República - Série II - Parte L'
+FEED_LINK = 'https://sotkonhsilva.github.io/DRE-RSS_STK/'
+FEED_SELF_HREF = 'https://sotkonhsilva.github.io/DRE-RSS_STK/RSS/feed_rss_procedimentos.xml'
+
+def build_description_html(proc: Dict) -> str:
     """
-    Cria um feed RSS a partir dos procedimentos processados
+    HTML da descrição (CDATA) de um procedimento no feed
     """
-    # Criar elemento raiz do RSS
-    ET.register_namespace('atom', 'http://www.w3.org/2005/Atom')
-    rss = ET.Element('rss', version='2.0')
-    
-    # Criar canal
-    channel = ET.SubElement(rss, 'channel')
-    
-    # Informações do canal
-    title = ET.SubElement(channel, 'title')
-    title.text = 'Feed RSS - Procedimentos DRE'
-    
-    description = ET.SubElement(channel, 'description')
-    description.text = 'Feed RSS com procedimentos do Diário da República - Série II - Parte L'
-    
-    link = ET.SubElement(channel, 'link')
-    link.text = 'https://sotkonhsilva.github.io/DRE-RSS_STK/'
-    
-    # Adicionar tag do gerador
-    ET.SubElement(channel, "generator").text = "Antigravity RSS Generator 1.0"
-    
-    # Link atom para auto-descoberta
-    atom_link = ET.SubElement(channel, '{http://www.w3.org/2005/Atom}link')
-    atom_link.set('href', 'https://sotkonhsilva.github.io/DRE-RSS_STK/RSS/feed_rss_procedimentos.xml')
-    atom_link.set('rel', 'self')
-    atom_link.set('type', 'application/rss+xml')
-    
-    language = ET.SubElement(channel, 'language')
-    language.text = 'pt-PT'
-    
-    pub_date = ET.SubElement(channel, 'lastBuildDate')
-    pub_date.text = datetime.now().strftime('%a, %d %b %Y %H:%M:%S GMT')
-    
-    # Adicionar cada procedimento como item
-    for i, proc in enumerate(procedimentos):
-        item = ET.SubElement(channel, 'item')
-        
-        nipc = str(proc.get('nipc', 'N/A')).strip()
-        entidade = str(proc.get('entidade_adjudicante', proc.get('entidade', 'N/A'))).strip()
-        designacao = str(proc.get('designacao_contrato', proc.get('descricao', 'N/A'))).strip()
-        if designacao == 'N/A' or not designacao:
-            designacao = "Procedimento sem título"
-            
-        item_title = ET.SubElement(item, 'title')
-        item_title.text = f"[{nipc}] {entidade} - {designacao}"
-        
-        c_link = clean_url(proc.get('link', ''))
-        ET.SubElement(item, 'link').text = c_link
-        
-        # GUID único
-        guid = ET.SubElement(item, 'guid')
-        guid.text = f"{c_link}#{i}"
-        guid.set('isPermaLink', 'false')
-        
-        pub_date_item = ET.SubElement(item, 'pubDate')
-        detalhes = proc.get('detalhes_completos', '')
-        envio_match = re.search(r'Data de Envio do Anúncio:\s*(\d{2}-\d{2}-\d{4})', detalhes)
-        if envio_match:
-            try:
-                dt = datetime.strptime(envio_match.group(1), '%d-%m-%Y')
-                pub_date_item.text = dt.strftime("%a, %d %b %Y 00:00:00 GMT")
-            except:
-                pub_date_item.text = datetime.now().strftime('%a, %d %b %Y %H:%M:%S GMT')
-        else:
-            pub_date_item.text = datetime.now().strftime('%a, %d %b %Y %H:%M:%S GMT')
-        
-        # Placeholder
-        item_description = ET.SubElement(item, 'description')
-        item_description.text = f"DESCRIPTION_CDATA_PLACEHOLDER_{i}"
-        
-    # Converter para string XML formatada usando minidom
-    rough_string = ET.tostring(rss, 'utf-8')
-    reparsed = minidom.parseString(rough_string)
-    xml_str = reparsed.toxml(encoding='UTF-8').decode('utf-8')
+    nipc = proc.get('nipc', 'N/A')
+    entidade = proc.get('entidade_adjudicante', proc.get('entidade', 'N/A'))
+    designacao = proc.get('designacao_contrato', proc.get('descricao', 'N/A'))
+    price_val = proc.get('preco_base', 'N/A')
+    plataforma = proc.get('plataforma_eletronica', 'N/A')
+    c_link = clean_url(proc.get('link', ''))
+    c_url_proc = clean_url(proc.get('url_procedimento', ''))
     
-    # Processar CDATAs (em ordem inversa para evitar problemas com índices como 1 e 11)
-    reconstructed = xml_str
-    
-    for i in range(len(procedimentos) - 1, -1, -1):
-        proc = procedimentos[i]
-        nipc = proc.get('nipc', 'N/A')
-        entidade = proc.get('entidade_adjudicante', proc.get('entidade', 'N/A'))
-        designacao = proc.get('designacao_contrato', proc.get('descricao', 'N/A'))
-        price_val = proc.get('preco_base', 'N/A')
-        plataforma = proc.get('plataforma_eletronica', 'N/A')
-        c_link = clean_url(proc.get('link', ''))
-        c_url_proc = clean_url(proc.get('url_procedimento', ''))
-        
-        desc_html = f"""
+    return f"""
 <div style="font-family: Arial, sans-serif; background-color: #f8f9fa; padding: 15px; border: 1px solid #e0e6ed; border-radius: 8px;">
     <div style="background-color: #ffffff; padding: 12px; border-radius: 8px; margin-bottom: 15px; border-left: 5px solid #2a5298;">
         <div style="font-size: 11px; color: #2a5298; font-weight: bold; text-transform: uppercase;">{entidade}</div>
@@ -221,11 +128,103 @@ def create_rss_feed(procedimentos: List[Dict]) -> str:
     </table>
 </div>
 """.strip()
-        reconstructed = reconstructed.replace(f"DESCRIPTION_CDATA_PLACEHOLDER_{i}", f"<![CDATA[{desc_html}]]>")
 
-    return reconstructed
+def write_rss_items(writer: RSSWriter, procedimentos: List[Dict]):
+    """
+    Escreve o canal e um item por procedimento processado
+    """
+    writer.start(FEED_TITLE, FEED_LINK, FEED_DESCRIPTION, FEED_SELF_HREF)
+    
+    for i, proc in enumerate(procedimentos):
+        nipc = str(proc.get('nipc', 'N/A')).strip()
+        entidade = str(proc.get('entidade_adjudicante', proc.get('entidade', 'N/A'))).strip()
+        designacao = str(proc.get('designacao_contrato', proc.get('descricao', 'N/A'))).strip()
+        if designacao == 'N/A' or not designacao:
+            designacao = "Procedimento sem título"
+        
+        c_link = clean_url(proc.get('link', ''))
+        writer.item(
+            title=f"[{nipc}] {entidade} - {designacao}",
+            link=c_link,
+            # GUID único
+            guid=f"{c_link}#{i}",
+            pub_date=format_pub_date(get_data_envio(proc)),
+            description_html=build_description_html(proc)
+        )
+    
+    writer.end()
+
+def create_rss_feed(procedimentos: List[Dict]) -> str:
+    """
+    Cria um feed RSS a partir dos procedimentos processados e devolve-o como string
+    """
+    buffer = io.StringIO()
+    write_rss_items(RSSWriter(buffer), procedimentos)
+    return buffer.getvalue()
+
+def write_rss_feed(procedimentos: List[Dict], output_paths: List[str]) -> int:
+    """
+    Escreve o feed RSS diretamente nos ficheiros de destino, item a item
+    """
+    return write_feed_files(output_paths, lambda writer: write_rss_items(writer, procedimentos))
 
 
+def get_rss_targets() -> List[str]:
+    """
+    Pastas de destino do feed: apenas a pasta RSS/ canónica na raiz (servida pelo GitHub Pages);
+    a cópia em public/RSS é feita pelo passo de publicação
+    """
+    return [os.path.join(get_root_dir(), 'RSS')]
+
+def build_rss_feed(dados: List[Dict], targets: List[str] = None, verbose: bool = False) -> Dict:
+    """
+    API do conversor: processa a lista de procedimentos já carregada em memória,
+    escreve o feed RSS nas pastas de destino e devolve estatísticas
+    """
+    # Processar cada procedimento
+    procedimentos_processados = []
+    for i, proc in enumerate(dados):
+        if verbose:
+            print(f"Processando procedimento {i+1}/{len(dados)}...")
+        proc_processado = parse_procedimento(proc)
+        procedimentos_processados.append(proc_processado)
+        
+        # Mostrar exemplo do primeiro procedimento
+        if i == 0:
+            print(f"  Exemplo - Entidade: {proc_processado.get('entidade', 'N/A')}")
+            print(f"  Exemplo - NIPC: {proc_processado.get('nipc', 'N/A')}")
+            print(f"  Exemplo - Preço: {proc_processado.get('preco_base', 'N/A')}")
+    
+    targets = targets or get_rss_targets()
+
+    # Criar feed RSS (escrito diretamente nos ficheiros de destino)
+    print("\nCriando feed RSS...")
+    paths = [os.path.join(rss_dir, 'feed_rss_procedimentos.xml') for rss_dir in targets]
+    items = write_rss_feed(procedimentos_processados, paths)
+
+    stats = {
+        'ficheiros': paths,
+        'total': len(procedimentos_processados),
+        'itens': items,
+        'com_entidade': len([p for p in procedimentos_processados if p.get('entidade') != 'N/A']),
+        'com_nipc': len([p for p in procedimentos_processados if p.get('nipc') != 'N/A']),
+        'com_preco': len([p for p in procedimentos_processados if p.get('preco_base') != 'N/A']),
+        'com_fundos_eu': len([p for p in procedimentos_processados if p.get('fundos_eu') and p.get('fundos_eu') != 'N/A']),
+    }
+    return stats
+
+def print_feed_stats(stats: Dict):
+    """Mostra as estatísticas devolvidas por build_rss_feed"""
+    print(f"\nFeed RSS criado com sucesso em {len(stats['ficheiros'])} localizações.")
+    print(f"Total de procedimentos processados: {stats['total']}")
+    
+    # Estatísticas
+    print("\nEstatísticas:")
+    print(f"- Procedimentos com entidade: {stats['com_entidade']}")
+    print(f"- Procedimentos com NIPC: {stats['com_nipc']}")
+    print(f"- Procedimentos com preço: {stats['com_preco']}")
+    print(f"- Procedimentos com fundos EU: {stats['com_fundos_eu']}")
+
 def main():
     """
     Função principal
@@ -260,67 +259,13 @@ def main():
     
     print(f"Carregados {len(dados)} procedimentos do JSON")
     
-    # Processar cada procedimento
-    procedimentos_processados = []
-    for i, proc in enumerate(dados):
-        print(f"Processando procedimento {i+1}/{len(dados)}...")
-        proc_processado = parse_procedimento(proc)
-        procedimentos_processados.append(proc_processado)
-        
-        # Mostrar exemplo do primeiro procedimento
-        if i == 0:
-            print(f"  Exemplo - Entidade: {proc_processado.get('entidade', 'N/A')}")
-            print(f"  Exemplo - NIPC: {proc_processado.get('nipc', 'N/A')}")
-            print(f"  Exemplo - Preço: {proc_processado.get('preco_base', 'N/A')}")
-    
-    # Criar feed RSS
-    print("\nCriando feed RSS...")
-    rss_content = create_rss_feed(procedimentos_processados)
-    
-    # Salvar feed RSS
-    # Tentar determinar as pastas de destino (Prioridade para ROOT/RSS para o GitHub Pages)
-    targets = []
-    
-    # Root paths
-    is_root = os.path.exists('package.json') or os.path.exists('RSS')
-    is_parent_root = os.path.exists('../package.json') or os.path.exists('../RSS')
-
-    if is_root:
-        targets.append('RSS')
-    elif is_parent_root:
-        targets.append('../RSS')
-        
-    # Public paths (for local dev dev next.js)
-    if os.path.exists('public'):
-        p = 'public/RSS'
-        if p not in targets: targets.append(p)
-    elif os.path.exists('../public'):
-        p = '../public/RSS'
-        if p not in targets: targets.append(p)
-
-    if not targets:
-        # Fallback para criar na raiz
-        targets = ['RSS']
-
-    for rss_dir in targets:
-        output_file = os.path.join(rss_dir, 'feed_rss_procedimentos.xml')
-        try:
-            os.makedirs(rss_dir, exist_ok=True)
-            with open(output_file, 'w', encoding='utf-8') as f:
-                f.write(rss_content)
-            print(f"✅ Feed RSS salvo em: {output_file}")
-        except Exception as e:
-            print(f"❌ Erro ao salvar em {rss_dir}: {e}")
-        
-    print(f"\nFeed RSS criado com sucesso em {len(targets)} localizações.")
-    print(f"Total de procedimentos processados: {len(procedimentos_processados)}")
-    
-    # Estatísticas
-    print("\nEstatísticas:")
-    print(f"- Procedimentos com entidade: {len([p for p in procedimentos_processados if p.get('entidade') != 'N/A'])}")
-    print(f"- Procedimentos com NIPC: {len([p for p in procedimentos_processados if p.get('nipc') != 'N/A'])}")
-    print(f"- Procedimentos com preço: {len([p for p in procedimentos_processados if p.get('preco_base') != 'N/A'])}")
-    print(f"- Procedimentos com fundos EU: {len([p for p in procedimentos_processados if p.get('fundos_eu') and p.get('fundos_eu') != 'N/A'])}")
+    try:
+        stats = build_rss_feed(dados, verbose=True)
+    except Exception as e:
+        print(f"❌ Erro ao salvar feed RSS: {e}")
+        return
+    print_feed_stats(stats)
+    publish()
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
@@ -9,23 +9,12 @@ import os
 from datetime import datetime
 from typing import List, Dict, Optional
 
+from publicar import get_root_dir, publish
+
 class SeedManager:
     def __init__(self):
-        self.targets = []
-        # Prioritize root for production/GitHub Pages
-        if os.path.exists('data') or os.path.exists('package.json'):
-            self.targets.append('data')
-        elif os.path.exists('../data') or os.path.exists('../package.json'):
-            self.targets.append('../data')
-            
-        # Also include public for local dev
-        if os.path.exists('public/data'):
-            if 'public/data' not in self.targets: self.targets.append('public/data')
-        elif os.path.exists('../public/data'):
-            if '../public/data' not in self.targets: self.targets.append('../public/data')
-            
-        if not self.targets:
-            self.targets = ['data']
+        # Seeds are stored once in the canonical data/ folder; public/ gets them via publish()
+        self.targets = [os.path.join(get_root_dir(), 'data')]
             
         # Principal directory for loading
         self.data_dir = self.targets[0]
@@ -59,6 +48,7 @@ class SeedManager:
                 print(f"✅ Seeds guardadas em {path}")
             except Exception as e:
                 print(f"❌ Erro ao guardar seeds em {d}: {e}")
+        publish()
     
     def add_seed(self, code: str, tags: List[str], district: str = None, name: str = None) -> bool:
         """Adicionar uma nova seed"""
@@ -0,0 +1,65 @@
+"""
+Normalização de texto em português para pesquisa e correspondência.
+
+    fold      minúsculas (casefold) e remoção de acentos: "Resíduos" -> "residuos"
+    stem      radical leve: plurais e género ("contentores" -> "contentor", "sanitária" -> "sanitari")
+    tokenize  fold + divisão em palavras + stem de cada palavra
+
+A normalização é leve de propósito (apenas flexões de número e género), para que palavras
+diferentes não colapsem no mesmo radical. Incrementar NORMALIZATION_VERSION sempre que o
+resultado mudar, para forçar a renormalização dos termos guardados nos registos.
+"""
+
+import re
+import unicodedata
+from typing import List
+
+NORMALIZATION_VERSION = 1
+
+_WORD_RE = re.compile(r'\w+')
+
+# Plurais (depois de remover acentos), do sufixo mais longo para o mais curto
+PLURAL_SUFFIXES = [
+    ('oes', 'ao'),   # construções -> construcao
+    ('aes', 'ao'),   # pães -> pao
+    ('ais', 'al'),   # materiais -> material
+    ('eis', 'el'),   # papéis -> papel
+    ('ois', 'ol'),   # lençóis -> lencol
+    ('res', 'r'),    # contentores -> contentor
+    ('ses', 's'),    # meses -> mes
+    ('zes', 'z'),    # vezes -> vez
+    ('ns', 'm'),     # nuvens -> nuvem
+]
+
+# Palavras até este tamanho (e as que têm dígitos, como "3m3") não são reduzidas
+MIN_STEM_LENGTH = 4
+
+def fold(text: str) -> str:
+    """Minúsculas sem acentos (ç -> c, ã -> a, ...)"""
+    decomposed = unicodedata.normalize('NFKD', str(text).casefold())
+    return ''.join(c for c in decomposed if not unicodedata.combining(c))
+
+def stem(word: str) -> str:
+    """Radical leve de uma palavra já sem acentos: remove o plural e a vogal final de género"""
+    if len(word) <= MIN_STEM_LENGTH - 1 or not word.isalpha():
+        return word
+    for suffix, replacement in PLURAL_SUFFIXES:
+        if word.endswith(suffix) and len(word) > MIN_STEM_LENGTH:
+            word = word[:-len(suffix)] + replacement
+            break
+    else:
+        if word.endswith('s') and not word.endswith('ss'):
+            word = word[:-1]
+    if len(word) > MIN_STEM_LENGTH and word[-1] in 'aeo':
+        word = word[:-1]
+    return word
+
+def tokenize(text: str) -> List[str]:
+    """Palavras normalizadas (sem acentos e reduzidas ao radical), pela ordem do texto"""
+    if not text:
+        return []
+    return [stem(word) for word in _WORD_RE.findall(fold(text))]
+
+def normalize(text: str) -> str:
+    """Texto normalizado como uma única string (palavras separadas por espaços)"""
+    return ' '.join(tokenize(text))
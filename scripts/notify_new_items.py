@@ -1,17 +1,87 @@
+"""
+Notificações por email dos procedimentos novos que correspondem às seeds.
+
+Cada destinatário subscreve as suas seeds e recebe um único email (resumo) com os procedimentos
+dessas seeds que ainda não lhe foram notificados (registo em registo_notificacoes.py). Todos os emails de uma execução são enviados pela mesma ligação SMTP
+autenticada (SMTPBatchSender), com um intervalo mínimo entre mensagens e novas tentativas,
+com religação, nos erros temporários (ligação perdida, timeout, respostas 4xx).
+
+Subscrições (EMAIL_SUBSCRIPTIONS, ou EMAIL_RECEIVER se não existir):
+    "ana@exemplo.pt=SEED1,SEED2; rui@exemplo.pt"   (sem "=" ou com "*": todas as seeds)
+ou o caminho de um ficheiro JSON [{"email": "...", "seeds": ["SEED1", ...]}]. As subscrições
+têm endereços de email: não devem ficar em data/, que é publicado.
+
+Para testar sem enviar emails reais, usar um servidor SMTP local, por exemplo:
+    python -m aiosmtpd -n -l localhost:1025
+    SMTP_SERVER=localhost SMTP_PORT=1025 SMTP_USER=dre@localhost SMTP_ALLOW_NO_AUTH=1 python test_email.py
+(sem SMTP_PASSWORD só se envia com SMTP_ALLOW_NO_AUTH=1, e sem login; STARTTLS só é usado se o
+servidor o suportar)
+"""
+
+import html
 import json
 import os
 import smtplib
+import time
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import datetime
-from typing import List, Dict
+from string import Template
+from typing import Callable, List, Dict, Optional, Set, Tuple
+
+from cache_detalhes import cache_key
+from instrumentacao import timer, count
+from registo_notificacoes import NotificationLedger
+from seed_matcher import compiled_matcher, seed_label
 
 # Configurações de Email (Devem ser configuradas como Secrets no GitHub ou env vars locais)
 SMTP_SERVER = os.environ.get("SMTP_SERVER", "smtp.gmail.com")
 SMTP_PORT = int(os.environ.get("SMTP_PORT", 587))
 SMTP_USER = os.environ.get("SMTP_USER")
 SMTP_PASSWORD = os.environ.get("SMTP_PASSWORD")
+# Permitir o envio sem SMTP_PASSWORD (sem login), apenas para servidores locais de teste
+SMTP_ALLOW_NO_AUTH = os.environ.get("SMTP_ALLOW_NO_AUTH", "0") == "1"
 EMAIL_RECEIVER = os.environ.get("EMAIL_RECEIVER", "jhsilva@sotkon.com")
+EMAIL_SUBSCRIPTIONS = os.environ.get("EMAIL_SUBSCRIPTIONS", "")
+
+# Envio em lote: intervalo mínimo entre mensagens (s), novas tentativas e espera inicial (s, duplica)
+SMTP_TIMEOUT = float(os.environ.get("SMTP_TIMEOUT", 30))
+SMTP_INTERVAL = float(os.environ.get("SMTP_INTERVAL", 1.0))
+SMTP_MAX_RETRIES = int(os.environ.get("SMTP_MAX_RETRIES", 3))
+SMTP_RETRY_DELAY = float(os.environ.get("SMTP_RETRY_DELAY", 5.0))
+
+# Código de subscrição que corresponde a todas as seeds
+ALL_SEEDS = '*'
+
+DIGEST_SUBJECT = Template("🔔 $count Novos Procedimentos DRE Encontrados - $date")
+
+DIGEST_TEMPLATE = Template("""
+    <html>
+    <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
+        <h2 style="color: #2a5298;">Novos Procedimentos Detectados</h2>
+        <p>Foram encontrados $count novos procedimentos correspondentes às suas seeds:</p>
+        <hr>
+$items
+        <p style="font-size: 0.8em; color: #777;">Este é um email automático enviado pelo Portal de Procedimentos DRE-RSS.</p>
+    </body>
+    </html>
+""")
+
+ITEM_TEMPLATE = Template("""
+        <div style="margin-bottom: 20px; padding: 15px; border-radius: 8px; background-color: #f9f9f9; border-left: 5px solid #2a5298;">
+            <h3 style="margin-top: 0; color: #2a5298;">$titulo</h3>
+            <p><strong>Seeds:</strong> $seeds</p>
+            <p><strong>Entidade:</strong> $entidade</p>
+            <p><strong>Preço Base:</strong> $preco_base</p>
+            <p><strong>Prazo:</strong> $prazo</p>
+            <p><strong>Local:</strong> $distrito - $concelho</p>
+            <p><a href="$link" style="display: inline-block; padding: 10px 20px; background-color: #2a5298; color: white; text-decoration: none; border-radius: 5px;">Ver Detalhes no DRE</a></p>
+        </div>
+""")
+
+def smtp_configured() -> bool:
+    """Se há credenciais SMTP para enviar (a palavra-passe só pode faltar com SMTP_ALLOW_NO_AUTH)"""
+    return bool(SMTP_USER and (SMTP_PASSWORD or SMTP_ALLOW_NO_AUTH))
 
 def load_seeds() -> List[Dict]:
     """Carrega as seeds do arquivo JSON de forma robusta"""
@@ -31,142 +101,314 @@ def load_seeds() -> List[Dict]:
                 pass
     return []
 
-def procedure_matches_seed(proc: Dict, seed: Dict) -> bool:
-    """Verifica se um procedimento corresponde a uma seed (Lógica idêntica ao scripts.js)"""
-    
-    # 1. Distrito
-    if seed.get('district'):
-        proc_district = proc.get('distrito', '').lower()
-        seed_district = seed['district'].lower()
-        if proc_district != seed_district:
-            return False
+def parse_subscriptions(spec: str) -> Dict[str, Set[str]]:
+    """
+    "ana@exemplo.pt=SEED1,SEED2; rui@exemplo.pt" -> {email: códigos das seeds}.
+    Sem "=" (ou com "*") o destinatário recebe todas as seeds.
+    """
+    subscriptions: Dict[str, Set[str]] = {}
+    for entry in spec.split(';'):
+        email, _, codes = entry.partition('=')
+        email = email.strip()
+        if not email:
+            continue
+        codes = {code.strip() for code in codes.split(',') if code.strip()} or {ALL_SEEDS}
+        subscriptions.setdefault(email, set()).update(codes)
+    return subscriptions
 
-    title_text = (proc.get('descricao') or proc.get('designacao_contrato') or '').lower()
-    
-    other_fields = [
-        proc.get('entidade', ''),
-        proc.get('entidade_adjudicante', ''),
-        proc.get('plataforma_eletronica', ''),
-        proc.get('nipc', ''),
-        proc.get('concelho', ''),
-        proc.get('freguesia', '')
-    ]
-    other_text = " ".join([str(f) for f in other_fields if f]).lower()
-    full_text = f"{title_text} {other_text}"
+def load_subscriptions() -> Dict[str, Set[str]]:
+    """Subscrições de EMAIL_SUBSCRIPTIONS (texto ou ficheiro JSON) ou, se não existir, de EMAIL_RECEIVER"""
+    spec = EMAIL_SUBSCRIPTIONS.strip()
+    if spec and os.path.isfile(spec):
+        try:
+            with open(spec, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+        except Exception as e:
+            print(f"❌ Erro ao ler as subscrições de {spec}: {e}")
+            return {}
+        subscriptions: Dict[str, Set[str]] = {}
+        for entry in entries:
+            if entry.get('email'):
+                codes = {str(code) for code in entry.get('seeds') or []} or {ALL_SEEDS}
+                subscriptions.setdefault(entry['email'], set()).update(codes)
+        return subscriptions
+    return parse_subscriptions(spec or EMAIL_RECEIVER or '')
 
-    # 2. Title Tags (Obrigatórias no título/descrição)
-    title_tags = seed.get('titleTags', [])
-    if title_tags:
-        if not any(tag.lower() in title_text for tag in title_tags):
-            return False
+def seed_code(seed: Dict) -> str:
+    return str(seed.get('code') or seed_label(seed))
 
-    # 3. Global Tags (Pelo menos uma em qualquer lugar)
-    global_tags = seed.get('tags', [])
-    if global_tags:
-        if not any(tag.lower() in full_text for tag in global_tags):
-            return False
-            
-    return True
+def build_digests(items: List[Dict], seeds: List[Dict], subscriptions: Dict[str, Set[str]],
+                  ledger: Optional[NotificationLedger] = None) -> Dict[str, List[Dict]]:
+    """
+    Procedimentos a enviar a cada destinatário: os que correspondem a pelo menos uma das suas
+    seeds, uma vez cada, com as seeds correspondentes em "matched_seed" e os seus códigos em
+    "matched_codes" (cópias dos itens). Com `ledger`, os pares (seed, destinatário) já
+    notificados para o procedimento são ignorados.
+    """
+    matcher = compiled_matcher(seeds)
+    matched = []
+    seen_keys = set()
+    for item in items:
+        key = cache_key(item.get('link') or '')
+        if key in seen_keys:
+            continue
+        seen_keys.add(key)
+        item_seeds = matcher.matches(item)
+        if item_seeds:
+            matched.append((key, item, item_seeds))
 
-def send_notification(new_items: List[Dict]):
-    """Envia email com os novos itens encontrados"""
-    if not EMAIL_RECEIVER or not SMTP_USER or not SMTP_PASSWORD:
-        print("⚠️ Configurações de email ausentes. Notificação ignorada.")
-        return
+    digests: Dict[str, List[Dict]] = {}
+    for email, codes in subscriptions.items():
+        entries = []
+        for key, item, item_seeds in matched:
+            mine = item_seeds if ALL_SEEDS in codes else [s for s in item_seeds if s.get('code') in codes]
+            if ledger is not None:
+                mine = [s for s in mine if (key, seed_code(s), email) not in ledger]
+            if mine:
+                entries.append({**item, 'matched_seed': ', '.join(seed_label(s) for s in mine),
+                                'matched_codes': [seed_code(s) for s in mine]})
+        if entries:
+            digests[email] = entries
+    return digests
+
+def ledger_entries(recipient: str, items: List[Dict]) -> List[Tuple[str, str, str]]:
+    """Triplos (procedimento, seed, destinatário) de um resumo, para o registo de notificações"""
+    return [(cache_key(item.get('link') or ''), code, recipient)
+            for item in items for code in item.get('matched_codes', [])]
+
+def render_digest(items: List[Dict]) -> str:
+    """Corpo HTML do resumo (valores escapados)"""
+    def field(item: Dict, *names: str, default: str = 'N/A') -> str:
+        value = next((item.get(name) for name in names if item.get(name)), default)
+        return html.escape(str(value))
+
+    rendered = [ITEM_TEMPLATE.substitute(
+        titulo=field(item, 'descricao', 'designacao_contrato', default='Sem descrição'),
+        seeds=field(item, 'matched_seed'),
+        entidade=field(item, 'entidade', 'entidade_adjudicante'),
+        preco_base=field(item, 'preco_base'),
+        prazo=field(item, 'prazo_apresentacao_propostas'),
+        distrito=field(item, 'distrito'),
+        concelho=field(item, 'concelho'),
+        link=html.escape(str(item.get('link') or '#'), quote=True),
+    ) for item in items]
+    return DIGEST_TEMPLATE.substitute(count=len(items), items=''.join(rendered))
 
+def build_message(recipient: str, items: List[Dict]) -> MIMEMultipart:
     msg = MIMEMultipart()
     msg['From'] = SMTP_USER
-    msg['To'] = EMAIL_RECEIVER
-    msg['Subject'] = f"🔔 Novos Procedimentos DRE Encontrados - {datetime.now().strftime('%d/%m/%Y')}"
+    msg['To'] = recipient
+    msg['Subject'] = DIGEST_SUBJECT.substitute(count=len(items), date=datetime.now().strftime('%d/%m/%Y'))
+    msg.attach(MIMEText(render_digest(items), 'html'))
+    return msg
 
-    # Construir corpo HTML
-    html = f"""
-    <html>
-    <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
-        <h2 style="color: #2a5298;">Novos Procedimentos Detectados</h2>
-        <p>Foram encontrados {len(new_items)} novos procedimentos correspondentes às suas seeds:</p>
-        <hr>
+def is_transient_error(error: Exception) -> bool:
+    """Erros em que vale a pena religar e tentar de novo (respostas 4xx, ligação perdida, timeout)"""
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        # Um código por destinatário (ex: 450 greylisting, 452 caixa cheia): só se todos forem 4xx
+        codes = [code for code, _ in error.recipients.values()]
+        return bool(codes) and all(400 <= code < 500 for code in codes)
+    if isinstance(error, smtplib.SMTPNotSupportedError):
+        return False
+    # SMTPServerDisconnected, timeouts e erros de socket (smtplib.SMTPException deriva de OSError)
+    return isinstance(error, OSError)
+
+
+class SMTPBatchSender:
     """
+    Envia várias mensagens por uma única ligação SMTP (STARTTLS e login uma só vez).
 
-    for item in new_items:
-        html += f"""
-        <div style="margin-bottom: 20px; padding: 15px; border-radius: 8px; background-color: #f9f9f9; border-left: 5px solid #2a5298;">
-            <h3 style="margin-top: 0; color: #2a5298;">{item.get('descricao') or item.get('designacao_contrato', 'Sem descrição')}</h3>
-            <p><strong>Entidade:</strong> {item.get('entidade') or item.get('entidade_adjudicante', 'N/A')}</p>
-            <p><strong>Preço Base:</strong> {item.get('preco_base', 'N/A')}</p>
-            <p><strong>Prazo:</strong> {item.get('prazo_apresentacao_propostas', 'N/A')}</p>
-            <p><strong>Local:</strong> {item.get('distrito', 'N/A')} - {item.get('concelho', 'N/A')}</p>
-            <p><a href="{item.get('link', '#')}" style="display: inline-block; padding: 10px 20px; background-color: #2a5298; color: white; text-decoration: none; border-radius: 5px;">Ver Detalhes no DRE</a></p>
-        </div>
-        """
+    A ligação é aberta no primeiro envio e reaproveitada até close(). Entre mensagens espera
+    pelo menos `interval` segundos; num erro temporário fecha a ligação e tenta de novo até
+    `max_retries` vezes, com espera crescente (retry_delay, 2x, 4x, ...).
+    """
+    def __init__(self, server: str = SMTP_SERVER, port: int = SMTP_PORT, user: Optional[str] = SMTP_USER,
+                 password: Optional[str] = SMTP_PASSWORD, interval: float = SMTP_INTERVAL,
+                 max_retries: int = SMTP_MAX_RETRIES, retry_delay: float = SMTP_RETRY_DELAY,
+                 timeout: float = SMTP_TIMEOUT, allow_no_auth: bool = SMTP_ALLOW_NO_AUTH):
+        self.server = server
+        self.port = port
+        self.user = user
+        self.password = password
+        self.interval = interval
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.timeout = timeout
+        self.allow_no_auth = allow_no_auth
+        self.stats = {'enviados': 0, 'falhados': 0, 'ligacoes': 0, 'repeticoes': 0}
+        self._smtp: Optional[smtplib.SMTP] = None
+        self._last_send: Optional[float] = None
+        # Erro definitivo ao ligar (ex: autenticação recusada): as mensagens seguintes nem tentam
+        self._connect_error: Optional[Exception] = None
 
-    html += """
-        <p style="font-size: 0.8em; color: #777;">Este é um email automático enviado pelo Portal de Procedimentos DRE-RSS.</p>
-    </body>
-    </html>
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _connect(self):
+        if not self.password and not self.allow_no_auth:
+            raise ValueError("SMTP_PASSWORD em falta (SMTP_ALLOW_NO_AUTH=1 permite enviar sem login)")
+        with timer('smtp.ligacao'):
+            smtp = smtplib.SMTP(self.server, self.port, timeout=self.timeout)
+            try:
+                smtp.ehlo()
+                if smtp.has_extn('starttls'):
+                    smtp.starttls()
+                    smtp.ehlo()
+                if self.password:
+                    smtp.login(self.user, self.password)
+            except Exception:
+                smtp.close()
+                raise
+        self._smtp = smtp
+        self.stats['ligacoes'] += 1
+        count('smtp.ligacoes')
+
+    def _throttle(self):
+        if self._last_send is not None:
+            wait = self.interval - (time.monotonic() - self._last_send)
+            if wait > 0:
+                time.sleep(wait)
+
+    def send(self, msg) -> bool:
+        """Envia uma mensagem; devolve False se falhar definitivamente (o lote continua)"""
+        if self._connect_error is not None:
+            self.stats['falhados'] += 1
+            count('smtp.erros')
+            return False
+        for attempt in range(self.max_retries + 1):
+            self._throttle()
+            connecting = self._smtp is None
+            try:
+                if connecting:
+                    self._connect()
+                with timer('smtp.envio'):
+                    self._smtp.send_message(msg)
+                self._last_send = time.monotonic()
+                self.stats['enviados'] += 1
+                count('smtp.emails')
+                return True
+            except Exception as e:
+                self._last_send = time.monotonic()
+                if not is_transient_error(e) or attempt == self.max_retries:
+                    self.stats['falhados'] += 1
+                    count('smtp.erros')
+                    print(f"❌ Erro ao enviar email para {msg['To']}: {e}")
+                    if connecting and self._smtp is None:
+                        self._connect_error = e
+                    # Uma resposta 5xx deixa a ligação utilizável; uma ligação em erro é reaberta
+                    if not isinstance(e, (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused)):
+                        self.close()
+                    return False
+                delay = self.retry_delay * (2 ** attempt)
+                print(f"⚠️ Erro temporário ao enviar para {msg['To']} ({e}); nova tentativa em {delay:g}s")
+                self.stats['repeticoes'] += 1
+                count('smtp.repeticoes')
+                self.close()
+                time.sleep(delay)
+        return False
+
+    def close(self):
+        if self._smtp is None:
+            return
+        try:
+            self._smtp.quit()
+        except Exception:
+            self._smtp.close()
+        self._smtp = None
+
+def send_digests(digests: Dict[str, List[Dict]], sender: Optional[SMTPBatchSender] = None,
+                 on_sent: Optional[Callable[[str, List[Dict]], None]] = None) -> Dict[str, int]:
     """
+    Envia um email por destinatário ({email: itens}), todos pela mesma ligação.
+    on_sent(destinatário, itens) é chamado logo após cada envio bem-sucedido.
+    """
+    if sender is None and not smtp_configured():
+        print("⚠️ Configurações de email ausentes. Notificação ignorada.")
+        return {'enviados': 0, 'falhados': 0}
 
-    msg.attach(MIMEText(html, 'html'))
+    sender = sender or SMTPBatchSender()
+    with sender:
+        for recipient, items in digests.items():
+            if sender.send(build_message(recipient, items)):
+                print(f"📧 Email enviado com sucesso para {recipient} ({len(items)} procedimentos)")
+                if on_sent is not None:
+                    on_sent(recipient, items)
+    return sender.stats
 
-    try:
-        server = smtplib.SMTP(SMTP_SERVER, SMTP_PORT)
-        server.starttls()
-        server.login(SMTP_USER, SMTP_PASSWORD)
-        server.send_message(msg)
-        server.quit()
-        print(f"📧 Email enviado com sucesso para {EMAIL_RECEIVER}")
-    except Exception as e:
-        print(f"❌ Erro ao enviar email: {e}")
-
-def notify_new_items(current_items: List[Dict]):
-    """Compara com os itens anteriores e notifica sobre os novos que dão match com as seeds"""
-    
-    # Localizar ativos.json de forma robusta
-    ativos_json = None
-    possible_ativos = [
-        os.path.join("data", "ativos.json"),
-        os.path.join("..", "data", "ativos.json")
-    ]
-    
-    for p in possible_ativos:
-        if os.path.exists(p):
-            ativos_json = p
-            break
+def send_notification(new_items: List[Dict], recipients: Optional[List[str]] = None) -> Dict[str, int]:
+    """Envia o mesmo email com os itens a cada destinatário (por omissão, todos os subscritores)"""
+    if recipients is None:
+        recipients = list(load_subscriptions())
+    if not recipients:
+        print("⚠️ Configurações de email ausentes. Notificação ignorada.")
+        return {'enviados': 0, 'falhados': 0}
+    return send_digests({recipient: new_items for recipient in recipients})
 
-    if not ativos_json:
-        print("Aviso: ativos.json não encontrado. Ignorando notificações.")
-        return
+def load_previous_ativos() -> List[Dict]:
+    """Ativos da execução anterior (data/ativos.json), ou [] se não existir"""
+    for path in (os.path.join("data", "ativos.json"), os.path.join("..", "data", "ativos.json")):
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except Exception as e:
+                print(f"Erro ao carregar ativos anteriores: {e}")
+    return []
 
-    try:
-        with open(ativos_json, 'r', encoding='utf-8') as f:
-            old_items = json.load(f)
-    except Exception as e:
-        print(f"Erro ao carregar ativos anteriores: {e}")
-        old_items = []
+def notify_new_items(current_items: List[Dict], old_items: Optional[List[Dict]] = None,
+                     ledger: Optional[NotificationLedger] = None, sender: Optional[SMTPBatchSender] = None):
+    """
+    Notifica cada destinatário dos procedimentos ativos das suas seeds que ainda não lhe foram
+    notificados, segundo o registo de notificações (registo_notificacoes.py).
 
-    old_links = {item.get('link') for item in old_items if item.get('link')}
-    
-    # Identificar itens que são realmente novos (não estavam no arquivo anterior)
-    brand_new_items = [item for item in current_items if item.get('link') not in old_links]
-    
-    if not brand_new_items:
-        print("Nenhum item novo encontrado em relação ao ativos.json anterior.")
+    old_items (os ativos anteriores; se omitido, lê ativos.json) só é usado na primeira execução
+    com o registo vazio, como linha de base: esses procedimentos contam como já notificados.
+    `sender` permite usar outra ligação SMTP que não a configurada por variáveis de ambiente.
+    """
+    subscriptions = load_subscriptions()
+    if not subscriptions or not smtp_configured():
+        print("⚠️ Configurações de email ausentes. Notificação ignorada.")
         return
 
-    # Carregar seeds e filtrar os novos itens
     seeds = load_seeds()
-    items_to_notify = []
-
-    for item in brand_new_items:
-        for seed in seeds:
-            if procedure_matches_seed(item, seed):
-                # Adicionar informação de qual seed deu match (opcional)
-                item['matched_seed'] = seed.get('name', seed.get('code'))
-                items_to_notify.append(item)
-                break # Notificar uma vez se der match em qualquer seed
-
-    if items_to_notify:
-        print(f"🎯 Foram encontrados {len(items_to_notify)} novos itens com match nas seeds!")
-        send_notification(items_to_notify)
-    else:
-        print("Novos itens encontrados, mas nenhum deu match com as seeds parametrizadas.")
+    own_ledger = ledger is None
+    if own_ledger:
+        ledger = NotificationLedger()
+    try:
+        if not ledger.initialized:
+            if old_items is None:
+                old_items = load_previous_ativos()
+            baseline = build_digests(old_items, seeds, subscriptions)
+            n_baseline = ledger.record(entry for recipient, items in baseline.items()
+                                       for entry in ledger_entries(recipient, items))
+            ledger.mark_initialized()
+            print(f"📒 Registo de notificações inicializado com {n_baseline} notificações dos ativos anteriores")
+
+        # Um resumo por destinatário, com os itens das suas seeds ainda não notificados
+        digests = build_digests(current_items, seeds, subscriptions, ledger)
+
+        if digests:
+            n_items = len({item.get('link') for items in digests.values() for item in items})
+            print(f"🎯 Foram encontrados {n_items} novos itens com match nas seeds "
+                  f"({len(digests)} de {len(subscriptions)} destinatários a notificar)!")
+            # Cada envio é registado de imediato: uma falha a meio do lote não repete os já enviados
+            stats = send_digests(digests, sender, on_sent=lambda recipient, items:
+                                 ledger.record(ledger_entries(recipient, items)))
+            if stats['falhados']:
+                print(f"⚠️ {stats['falhados']} emails não enviados ({stats['enviados']} enviados); "
+                      f"ficam para a próxima execução")
+        else:
+            print("Nenhum item novo com match nas seeds por notificar.")
+
+        ledger.touch(cache_key(item.get('link') or '') for item in list(current_items) + list(old_items or []))
+        ledger.compact()
+        count('notificacoes.consultas', ledger.stats['consultas'])
+        print(f"📒 Registo de notificações: {ledger.summary()}")
+    finally:
+        if own_ledger:
+            ledger.close()
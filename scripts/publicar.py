@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Armazenamento canónico e publicação para a interface web.
+
+Os dados são escritos uma única vez na raiz do projeto (data/ e RSS/, servidos pelo GitHub Pages).
+A pasta public/ (usada apenas pelo Next.js em desenvolvimento) recebe só os artefactos que a
+interface consome, como hardlinks para os ficheiros canónicos (ou cópias, se o sistema de
+ficheiros não suportar hardlinks), e apenas quando o conteúdo mudou.
+
+Uso:
+    python publicar.py                    # publicar os artefactos em public/
+    python publicar.py --migrar           # simular a deduplicação das árvores antigas em public/
+    python publicar.py --migrar --aplicar # aplicar a deduplicação
+"""
+
+import argparse
+import filecmp
+import fnmatch
+import glob
+import os
+import shutil
+from typing import Dict, List
+
+# Artefactos consumidos pela interface web (relativos à raiz do projeto)
+PUBLISHED_PATTERNS = [
+    'data/ativos.json',
+    'data/seeds.json',
+    'data/web/resumo.json',
+    'data/web/indice/*.json',
+    'data/web/detalhes/*.json',
+    'data/web/seeds/*.json',
+    'RSS/*.xml',
+    'RSS/seeds/*.xml',
+]
+
+PUBLIC_DIRNAME = 'public'
+
+def get_root_dir() -> str:
+    """
+    Raiz do projeto (onde ficam os dados canónicos data/ e RSS/), a partir da pasta atual ou de scripts/
+    """
+    if os.path.exists('package.json') or os.path.exists('data') or os.path.exists('RSS'):
+        return '.'
+    if os.path.exists('../package.json') or os.path.exists('../data') or os.path.exists('../RSS'):
+        return '..'
+    return '.'
+
+def published_files(root: str) -> List[str]:
+    """Caminhos (relativos à raiz) dos artefactos canónicos a publicar que existem"""
+    files = []
+    for pattern in PUBLISHED_PATTERNS:
+        for path in sorted(glob.glob(os.path.join(root, pattern))):
+            files.append(os.path.relpath(path, root))
+    return files
+
+def is_published(rel_path: str) -> bool:
+    rel_path = rel_path.replace(os.sep, '/')
+    return any(fnmatch.fnmatch(rel_path, pattern) for pattern in PUBLISHED_PATTERNS)
+
+def same_content(a: str, b: str) -> bool:
+    if not (os.path.exists(a) and os.path.exists(b)):
+        return False
+    if os.path.samefile(a, b):
+        return True
+    return os.path.getsize(a) == os.path.getsize(b) and filecmp.cmp(a, b, shallow=False)
+
+def link_or_copy(src: str, dst: str) -> str:
+    """
+    Substitui dst por um hardlink para src (ou por uma cópia, se não for possível).
+    Devolve 'ligado' ou 'copiado'.
+    """
+    os.makedirs(os.path.dirname(dst) or '.', exist_ok=True)
+    tmp = dst + '.tmp'
+    if os.path.exists(tmp):
+        os.remove(tmp)
+    try:
+        os.link(src, tmp)
+        mode = 'ligado'
+    except OSError:
+        shutil.copyfile(src, tmp)
+        mode = 'copiado'
+    os.replace(tmp, dst)
+    return mode
+
+def publish(root: str = None, verbose: bool = True) -> Dict[str, int]:
+    """
+    Materializa em public/ os artefactos web a partir dos ficheiros canónicos.
+    Só toca nos ficheiros cujo conteúdo mudou e remove os que já não existem na origem.
+    Não faz nada se a pasta public/ não existir.
+    """
+    root = root or get_root_dir()
+    public_dir = os.path.join(root, PUBLIC_DIRNAME)
+    stats = {'ligados': 0, 'copiados': 0, 'inalterados': 0, 'removidos': 0}
+    if not os.path.isdir(public_dir):
+        return stats
+
+    for rel_path in published_files(root):
+        src = os.path.join(root, rel_path)
+        dst = os.path.join(public_dir, rel_path)
+        if same_content(src, dst):
+            stats['inalterados'] += 1
+            continue
+        mode = link_or_copy(src, dst)
+        stats['ligados' if mode == 'ligado' else 'copiados'] += 1
+
+    # Artefactos que deixaram de existir na origem (ex: detalhes de procedimentos expirados)
+    for rel_path in set(published_files(public_dir)) - set(published_files(root)):
+        os.remove(os.path.join(public_dir, rel_path))
+        stats['removidos'] += 1
+
+    if verbose:
+        print(f"🌐 Publicação em {public_dir}: {stats['ligados']} hardlinks, "
+              f"{stats['copiados']} cópias, {stats['inalterados']} inalterados, {stats['removidos']} removidos")
+    return stats
+
+def deduplicate(root: str = None, apply: bool = False) -> Dict[str, int]:
+    """
+    Migração das árvores duplicadas public/data e public/RSS:
+    - artefactos web idênticos ao canónico passam a hardlink (os diferentes são republicados);
+    - restantes ficheiros idênticos ao canónico são removidos de public/;
+    - ficheiros que só existem em public/ são movidos para a localização canónica;
+    - ficheiros com conteúdo diferente do canónico são mantidos e apenas reportados.
+    Sem apply=True apenas mostra o que seria feito.
+    """
+    root = root or get_root_dir()
+    public_dir = os.path.join(root, PUBLIC_DIRNAME)
+    stats = {'ligados': 0, 'removidos': 0, 'movidos': 0, 'divergentes': 0, 'bytes_libertados': 0}
+    if not os.path.isdir(public_dir):
+        print(f"Pasta {public_dir} não encontrada, nada a migrar.")
+        return stats
+
+    prefix = "" if apply else "[simulação] "
+    for subdir in ('data', 'RSS'):
+        for dirpath, _, filenames in os.walk(os.path.join(public_dir, subdir)):
+            for filename in sorted(filenames):
+                public_path = os.path.join(dirpath, filename)
+                rel_path = os.path.relpath(public_path, public_dir)
+                canonical = os.path.join(root, rel_path)
+                size = os.path.getsize(public_path)
+
+                if is_published(rel_path):
+                    if os.path.exists(canonical) and not os.path.samefile(canonical, public_path):
+                        if apply:
+                            link_or_copy(canonical, public_path)
+                        stats['ligados'] += 1
+                        stats['bytes_libertados'] += size
+                    continue
+
+                if not os.path.exists(canonical):
+                    print(f"{prefix}Mover {public_path} -> {canonical}")
+                    if apply:
+                        os.makedirs(os.path.dirname(canonical) or '.', exist_ok=True)
+                        shutil.move(public_path, canonical)
+                    stats['movidos'] += 1
+                elif same_content(canonical, public_path):
+                    if apply:
+                        os.remove(public_path)
+                    stats['removidos'] += 1
+                    stats['bytes_libertados'] += size
+                else:
+                    print(f"⚠️ Conteúdo diferente do canónico, mantido: {public_path}")
+                    stats['divergentes'] += 1
+
+    print(f"\n{prefix}{stats['removidos']} duplicados removidos, {stats['ligados']} artefactos web em hardlink, "
+          f"{stats['movidos']} movidos para a raiz, {stats['divergentes']} divergentes")
+    print(f"{prefix}Espaço libertado: {stats['bytes_libertados'] / (1024 * 1024):.1f} MB")
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--migrar', action='store_true', help='deduplicar as árvores antigas em public/')
+    parser.add_argument('--aplicar', action='store_true', help='aplicar a migração (por omissão só simula)')
+    args = parser.parse_args()
+
+    if args.migrar:
+        deduplicate(apply=args.aplicar)
+    else:
+        publish()
+
+if __name__ == "__main__":
+    main()
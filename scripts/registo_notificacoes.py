@@ -0,0 +1,113 @@
+"""
+Registo persistente (SQLite) das notificações já enviadas.
+
+Cada entrada é um triplo (procedimento, seed, destinatário): o procedimento é identificado pela
+chave estável do link (cache_key), pelo que a verificação de novidade é uma consulta pela chave
+primária, independente do tamanho da lista de ativos. Um triplo só é registado depois de o email
+ter sido enviado, pelo que uma execução falhada volta a tentar na seguinte; um procedimento que
+sai dos ativos e volta a entrar não é notificado outra vez.
+
+A compactação remove os triplos de procedimentos que não aparecem nos ativos há mais de
+DRE_NOTIFY_RETENTION_DAYS dias. O registo fica em data/cache/ (persistido pela cache do workflow).
+"""
+
+import os
+import sqlite3
+import time
+from typing import Iterable, Optional, Tuple
+
+from cache_detalhes import get_cache_dir
+
+DRE_NOTIFY_RETENTION_DAYS = float(os.environ.get("DRE_NOTIFY_RETENTION_DAYS", 180))
+
+LEDGER_FILENAME = "notificacoes.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS notificados (
+    chave TEXT NOT NULL,
+    seed TEXT NOT NULL,
+    destinatario TEXT NOT NULL,
+    notificado REAL NOT NULL,
+    visto REAL NOT NULL,
+    PRIMARY KEY (chave, seed, destinatario)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_notificados_visto ON notificados (visto);
+CREATE TABLE IF NOT EXISTS meta (
+    nome TEXT PRIMARY KEY,
+    valor TEXT NOT NULL
+);
+"""
+
+Entry = Tuple[str, str, str]
+
+
+class NotificationLedger:
+    """
+    Triplos (chave do procedimento, código da seed, destinatário) já notificados
+    """
+    def __init__(self, path: str = None, retention_days: float = DRE_NOTIFY_RETENTION_DAYS):
+        if path is None:
+            path = os.path.join(get_cache_dir(), LEDGER_FILENAME)
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.path = path
+        self.retention = retention_days * 86400
+        self.stats = {'consultas': 0, 'registados': 0, 'removidos': 0}
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SCHEMA)
+        self.conn.commit()
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM notificados").fetchone()[0]
+
+    def __contains__(self, entry: Entry) -> bool:
+        self.stats['consultas'] += 1
+        return self.conn.execute("SELECT 1 FROM notificados WHERE chave = ? AND seed = ? AND destinatario = ?",
+                                 entry).fetchone() is not None
+
+    @property
+    def initialized(self) -> bool:
+        """Se o registo já tem uma linha de base (ver mark_initialized)"""
+        return self.conn.execute("SELECT 1 FROM meta WHERE nome = 'inicializado'").fetchone() is not None
+
+    def mark_initialized(self):
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO meta (nome, valor) VALUES ('inicializado', ?)",
+                              (str(time.time()),))
+
+    def record(self, entries: Iterable[Entry], now: Optional[float] = None) -> int:
+        """Regista triplos como notificados (os já existentes mantêm a data da primeira notificação)"""
+        now = now or time.time()
+        rows = [(*entry, now, now) for entry in entries]
+        with self.conn:
+            cursor = self.conn.executemany(
+                "INSERT OR IGNORE INTO notificados (chave, seed, destinatario, notificado, visto) VALUES (?, ?, ?, ?, ?)",
+                rows)
+        self.stats['registados'] += max(cursor.rowcount, 0)
+        return max(cursor.rowcount, 0)
+
+    def touch(self, keys: Iterable[str], now: Optional[float] = None):
+        """Marca os procedimentos (chaves) como ainda ativos, adiando a sua compactação"""
+        now = now or time.time()
+        with self.conn:
+            self.conn.executemany("UPDATE notificados SET visto = ? WHERE chave = ?",
+                                  [(now, key) for key in set(keys) if key])
+
+    def compact(self) -> int:
+        """Remove os triplos de procedimentos que não estão ativos há mais do que o período de retenção"""
+        if not self.retention:
+            return 0
+        with self.conn:
+            cursor = self.conn.execute("DELETE FROM notificados WHERE visto < ?", (time.time() - self.retention,))
+        removed = max(cursor.rowcount, 0)
+        if removed:
+            self.conn.execute("VACUUM")
+        self.stats['removidos'] += removed
+        return removed
+
+    def close(self):
+        self.conn.commit()
+        self.conn.close()
+
+    def summary(self) -> str:
+        return (f"{self.stats['consultas']} consultas, {self.stats['registados']} registados, "
+                f"{self.stats['removidos']} removidos, {len(self)} entradas")
@@ -5,58 +5,130 @@ import re
 import time
 import os
 import sys
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 # Garantir que o script consegue importar módulos vizinhos se corrido da raiz
 script_dir = os.path.dirname(os.path.abspath(__file__))
 if script_dir not in sys.path:
     sys.path.append(script_dir)
 
-from typing import List, Dict
+from typing import List, Dict, Optional
 from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from webdriver_manager.chrome import ChromeDriverManager
 
-def fetch_rss_feed(url: str) -> str:
+from detalhes_parser import build_record, ensure_parsed
+from drivers_chrome import DRE_DRIVER_PREWARM, USER_AGENT, DriverPool, driver_alive
+from feeds_dre import CHANGED as FEED_CHANGED, poll_feeds, save_feed_state
+from seed_matcher import ensure_terms
+from publicar import get_root_dir, publish
+from snapshots import SnapshotStore
+import instrumentacao
+from instrumentacao import timer, timed, count
+
+# Configuração do scraping paralelo (pode ser ajustada via variáveis de ambiente)
+DRE_WORKERS = int(os.environ.get("DRE_WORKERS", 3))
+DRE_MAX_RETRIES = int(os.environ.get("DRE_MAX_RETRIES", 2))
+DRE_RETRY_BACKOFF = float(os.environ.get("DRE_RETRY_BACKOFF", 2.0))
+
+# Tentar primeiro um pedido HTTP simples e só recorrer ao Selenium se o parse falhar
+DRE_HTTP_FIRST = os.environ.get("DRE_HTTP_FIRST", "1") != "0"
+DRE_HTTP_TIMEOUT = float(os.environ.get("DRE_HTTP_TIMEOUT", 15))
+
+# Espera pelo conteúdo da página de detalhe (timeout máximo, mínimo adaptativo e intervalo de polling)
+DRE_WAIT_TIMEOUT = float(os.environ.get("DRE_WAIT_TIMEOUT", 20))
+DRE_WAIT_MIN = float(os.environ.get("DRE_WAIT_MIN", 5))
+DRE_WAIT_POLL = float(os.environ.get("DRE_WAIT_POLL", 0.2))
+
+# Textos que identificam o bloco de detalhes do procedimento (do mais para o menos específico)
+TARGET_TEXTS = [
+    "1 - IDENTIFICAÇÃO E CONTACTOS DA ENTIDADE ADJUDICANTE",
+    "IDENTIFICAÇÃO E CONTACTOS DA ENTIDADE ADJUDICANTE",
+    "IDENTIFICAÇÃO"
+]
+
+def parse_procedure_html(page_source: str) -> Optional[Dict[str, str]]:
     """
-    Faz fetch do conteúdo XML do RSS feed
+    Extrai os detalhes de um procedimento a partir do HTML da página de detalhe.
+    Não depende do driver, pelo que pode ser usado com HTML obtido por HTTP ou guardado em disco.
     """
-    try:
-        response = requests.get(url, timeout=30)
-        response.raise_for_status()
-        return response.text
-    except requests.RequestException as e:
-        print(f"Erro ao fazer fetch do RSS feed: {e}")
+    if not page_source:
         return None
 
-def setup_driver():
-    """
-    Configura e retorna o driver do Chrome usando webdriver-manager para baixar a versão correta
-    """
-    chrome_options = Options()
-    chrome_options.add_argument("--headless")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--window-size=1920,1080")
-    chrome_options.add_argument("--disable-extensions")
-    chrome_options.add_argument("--disable-images")
-    chrome_options.add_argument("--log-level=3")
-    chrome_options.add_argument("--silent")
-    chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/121.0.0.0 Safari/537.36")
- 
+    # Usar BeautifulSoup para parsear o HTML
+    soup = BeautifulSoup(page_source, 'html.parser')
+    
+    # Procurar pelo texto específico
+    target_element = None
+    for text in TARGET_TEXTS:
+        target_element = soup.find(string=re.compile(text, re.IGNORECASE))
+        if target_element:
+            break
     
-    # Usar webdriver-manager para baixar a versão correta do Chrome WebDriver
-    chrome_driver_path = ChromeDriverManager().install()
-    print(f"Usando Chrome WebDriver: {chrome_driver_path}")
+    if target_element:
+        parent_div = target_element.find_parent('div')
+        if parent_div:
+            details_text = parent_div.get_text(separator='\n', strip=True)
+            
+            return {
+                'detalhes_completos': details_text,
+                **build_record(details_text)
+            }
     
-    service = Service(chrome_driver_path)
-    driver = webdriver.Chrome(service=service, options=chrome_options)
-    return driver
+    return None
+
+class AdaptiveTimeout:
+    """
+    Timeout de espera que se ajusta às latências de carregamento mais recentes.
+    Usa o percentil 90 da janela recente multiplicado por uma margem, limitado a [minimum, maximum].
+    """
+    def __init__(self, maximum: float = DRE_WAIT_TIMEOUT, minimum: float = DRE_WAIT_MIN,
+                 window: int = 20, margin: float = 2.0):
+        self.maximum = maximum
+        self.minimum = min(minimum, maximum)
+        self.margin = margin
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        """Regista a latência observada de uma página"""
+        with self._lock:
+            self._samples.append(seconds)
+
+    def current(self) -> float:
+        """Timeout a usar na próxima página"""
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return self.maximum
+        p90 = samples[min(len(samples) - 1, int(len(samples) * 0.9))]
+        return max(self.minimum, min(self.maximum, p90 * self.margin))
+
+
+# Partilhado por todos os workers para que aprendam com as mesmas páginas
+page_wait_timeout = AdaptiveTimeout()
+
+def page_has_target_text(driver) -> bool:
+    """
+    Verifica se o texto visível da página já contém o cabeçalho do bloco de detalhes
+    """
+    text = driver.execute_script("return document.body ? document.body.innerText : '';") or ""
+    text = text.upper()
+    # O último texto ("IDENTIFICAÇÃO") é demasiado genérico para indicar que o conteúdo carregou
+    return any(target in text for target in TARGET_TEXTS[:-1])
+
+def wait_for_target_text(driver, timeout: float, poll: float = DRE_WAIT_POLL) -> bool:
+    """
+    Faz polling do DOM até o bloco de detalhes aparecer ou o timeout expirar.
+    Devolve True se o conteúdo apareceu a tempo.
+    """
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=poll).until(page_has_target_text)
+        return True
+    except TimeoutException:
+        return False
 
 def fetch_procedure_details(driver, url: str) -> Dict[str, str]:
     """
@@ -68,81 +140,234 @@ def fetch_procedure_details(driver, url: str) -> Dict[str, str]:
         
     try:
         print(f"Acessando: {url}")
+        start = time.perf_counter()
         driver.get(url)
         
-        # Aguardar carregamento da página
-        WebDriverWait(driver, 20).until(
-            EC.presence_of_element_located((By.TAG_NAME, "body"))
-        )
-        
-        # Aguardar um pouco para garantir que o JavaScript carregou
-        time.sleep(3)
+        # Aguardar até o bloco de detalhes ser renderizado pelo JavaScript
+        timeout = page_wait_timeout.current()
+        if wait_for_target_text(driver, timeout):
+            page_wait_timeout.record(time.perf_counter() - start)
+        else:
+            # Página lenta: registar o timeout para que as próximas esperas sejam mais longas
+            page_wait_timeout.record(timeout)
+            print(f"  ⏳ Conteúdo não apareceu em {timeout:.1f}s, a tentar extrair mesmo assim")
         
         # Obter o HTML renderizado
-        page_source = driver.page_source
-        
-        # Usar BeautifulSoup para parsear o HTML
-        soup = BeautifulSoup(page_source, 'html.parser')
-        
-        # Procurar pelo texto específico
-        possible_texts = [
-            "1 - IDENTIFICAÇÃO E CONTACTOS DA ENTIDADE ADJUDICANTE",
-            "IDENTIFICAÇÃO E CONTACTOS DA ENTIDADE ADJUDICANTE",
-            "IDENTIFICAÇÃO"
-        ]
-        
-        target_element = None
-        for text in possible_texts:
-            target_element = soup.find(string=re.compile(text, re.IGNORECASE))
-            if target_element:
-                break
-        
-        if target_element:
-            parent_div = target_element.find_parent('div')
-            if parent_div:
-                details_text = parent_div.get_text(separator='\n', strip=True)
-                
-                extracted_info = {}
-                patterns = {
-                    'entidade': r'Designação da entidade adjudicante:\s*(.+?)(?:\n|$)',
-                    'nipc': r'NIPC:\s*(\d+)',
-                    'distrito': r'Distrito:\s*(.+?)(?:\n|$)',
-                    'concelho': r'Concelho:\s*(.+?)(?:\n|$)',
-                    'freguesia': r'Freguesia:\s*(.+?)(?:\n|$)',
-                    'site': r'Endereço da Entidade \(URL\):\s*(.+?)(?:\n|$)',
-                    'email': r'Endereço Eletrónico:\s*(.+?)(?:\n|$)',
-                    'designacao_contrato': r'Designação do contrato:\s*(.+?)(?:\n|$)',
-                    'descricao': r'Descrição:\s*(.+?)(?:\n|$)',
-                    'preco_base': r'Preço base s/IVA:\s*(.+?)(?:\n|$)',
-                    'prazo_execucao': r'Prazo de execução do contrato:\s*(.+?)(?:\n|$)',
-                    'prazo_apresentacao_propostas': r'Prazo para apresentação das propostas:\s*(.+?)(?:\n|$)',
-                    'fundos_eu': r'Têm fundos EU\?\s*(.+?)(?:\n|$)',
-                    'plataforma_eletronica': r'Plataforma eletrónica utilizada pela entidade adjudicante:\s*(.+?)(?:\n|$)',
-                    'url_procedimento': r'URL para Apresentação:\s*(.+?)(?:\n|$)',
-                    'autor_nome': r'28 - IDENTIFICAÇÃO DO\(S\) AUTOR\(ES\) DE ANÚNCIO\nNome:\s*(.+?)(?:\n|$)',
-                    'autor_cargo': r'Cargo:\s*(.+?)(?:\n|$)'
-                }
-                
-                for field, pattern in patterns.items():
-                    match = re.search(pattern, details_text, re.MULTILINE | re.DOTALL)
-                    if match:
-                        value = match.group(1).strip()
-                        value = re.sub(r'\s+', ' ', value)
-                        extracted_info[field] = value
-                    else:
-                        extracted_info[field] = None
-                
-                return {
-                    'detalhes_completos': details_text,
-                    **extracted_info
-                }
-        
-        return None
+        return parse_procedure_html(driver.page_source)
         
     except Exception as e:
         print(f"Erro ao extrair detalhes: {e}")
         return None
 
+def fetch_procedure_details_http(session: requests.Session, url: str) -> Optional[Dict[str, str]]:
+    """
+    Tenta extrair os detalhes de um procedimento com um pedido HTTP simples (sem renderizar JavaScript)
+    """
+    try:
+        response = session.get(url, timeout=DRE_HTTP_TIMEOUT)
+        response.raise_for_status()
+    except requests.RequestException as e:
+        print(f"  HTTP falhou para {url}: {e}")
+        return None
+
+    details = parse_procedure_html(response.text)
+    # Sem JavaScript a página pode não ter o bloco real; sem entidade, escalar para o Selenium
+    if not details or not details.get('entidade'):
+        return None
+    return details
+
+
+class HttpFetcher:
+    """
+    Fetcher leve baseado em requests, com uma Session (keep-alive) por thread
+    """
+    name = 'http'
+
+    def __init__(self, pool_size: int = DRE_WORKERS):
+        self.pool_size = max(1, pool_size)
+        self._local = threading.local()
+
+    def _session(self) -> requests.Session:
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            session.headers['User-Agent'] = USER_AGENT
+            self._local.session = session
+        return session
+
+    def fetch(self, url: str) -> Optional[Dict[str, str]]:
+        return fetch_procedure_details_http(self._session(), url)
+
+
+class SeleniumFetcher:
+    """
+    Fetcher que renderiza a página num Chrome headless obtido do pool de drivers
+    """
+    name = 'selenium'
+
+    def __init__(self, pool: DriverPool, warm: int = 0):
+        self.pool = pool
+        self._warm = warm
+        self._warm_lock = threading.Lock()
+
+    def warm(self):
+        """Arranca (uma única vez) os drivers pedidos em segundo plano"""
+        with self._warm_lock:
+            n, self._warm = self._warm, 0
+        if n:
+            self.pool.warm(n)
+
+    def fetch(self, url: str) -> Optional[Dict[str, str]]:
+        # A primeira página que chega ao Selenium mostra que o HTTP não chega: arrancar os restantes drivers
+        self.warm()
+        try:
+            handle = self.pool.acquire()
+        except Exception as e:
+            print(f"Erro ao iniciar driver: {e}")
+            return None
+        try:
+            details = fetch_procedure_details(handle.driver, url)
+            self.pool.page_done(handle)
+            if details is None and not driver_alive(handle.driver):
+                # O Chrome terminou ou deixou de responder: repetir a página num driver novo
+                handle = self.pool.restart(handle, "sessão terminada", crashed=True)
+                if handle is None:
+                    return None
+                details = fetch_procedure_details(handle.driver, url)
+                self.pool.page_done(handle)
+            return details
+        finally:
+            if handle is not None:
+                self.pool.release(handle)
+
+
+class FetcherChain:
+    """
+    Tenta cada fetcher por ordem (do mais leve para o mais pesado) e conta qual resolveu cada página
+    """
+    def __init__(self, fetchers: List):
+        self.fetchers = fetchers
+        self.counters = {f.name: 0 for f in fetchers}
+        self.counters['falhas'] = 0
+        self._lock = threading.Lock()
+
+    def fetch(self, url: str) -> Optional[Dict[str, str]]:
+        for fetcher in self.fetchers:
+            with timer(f'detalhe.{fetcher.name}'):
+                details = fetcher.fetch(url)
+            if details:
+                with self._lock:
+                    self.counters[fetcher.name] += 1
+                return details
+        with self._lock:
+            self.counters['falhas'] += 1
+        return None
+
+
+def build_fetcher_chain(pool: DriverPool, warm: int = 0) -> FetcherChain:
+    """
+    Cria a cadeia de fetchers: HTTP simples primeiro (se ativo) e Selenium como fallback.
+    Com `warm`, esse número de drivers é arrancado em segundo plano: logo de início se o HTTP
+    estiver desativado, ou só na primeira página que o HTTP não resolveu.
+    """
+    fetchers = []
+    selenium = SeleniumFetcher(pool, warm=warm)
+    if DRE_HTTP_FIRST:
+        fetchers.append(HttpFetcher(pool.size))
+    elif warm:
+        selenium.warm()
+    fetchers.append(selenium)
+    return FetcherChain(fetchers)
+
+
+def fetch_details_with_retry(fetcher: FetcherChain, url: str, max_retries: int = DRE_MAX_RETRIES,
+                             backoff: float = DRE_RETRY_BACKOFF) -> Optional[Dict[str, str]]:
+    """
+    Extrai os detalhes de um procedimento através da cadeia de fetchers,
+    repetindo com backoff exponencial em caso de falha
+    """
+    for attempt in range(max_retries + 1):
+        details = fetcher.fetch(url)
+        if details:
+            return details
+
+        if attempt < max_retries:
+            count('detalhes.novas_tentativas')
+            wait = backoff * (2 ** attempt)
+            print(f"  ↻ Nova tentativa para {url} em {wait:.1f}s ({attempt + 1}/{max_retries})")
+            time.sleep(wait)
+
+    return None
+
+
+def fetch_details_parallel(items: List[Dict[str, str]], workers: int = DRE_WORKERS,
+                           max_retries: int = DRE_MAX_RETRIES,
+                           pool: Optional[DriverPool] = None) -> List[Optional[Dict[str, str]]]:
+    """
+    Extrai os detalhes de vários procedimentos em paralelo com um pool de drivers.
+    Devolve os resultados pela mesma ordem de `items` (None quando a extração falha).
+    Um `pool` passado pelo chamador (ex: o daemon) é reutilizado e fica aberto no fim.
+    """
+    if not items:
+        return []
+
+    workers = max(1, min(workers, len(items)))
+    stats = {}
+    stats_lock = threading.Lock()
+
+    def worker(index: int, item: Dict[str, str]):
+        start = time.perf_counter()
+        details = fetch_details_with_retry(fetcher, item.get('link'), max_retries=max_retries)
+        elapsed = time.perf_counter() - start
+        instrumentacao.run_report.add_time('detalhe.procedimento', elapsed)
+
+        name = threading.current_thread().name
+        with stats_lock:
+            worker_stats = stats.setdefault(name, {'ok': 0, 'falhas': 0, 'tempo': 0.0})
+            worker_stats['ok' if details else 'falhas'] += 1
+            worker_stats['tempo'] += elapsed
+
+        status = "✓ Detalhes extraídos" if details else "✗ Falha na extração de detalhes"
+        print(f"  [{index + 1}/{len(items)}] {item.get('numero_procedimento', 'N/A')}: {status}")
+        return details
+
+    own_pool = pool is None
+    if own_pool:
+        pool = DriverPool(workers)
+    else:
+        workers = max(1, min(pool.size, len(items)))
+    pool.reset_stats()
+    print(f"\n🚀 A extrair os detalhes de {len(items)} procedimentos com {workers} workers...")
+    fetcher = build_fetcher_chain(pool, warm=workers if DRE_DRIVER_PREWARM else 0)
+    start = time.perf_counter()
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="dre-worker") as executor:
+            futures = [executor.submit(worker, i, item) for i, item in enumerate(items)]
+            results = [f.result() for f in futures]
+    finally:
+        if own_pool:
+            pool.close()
+    total_time = time.perf_counter() - start
+
+    print(f"\n⏱️ Scraping paralelo: {len(items)} procedimentos em {total_time:.1f}s com {workers} workers")
+    for name in sorted(stats):
+        s = stats[name]
+        processed = s['ok'] + s['falhas']
+        rate = processed / s['tempo'] if s['tempo'] else 0.0
+        print(f"  - {name}: {processed} páginas ({s['ok']} ok, {s['falhas']} falhas), {rate:.2f} páginas/s")
+    for line in pool.summary_lines():
+        print(f"  - {line}")
+    instrumentacao.run_report.update_counters('detalhes.', fetcher.counters)
+    instrumentacao.run_report.update_counters('driver.', pool.stats)
+    instrumentacao.run_report.set('drivers', [dict(s, driver=i + 1) for i, s in enumerate(pool.slots) if s['arranques']])
+    caminhos = ", ".join(f"{k}: {v}" for k, v in fetcher.counters.items())
+    print(f"  Caminho de extração por página -> {caminhos}")
+
+    return results
+
 
 def extract_procedure_info(title: str, description: str) -> Dict[str, str]:
     """
@@ -204,20 +429,12 @@ def parse_rss_to_json(xml_content: str) -> List[Dict[str, str]]:
         print(f"Erro ao fazer parse do XML: {e}")
         return []
 
+@timed('json.guardar')
 def save_to_json(data: List[Dict[str, str]], filename: str = "procedimentos_dre.json"):
     """
-    Salva os dados extraídos em formato JSON em todas as localizações encontradas
+    Salva os dados extraídos em formato JSON na pasta RSS/ canónica (não são publicados em public/)
     """
-    targets = []
-    # Root RSS
-    if os.path.exists('RSS') or os.path.exists('package.json'): targets.append('RSS')
-    elif os.path.exists('../RSS') or os.path.exists('../package.json'): targets.append('../RSS')
-    
-    # Public RSS
-    if os.path.exists('public/RSS'): targets.append('public/RSS')
-    elif os.path.exists('../public/RSS'): targets.append('../public/RSS')
-    
-    if not targets: targets = ['RSS']
+    targets = [os.path.join(get_root_dir(), 'RSS')]
     
     for rss_dir in targets:
         try:
@@ -229,6 +446,7 @@ def save_to_json(data: List[Dict[str, str]], filename: str = "procedimentos_dre.
         except Exception as e:
             print(f"❌ Erro ao salvar em {rss_dir}: {e}")
 
+@timed('json.guardar_com_data')
 def save_to_json_with_date(data: List[Dict[str, str]]):
     """
     Salva os dados extraídos em formato JSON na pasta data/ com nome baseado na data atual
@@ -237,28 +455,24 @@ def save_to_json_with_date(data: List[Dict[str, str]]):
         from datetime import datetime
         # Obter data atual no formato DD-MM-YYYY
         current_date = datetime.now().strftime('%d-%m-%Y')
-        filename = f"{current_date}.json"
         
-        targets = []
-        # Root data
-        if os.path.exists('data') or os.path.exists('package.json'): targets.append('data')
-        elif os.path.exists('../data') or os.path.exists('../package.json'): targets.append('../data')
-        
-        # Public data
-        if os.path.exists('public/data'): targets.append('public/data')
-        elif os.path.exists('../public/data'): targets.append('../public/data')
-        
-        if not targets: targets = ['data']
+        # Os ficheiros diários só existem na pasta data/ canónica (a interface web não os usa),
+        # guardados como delta em relação ao dia anterior sempre que compensa
+        targets = [os.path.join(get_root_dir(), 'data')]
         
         last_path = None
         for data_dir in targets:
             try:
-                os.makedirs(data_dir, exist_ok=True)
-                filepath = os.path.join(data_dir, filename)
-                with open(filepath, 'w', encoding='utf-8') as f:
-                    json.dump(data, f, ensure_ascii=False, indent=2)
-                print(f"✅ Dados salvos com data em {filepath}")
-                last_path = filepath
+                info = SnapshotStore(data_dir).save(data, current_date)
+                if info['tipo'] == 'delta':
+                    print(f"✅ Dados salvos com data em {info['caminho']} (delta: {info['bytes'] / 1024:.0f} KB "
+                          f"em vez de {info['bytes_completo'] / 1024:.0f} KB)")
+                else:
+                    print(f"✅ Dados salvos com data em {info['caminho']}")
+                instrumentacao.run_report.set('snapshot.tipo', info['tipo'])
+                instrumentacao.run_report.set('snapshot.bytes', info['bytes'])
+                instrumentacao.run_report.set('snapshot.bytes_poupados', info['bytes_poupados'])
+                last_path = info['caminho']
             except Exception as e:
                 print(f"❌ Erro ao salvar em {data_dir}: {e}")
                 
@@ -267,21 +481,74 @@ def save_to_json_with_date(data: List[Dict[str, str]]):
         print(f"❌ Erro ao processar save_to_json_with_date: {e}")
         return None
 
-def main():
+class PipelineState:
     """
-    Função principal que executa todo o processo
+    Estado mantido entre execuções do pipeline no mesmo processo (modo daemon, daemon_dre.py):
+    o pool de drivers (os Chrome já arrancados ficam abertos), a cache de detalhes aberta, os
+    procedimentos completos da última execução (por link) e o índice de ativos (ActiveIndex),
+    atualizado no lugar em cada ciclo.
     """
-    rss_url = "https://files.diariodarepublica.pt/rss/serie2&parte=l-html.xml"
-    
-    print("Fazendo fetch do RSS feed do Diário da República...")
-    xml_content = fetch_rss_feed(rss_url)
-    
-    if xml_content is None:
-        print("Não foi possível obter o conteúdo do RSS feed")
-        return
-    
-    print("Extraindo informações dos procedimentos...")
-    extracted_data = parse_rss_to_json(xml_content)
+    def __init__(self, workers: int = DRE_WORKERS):
+        from cache_detalhes import open_cache
+        self.pool = DriverPool(workers)
+        self.cache = open_cache()
+        # None até à primeira execução: são lidos dos ficheiros, como numa execução isolada
+        self.completos: Optional[Dict[str, Dict]] = None
+        self.ativos = None  # gerir_ativos.ActiveIndex
+
+    def close(self):
+        self.pool.close()
+        self.cache.close()
+
+def main(state: Optional[PipelineState] = None) -> Optional[Dict]:
+    """
+    Função principal que executa todo o processo.
+    Com `state` (modo daemon) reutiliza o pool de drivers, a cache e os dados em memória.
+    Devolve um resumo da execução, ou None se os feeds não puderem ser obtidos.
+    """
+    report = instrumentacao.reset_report('pipeline')
+    report.start_profiling()
+    try:
+        return _run_pipeline(report, state)
+    finally:
+        # As execuções que terminam cedo não escrevem relatório: sem isto o cProfile/tracemalloc
+        # ficariam ativos para o ciclo seguinte do daemon
+        report.stop_profiling()
+
+def _run_pipeline(report: instrumentacao.RunReport, state: Optional[PipelineState]) -> Optional[Dict]:
+    """Etapas do pipeline (ver main), com o relatório da execução já criado"""
+    with timer('etapa.rss'):
+        print("Fazendo fetch dos RSS feeds do Diário da República (pedidos condicionais)...")
+        feeds, feed_state = poll_feeds()
+        for feed in feeds:
+            print(f"  - {feed['estado']}: {feed['url']}")
+        
+        available = [feed for feed in feeds if feed['conteudo'] is not None]
+        if not available:
+            print("Não foi possível obter o conteúdo do RSS feed")
+            return
+        
+        # Nenhum feed mudou desde a última execução: os resultados seriam os mesmos
+        changed = sum(1 for feed in feeds if feed['estado'] == FEED_CHANGED)
+        report.set('feeds_alterados', changed)
+        if not changed:
+            print("💤 Nenhum feed mudou desde a última execução, nada a fazer.")
+            # No modo daemon estes ciclos vazios não deixam relatório (mas a perfilagem termina aqui)
+            if state is None:
+                report.write()
+            else:
+                report.stop_profiling()
+            return {'feeds_alterados': 0}
+        
+        print("Extraindo informações dos procedimentos...")
+        # Procedimentos de todos os feeds (os inalterados vêm da cache), cada link uma vez
+        extracted_data = []
+        seen_links = set()
+        for feed in available:
+            for item in parse_rss_to_json(feed['conteudo']):
+                if item['link'] not in seen_links:
+                    seen_links.add(item['link'])
+                    extracted_data.append(item)
     
     if not extracted_data:
         print("Nenhum dado foi extraído")
@@ -292,133 +559,213 @@ def main():
     # Salvar dados básicos em JSON
     save_to_json(extracted_data, "procedimentos_basicos.json")
     
-    # Carregar base de dados existente para evitar re-scraping
-    existing_data = {}
-    try:
-        possible_completo_paths = ['RSS/procedimentos_completos.json', 'public/RSS/procedimentos_completos.json']
-        for p in possible_completo_paths:
-            if os.path.exists(p):
-                with open(p, 'r', encoding='utf-8') as f:
-                    data_list = json.load(f)
-                    for d in data_list:
-                        if 'link' in d: existing_data[d['link']] = d
-                break
-    except: pass
-
-    # Extrair detalhes de cada procedimento
-    print(f"\nExtraindo detalhes de {len(extracted_data)} procedimentos...")
-    procedimentos_completos = []
-    
-    driver = setup_driver()
-    try:
+    with timer('etapa.detalhes'):
+        # Carregar base de dados existente para evitar re-scraping
+        existing_data = {}
+        if state is not None and state.completos is not None:
+            # Modo daemon: os procedimentos da execução anterior já estão em memória
+            existing_data = state.completos
+        else:
+            try:
+                possible_completo_paths = ['RSS/procedimentos_completos.json', '../RSS/procedimentos_completos.json',
+                                           'public/RSS/procedimentos_completos.json', '../public/RSS/procedimentos_completos.json']
+                for p in possible_completo_paths:
+                    if os.path.exists(p):
+                        with open(p, 'r', encoding='utf-8') as f:
+                            data_list = json.load(f)
+                            for d in data_list:
+                                if 'link' in d: existing_data[d['link']] = d
+                        break
+            except: pass
+
+        # Extrair detalhes de cada procedimento
+        print(f"\nExtraindo detalhes de {len(extracted_data)} procedimentos...")
+        procedimentos_completos = []
+        
+        # Cache persistente de detalhes partilhada entre execuções
+        if state is not None:
+            cache = state.cache
+            cache.stats = dict.fromkeys(cache.stats, 0)
+        else:
+            from cache_detalhes import open_cache
+            cache = open_cache()
+
+        pending = []
         for i, item in enumerate(extracted_data):
             link = item.get('link')
-            print(f"\n[{i+1}/{len(extracted_data)}] {item['numero_procedimento']}")
-            
             # Se já temos os detalhes, saltar
             if link in existing_data and existing_data[link].get('detalhes_completos'):
-                print(f"  ⚡ Já existe na base de dados, ignorando fetch")
+                print(f"[{i+1}/{len(extracted_data)}] {item['numero_procedimento']}: ⚡ Já existe na base de dados, ignorando fetch")
                 procedimentos_completos.append(existing_data[link])
                 continue
 
-            # Extrair detalhes do procedimento
-            details = fetch_procedure_details(driver, link)
-            
-            if details:
-                item_completo = {**item, **details}
-                procedimentos_completos.append(item_completo)
-                print(f"  ✓ Detalhes extraídos")
+            cached = cache.get(link)
+            if cached:
+                print(f"[{i+1}/{len(extracted_data)}] {item['numero_procedimento']}: 📦 Encontrado na cache de detalhes")
+                procedimentos_completos.append({**cached, **item})
             else:
                 procedimentos_completos.append(item)
-                print(f"  ✗ Falha na extração de detalhes")
-    finally:
-        if driver: driver.quit()
-    
-    # Salvar dados completos em JSON
-    save_to_json(procedimentos_completos, "procedimentos_completos.json")
+                pending.append(i)
+
+        # Extrair detalhes dos procedimentos em falta em paralelo (a ordem é preservada)
+        if pending:
+            results = fetch_details_parallel([extracted_data[i] for i in pending],
+                                             pool=state.pool if state is not None else None)
+            for i, details in zip(pending, results):
+                if details:
+                    procedimentos_completos[i] = {**extracted_data[i], **details}
+                    cache.put(procedimentos_completos[i])
+
+        # Guardar procedimentos vindos do ficheiro anterior que ainda não estejam na cache
+        # (os que já estão mantêm a data de criação, para que o TTL continue a contar)
+        for proc in procedimentos_completos:
+            if proc.get('link') in existing_data and proc.get('detalhes_completos'):
+                cache.put(proc, replace=False)
+        cache.evict()
+        report.update_counters('cache.', cache.stats)
+        lookups = cache.stats['hits'] + cache.stats['misses']
+        report.set('cache.hit_rate', round(cache.stats['hits'] / lookups, 4) if lookups else None)
+        cache_summary = cache.summary()
+        if state is None:
+            cache.close()
+        else:
+            cache.conn.commit()
+        print(f"\n📦 Cache de detalhes: {cache_summary}")
+        
+        # Garantir que todos os registos (incluindo os reaproveitados) têm os campos normalizados atuais
+        # e os termos normalizados usados na correspondência com as seeds
+        for proc in procedimentos_completos:
+            ensure_parsed(proc)
+            ensure_terms(proc)
+
+    with timer('etapa.guardar'):
+        # Salvar dados completos em JSON
+        save_to_json(procedimentos_completos, "procedimentos_completos.json")
+        
+        # Salvar dados completos em JSON com data na pasta data/
+        print("\n📅 Salvando dados com data atual...")
+        data_file_path = save_to_json_with_date(procedimentos_completos)
+        if state is not None:
+            state.completos = {proc['link']: proc for proc in procedimentos_completos if proc.get('link')}
     
-    # Salvar dados completos em JSON com data na pasta data/
-    print("\n📅 Salvando dados com data atual...")
-    data_file_path = save_to_json_with_date(procedimentos_completos)
+    # Registar o snapshot do dia no arquivo histórico (e importar ficheiros diários em falta)
+    try:
+        from arquivo_procedimentos import ProcedureArchive, snapshot_day, snapshot_name
+        with timer('etapa.arquivo'):
+            archive = ProcedureArchive()
+            if data_file_path:
+                archive.add_snapshot(procedimentos_completos, snapshot_day(data_file_path),
+                                     name=snapshot_name(data_file_path))
+            archive.import_date_files(os.path.dirname(archive.path))
+            print(f"\n🗄️ Arquivo: {archive.summary()}")
+            archive.close()
+    except Exception as e:
+        print(f"❌ Erro ao atualizar o arquivo histórico: {e}")
     
-    # Atualizar arquivo ativos.json
+    # Todas as etapas seguintes correm neste processo e partilham os dados já em memória:
+    # os procedimentos completos (acabados de guardar) e os ativos anteriores, lidos uma única vez
+    ativos_finais = None
     print("\n🔄 Atualizando arquivo ativos.json...")
     try:
-        from gerir_ativos import update_ativos_from_date_file, merge_with_existing_ativos, save_ativos
+        from gerir_ativos import ActiveIndex, filter_active_procedures, merge_with_existing_ativos, save_ativos
         from notify_new_items import notify_new_items
         
-        if data_file_path:
-            # Obter procedimentos ativos do arquivo de data
-            procedimentos_ativos = update_ativos_from_date_file(data_file_path)
-            
-            # --- NOTIFICAÇÃO ---
-            # Notificar ANTES de fazer o merge definitivo (para saber o que é realmente novo)
+        with timer('etapa.ativos'):
+            # Obter procedimentos ativos a partir dos dados do dia
+            procedimentos_ativos = filter_active_procedures(procedimentos_completos)
+            # Índice dos ativos (prazos já convertidos): no modo daemon vem do ciclo anterior
+            if state is not None and state.ativos is not None:
+                active_index = state.ativos
+            else:
+                active_index = ActiveIndex.load()
+            existing_ativos = active_index.records()
+        
+        # --- NOTIFICAÇÃO ---
+        # Notificar ANTES de fazer o merge definitivo (para saber o que é realmente novo)
+        with timer('etapa.notificacao'):
             print("📬 Verificando notificações para novos itens...")
-            notify_new_items(procedimentos_ativos)
-            # -------------------
-            
+            notify_new_items(procedimentos_ativos, existing_ativos or None)
+        # -------------------
+        
+        with timer('etapa.ativos'):
             # Combinar com procedimentos ativos existentes
-            ativos_finais = merge_with_existing_ativos(procedimentos_ativos)
+            ativos_finais = merge_with_existing_ativos(procedimentos_ativos, index=active_index)
             
             # Salvar arquivo ativos.json
-            ativos_file_path = save_ativos(ativos_finais)
-            
-            if ativos_file_path:
-                print(f"✅ Arquivo ativos.json atualizado com sucesso!")
-                print(f"📊 Total de procedimentos ativos: {len(ativos_finais)}")
-            else:
-                print("❌ Erro ao salvar arquivo ativos.json")
+            ativos_file_path = save_ativos(ativos_finais, active_index.latest_day())
+            if state is not None:
+                state.ativos = active_index
+        
+        if ativos_file_path:
+            print(f"✅ Arquivo ativos.json atualizado com sucesso!")
+            print(f"📊 Total de procedimentos ativos: {len(ativos_finais)}")
         else:
-            print("❌ Não foi possível obter caminho do arquivo de data")
+            print("❌ Erro ao salvar arquivo ativos.json")
             
     except Exception as e:
         print(f"❌ Erro ao atualizar ativos.json: {e}")
     
-    # Gerar automaticamente o feed RSS
+    # Gerar automaticamente o feed RSS (no mesmo processo, a partir dos procedimentos em memória)
     print("\n🔄 Gerando feed RSS automaticamente...")
     try:
-        import subprocess
-        import sys
+        from json_to_rss_converter import build_rss_feed, print_feed_stats
         
-        print("Executando conversor JSON para RSS...")
-        result = subprocess.run([sys.executable, "json_to_rss_converter.py"], 
-                              capture_output=True, text=True, check=True)
+        with timer('etapa.feed'):
+            feed_stats = build_rss_feed(procedimentos_completos)
         
         print("✅ Feed RSS gerado com sucesso!")
-        print("📄 Arquivo criado: ../public/RSS/feed_rss_procedimentos.xml")
-        
-        # Mostrar estatísticas do feed RSS
-        if "Total de procedimentos processados:" in result.stdout:
-            print("\n📊 Estatísticas do Feed RSS:")
-            for line in result.stdout.split('\n'):
-                if "Estatísticas:" in line or "procedimentos" in line:
-                    print(f"  {line}")
-                    
-    except subprocess.CalledProcessError as e:
-        print(f"❌ Erro ao gerar feed RSS: {e}")
-        print(f"Erro: {e.stderr}")
+        print("\n📊 Estatísticas do Feed RSS:")
+        print_feed_stats(feed_stats)
     except Exception as e:
-        print(f"❌ Erro inesperado ao gerar feed RSS: {e}")
+        print(f"❌ Erro ao gerar feed RSS: {e}")
     
     # --- GERAÇÃO DE RSS FILTRADO (SEEDS) ---
     print("\n📡 Gerando RSS personalizado (Seeds)...")
     try:
         from generate_filtered_rss import generate_filtered_rss
-        generate_filtered_rss()
+        with timer('etapa.feed_seeds'):
+            generate_filtered_rss(ativos_finais)
     except Exception as e:
         print(f"❌ Erro ao gerar RSS filtrado: {e}")
     # -------------------------------------
     
+    # Publicar os artefactos web (ativos, seeds, feeds) em public/, apenas os que mudaram
+    try:
+        with timer('etapa.publicar'):
+            publish()
+    except Exception as e:
+        print(f"❌ Erro ao publicar artefactos em public/: {e}")
+    
+    # Só agora os validadores dos feeds ficam gravados: uma execução interrompida repete os feeds
+    save_feed_state(feed_state)
+    
     print(f"\n🎉 Processo completo finalizado!")
     print(f"Procedimentos processados: {len(procedimentos_completos)}")
+    print(f"Cache de detalhes: {cache_summary}")
     print(f"📁 Arquivos gerados:")
-    print(f"  - public/RSS/procedimentos_basicos.json (dados do RSS)")
-    print(f"  - public/RSS/procedimentos_completos.json (dados + detalhes)")
+    print(f"  - RSS/procedimentos_basicos.json (dados do RSS)")
+    print(f"  - RSS/procedimentos_completos.json (dados + detalhes)")
     if data_file_path:
         print(f"  - {data_file_path} (dados completos com data)")
-    print(f"  - public/data/ativos.json (procedimentos ativos)")
-    print(f"  - public/RSS/feed_rss_procedimentos.xml (feed RSS completo)")
-    print(f"  - public/RSS/feed_filtros_seeds.xml (feed RSS filtrado por SEEDS)")
+    print(f"  - data/ativos.json (procedimentos ativos)")
+    print(f"  - RSS/feed_rss_procedimentos.xml (feed RSS completo)")
+    print(f"  - RSS/feed_filtros_seeds.xml (feed RSS filtrado por SEEDS)")
+    print(f"  - RSS/seeds/<CODIGO>.xml (um feed RSS por seed)")
+    
+    report.set('procedimentos', len(procedimentos_completos))
+    report.set('procedimentos_novos', len(pending))
+    report.set('ativos', len(ativos_finais) if ativos_finais is not None else None)
+    report_path = report.write()
+    print()
+    report.print_summary()
+    if report_path:
+        print(f"📝 Relatório de execução: {report_path}")
+    return {
+        'feeds_alterados': changed,
+        'procedimentos': len(procedimentos_completos),
+        'procedimentos_novos': len(pending),
+        'ativos': len(ativos_finais) if ativos_finais is not None else None,
+    }
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -0,0 +1,105 @@
+import os
+import re
+import shutil
+from datetime import datetime
+from typing import IO, List, Optional
+from xml.sax.saxutils import escape, quoteattr
+
+ATOM_NS = 'http://www.w3.org/2005/Atom'
+RSS_GENERATOR = "Antigravity RSS Generator 1.0"
+
+# Caracteres de controlo não são permitidos em XML 1.0
+_INVALID_XML_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+def format_rss_date(dt: datetime = None) -> str:
+    """Data no formato usado nos feeds (RFC 822)"""
+    return (dt or datetime.now()).strftime('%a, %d %b %Y %H:%M:%S GMT')
+
+def format_pub_date(data_envio: Optional[str]) -> str:
+    """
+    pubDate de um item a partir da data de envio do anúncio (DD-MM-YYYY), ou a data atual se não existir
+    """
+    if data_envio:
+        try:
+            dt = datetime.strptime(data_envio, '%d-%m-%Y')
+            return dt.strftime("%a, %d %b %Y 00:00:00 GMT")
+        except ValueError:
+            pass
+    return format_rss_date()
+
+def _text(value) -> str:
+    return escape(_INVALID_XML_CHARS.sub('', str(value)))
+
+def _cdata(value) -> str:
+    # "]]>" dentro do conteúdo terminaria a secção CDATA; dividir em duas secções
+    value = _INVALID_XML_CHARS.sub('', str(value)).replace(']]>', ']]]]><![CDATA[>')
+    return f"<![CDATA[{value}]]>"
+
+
+class RSSWriter:
+    """
+    Escreve um feed RSS 2.0 de forma incremental para um ficheiro (ou qualquer stream de texto).
+    Cada item é escrito assim que é adicionado, com a descrição HTML em CDATA,
+    pelo que o custo é linear no número de itens e o documento nunca é mantido em memória.
+    """
+    def __init__(self, out: IO[str]):
+        self.out = out
+        self.items = 0
+
+    def start(self, title: str, link: str, description: str, self_href: str,
+              language: str = 'pt-PT', last_build_date: str = None):
+        """Escreve o cabeçalho XML e os metadados do canal"""
+        self.out.write('<?xml version="1.0" encoding="UTF-8"?>')
+        self.out.write(f'<rss xmlns:atom="{ATOM_NS}" version="2.0"><channel>')
+        self.out.write(f'<title>{_text(title)}</title>')
+        self.out.write(f'<link>{_text(link)}</link>')
+        self.out.write(f'<description>{_text(description)}</description>')
+        self.out.write(f'<language>{_text(language)}</language>')
+        self.out.write(f'<lastBuildDate>{_text(last_build_date or format_rss_date())}</lastBuildDate>')
+        self.out.write(f'<generator>{_text(RSS_GENERATOR)}</generator>')
+        self.out.write(f'<atom:link href={quoteattr(self_href)} rel="self" type="application/rss+xml"/>')
+
+    def item(self, title: str, link: str, guid: str, pub_date: str, description_html: str):
+        """Escreve um item do feed"""
+        self.out.write(
+            f'<item><title>{_text(title)}</title>'
+            f'<link>{_text(link)}</link>'
+            f'<guid isPermaLink="false">{_text(guid)}</guid>'
+            f'<pubDate>{_text(pub_date)}</pubDate>'
+            f'<description>{_cdata(description_html)}</description></item>'
+        )
+        self.items += 1
+
+    def end(self):
+        """Fecha o canal e o documento"""
+        self.out.write('</channel></rss>')
+
+
+def write_feed_files(output_paths: List[str], write_func, verbose: bool = True) -> int:
+    """
+    Escreve o feed no primeiro destino chamando write_func(RSSWriter) e copia o ficheiro
+    para os restantes destinos. Devolve o número de itens escritos.
+    """
+    if not output_paths:
+        return 0
+
+    first = output_paths[0]
+    os.makedirs(os.path.dirname(first) or '.', exist_ok=True)
+    tmp_path = first + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        writer = RSSWriter(f)
+        write_func(writer)
+    os.replace(tmp_path, first)
+    if verbose:
+        print(f"✅ Feed RSS salvo em: {first}")
+
+    for path in output_paths[1:]:
+        try:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+            shutil.copyfile(first, path)
+            if verbose:
+                print(f"✅ Feed RSS salvo em: {path}")
+        except Exception as e:
+            print(f"❌ Erro ao salvar em {path}: {e}")
+
+    return writer.items
@@ -0,0 +1,220 @@
+"""
+Correspondência entre procedimentos e seeds.
+
+Uma seed corresponde a um procedimento quando:
+    1. o distrito é igual ao da seed (se a seed tiver distrito);
+    2. pelo menos uma das titleTags aparece no título/descrição (se existirem);
+    3. pelo menos uma das tags aparece em qualquer campo de texto (se existirem).
+
+Textos e tags são comparados depois de normalizados (normalizacao.py): sem distinção de
+maiúsculas e acentos, palavra a palavra e com plurais/género reduzidos ao radical, pelo que
+"residuos" encontra "Resíduos" e "contentor enterrado" encontra "contentores enterrados".
+Uma tag com várias palavras tem de aparecer como sequência de palavras consecutivas.
+
+Os termos normalizados de cada procedimento são calculados uma vez (na ingestão, pelo
+extractor, ou na primeira correspondência) e guardados no próprio registo, em "termos".
+procedure_matches_seed avalia um par (procedimento, seed); SeedMatcher compila todas as
+seeds e devolve as que correspondem a um procedimento numa única passagem. compiled_matcher
+reaproveita o SeedMatcher enquanto as seeds não mudarem (ex: entre ciclos do daemon).
+"""
+
+import json
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+from normalizacao import NORMALIZATION_VERSION, fold, tokenize
+
+# Campos de texto (além do título) onde as tags globais são procuradas
+OTHER_FIELDS = ['entidade', 'entidade_adjudicante', 'plataforma_eletronica', 'nipc', 'concelho', 'freguesia']
+
+def ensure_terms(proc: Dict) -> Dict:
+    """
+    Garante que o procedimento tem os termos normalizados da versão atual:
+    {"versao": N, "titulo": "...", "outros": "..."} (palavras normalizadas separadas por espaços).
+    Atualiza o próprio dicionário e devolve os termos.
+    """
+    terms = proc.get('termos')
+    if isinstance(terms, dict) and terms.get('versao') == NORMALIZATION_VERSION:
+        return terms
+    title_text = proc.get('descricao') or proc.get('designacao_contrato') or ''
+    other_text = " ".join([str(proc.get(field)) for field in OTHER_FIELDS if proc.get(field)])
+    terms = {
+        'versao': NORMALIZATION_VERSION,
+        'titulo': ' '.join(tokenize(title_text)),
+        'outros': ' '.join(tokenize(other_text)),
+    }
+    proc['termos'] = terms
+    return terms
+
+def procedure_tokens(proc: Dict) -> Tuple[List[str], List[str]]:
+    """Palavras normalizadas do título e de todo o texto (título seguido dos restantes campos)"""
+    terms = ensure_terms(proc)
+    title_tokens = terms['titulo'].split()
+    return title_tokens, title_tokens + terms['outros'].split()
+
+@lru_cache(maxsize=4096)
+def tag_phrase(tag: str) -> Tuple[str, ...]:
+    """Palavras normalizadas de uma tag (as tags repetem-se em todas as chamadas)"""
+    return tuple(tokenize(tag))
+
+def _contains_phrase(tokens: List[str], phrase: Tuple[str, ...]) -> bool:
+    n = len(phrase)
+    if n == 1:
+        return phrase[0] in tokens
+    return any(tokens[i:i + n] == list(phrase) for i, token in enumerate(tokens) if token == phrase[0])
+
+def procedure_matches_seed(proc: Dict, seed: Dict) -> bool:
+    """Verifica se um procedimento corresponde a uma seed"""
+    # 1. Distrito
+    if seed.get('district'):
+        if fold(proc.get('distrito') or '') != fold(seed['district']):
+            return False
+
+    title_tokens, full_tokens = procedure_tokens(proc)
+
+    # 2. Title Tags (Obrigatórias no título/descrição)
+    title_tags = seed.get('titleTags') or []
+    if title_tags:
+        if not any(_contains_phrase(title_tokens, tag_phrase(str(tag))) for tag in title_tags):
+            return False
+
+    # 3. Global Tags (Pelo menos uma em qualquer lugar)
+    global_tags = seed.get('tags') or []
+    if global_tags:
+        if not any(_contains_phrase(full_tokens, tag_phrase(str(tag))) for tag in global_tags):
+            return False
+
+    return True
+
+def seed_label(seed: Dict) -> str:
+    """Nome com que a seed aparece nos feeds e nas notificações"""
+    return seed.get('name', seed.get('code'))
+
+
+class _CompiledSeed:
+    __slots__ = ('seed', 'order', 'district', 'title_ids', 'tag_ids')
+
+    def __init__(self, seed: Dict, order: int, title_ids: Optional[set], tag_ids: Optional[set]):
+        self.seed = seed
+        self.order = order
+        self.district = fold(seed.get('district') or '') or None
+        # None = sem condição
+        self.title_ids = title_ids
+        self.tag_ids = tag_ids
+
+
+class SeedMatcher:
+    """
+    Motor de correspondência para um conjunto de seeds.
+
+    As tags de todas as seeds são normalizadas uma vez, ao compilar. As tags de uma palavra
+    ficam num dicionário palavra -> tag, e a correspondência é a interseção com o conjunto de
+    palavras do procedimento; as tags de várias palavras são indexadas pela primeira palavra e
+    confirmadas só nas posições onde essa palavra aparece. Só as seeds referidas pelas tags
+    encontradas (e as seeds sem tags) são depois avaliadas. O resultado é idêntico a
+    procedure_matches_seed.
+    """
+    def __init__(self, seeds: List[Dict]):
+        self.seeds = list(seeds)
+        self._pattern_ids: Dict[Tuple[str, ...], int] = {}
+        self._by_pattern: Dict[int, List[_CompiledSeed]] = {}
+        self._unconditional: List[_CompiledSeed] = []
+
+        for order, seed in enumerate(self.seeds):
+            compiled = _CompiledSeed(seed, order, self._register(seed.get('titleTags') or []),
+                                     self._register(seed.get('tags') or []))
+            # Uma tag vazia (sem palavras) está contida em qualquer texto: a condição fica satisfeita
+            if compiled.title_ids is not None and -1 in compiled.title_ids:
+                compiled.title_ids = None
+            if compiled.tag_ids is not None and -1 in compiled.tag_ids:
+                compiled.tag_ids = None
+            triggers = compiled.title_ids or compiled.tag_ids
+            if triggers is None:
+                self._unconditional.append(compiled)
+            else:
+                # Uma titleTag também ocorre no texto completo, por isso basta indexar a seed
+                # pelas tags de uma das condições (a primeira que existir)
+                for pattern_id in triggers:
+                    self._by_pattern.setdefault(pattern_id, []).append(compiled)
+
+        self._words: Dict[str, int] = {}
+        self._phrases: Dict[str, List[Tuple[int, Tuple[str, ...]]]] = {}
+        for phrase, pattern_id in self._pattern_ids.items():
+            if len(phrase) == 1:
+                self._words[phrase[0]] = pattern_id
+            else:
+                self._phrases.setdefault(phrase[0], []).append((pattern_id, phrase))
+
+    def _register(self, tags: List[str]) -> Optional[set]:
+        if not tags:
+            return None
+        ids = set()
+        for tag in tags:
+            phrase = tag_phrase(str(tag))
+            if not phrase:
+                ids.add(-1)
+                continue
+            ids.add(self._pattern_ids.setdefault(phrase, len(self._pattern_ids)))
+        return ids
+
+    def _scan(self, title_tokens: List[str], full_tokens: List[str]) -> Tuple[set, set]:
+        """Tags presentes no título e no texto completo"""
+        words = self._words
+        in_title = {words[w] for w in set(title_tokens) if w in words}
+        in_full = in_title | {words[w] for w in set(full_tokens[len(title_tokens):]) if w in words}
+
+        if self._phrases:
+            title_len = len(title_tokens)
+            for i, token in enumerate(full_tokens):
+                for pattern_id, phrase in self._phrases.get(token, ()):
+                    end = i + len(phrase)
+                    if tuple(full_tokens[i:end]) == phrase:
+                        in_full.add(pattern_id)
+                        if end <= title_len:
+                            in_title.add(pattern_id)
+        return in_title, in_full
+
+    def matches(self, proc: Dict) -> List[Dict]:
+        """Todas as seeds que correspondem ao procedimento, pela ordem das seeds"""
+        title_tokens, full_tokens = procedure_tokens(proc)
+        in_title, in_full = self._scan(title_tokens, full_tokens)
+
+        candidates = {id(c): c for c in self._unconditional}
+        for pattern_id in in_full:
+            for compiled in self._by_pattern.get(pattern_id, ()):
+                candidates[id(compiled)] = compiled
+
+        district = None
+        result = []
+        for compiled in sorted(candidates.values(), key=lambda c: c.order):
+            if compiled.district is not None:
+                if district is None:
+                    district = fold(proc.get('distrito') or '')
+                if district != compiled.district:
+                    continue
+            if compiled.title_ids is not None and compiled.title_ids.isdisjoint(in_title):
+                continue
+            if compiled.tag_ids is not None and compiled.tag_ids.isdisjoint(in_full):
+                continue
+            result.append(compiled.seed)
+        return result
+
+    def first_match(self, proc: Dict) -> Optional[Dict]:
+        """Primeira seed (pela ordem das seeds) que corresponde ao procedimento, ou None"""
+        matched = self.matches(proc)
+        return matched[0] if matched else None
+
+
+# SeedMatchers já compilados, pela definição das seeds (poucas listas diferentes por processo)
+_COMPILED_MAX = 8
+_compiled: Dict[str, SeedMatcher] = {}
+
+def compiled_matcher(seeds: List[Dict]) -> SeedMatcher:
+    """SeedMatcher para as seeds, compilado apenas na primeira vez que esta lista de seeds aparece"""
+    key = json.dumps(seeds, sort_keys=True, ensure_ascii=False, default=str)
+    matcher = _compiled.get(key)
+    if matcher is None:
+        if len(_compiled) >= _COMPILED_MAX:
+            _compiled.clear()
+        matcher = _compiled[key] = SeedMatcher(seeds)
+    return matcher
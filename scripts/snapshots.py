@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+"""
+Snapshots diários de procedimentos guardados como deltas.
+
+Cada dia é guardado em data/ como:
+    DD-MM-YYYY.json        snapshot completo (lista de procedimentos, como antes)
+    DD-MM-YYYY.delta.json  delta em relação ao snapshot do dia anterior
+
+Um delta guarda a ordem completa das chaves do dia e apenas os registos novos ou alterados;
+os registos repetidos vêm do dia anterior. A cada DRE_SNAPSHOT_KEYFRAME dias (ou quando o
+delta não compensa) é escrito um snapshot completo, para que reconstruir um dia nunca exija
+aplicar mais do que alguns deltas.
+
+Uso:
+    python snapshots.py relatorio [diretorio_data]
+    python snapshots.py reconstruir DD-MM-YYYY [-o ficheiro.json]
+    python snapshots.py compactar [diretorio_data] [--aplicar]
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+if script_dir not in sys.path:
+    sys.path.append(script_dir)
+
+from cache_detalhes import cache_key
+
+# Número máximo de dias entre snapshots completos e tamanho máximo de um delta
+# (em fração do snapshot completo) para que compense guardá-lo
+DRE_SNAPSHOT_KEYFRAME = int(os.environ.get("DRE_SNAPSHOT_KEYFRAME", 7))
+DRE_SNAPSHOT_MAX_DELTA = float(os.environ.get("DRE_SNAPSHOT_MAX_DELTA", 0.8))
+
+DELTA_FORMAT = 1
+SNAPSHOT_PATTERN = re.compile(r'^(\d{2}-\d{2}-\d{4})(\.delta)?\.json$')
+
+def _sort_key(date: str) -> str:
+    # DD-MM-YYYY -> YYYYMMDD
+    return date[6:10] + date[3:5] + date[0:2]
+
+def _dumps(data) -> str:
+    return json.dumps(data, ensure_ascii=False, indent=2)
+
+def _record_keys(procedures: List[Dict]) -> List[str]:
+    """
+    Chave de cada registo: cache_key do link, com o número da ocorrência quando o mesmo link
+    aparece mais do que uma vez no dia (registos sem link usam a posição), para que um delta
+    reconstrua exatamente a lista original
+    """
+    keys, seen = [], {}
+    for index, proc in enumerate(procedures):
+        key = cache_key(proc.get('link', '')) or f"#{index}"
+        count = seen.get(key, 0)
+        seen[key] = count + 1
+        keys.append(f"{key}~{count}" if count else key)
+    return keys
+
+def build_delta(previous: List[Dict], current: List[Dict], previous_date: str) -> Dict:
+    """
+    Delta de `current` em relação a `previous`: ordem das chaves do dia, registos novos ou
+    alterados e chaves removidas (só para relatório)
+    """
+    previous_map = dict(zip(_record_keys(previous), previous))
+    keys, records = _record_keys(current), {}
+    for key, proc in zip(keys, current):
+        if previous_map.get(key) != proc:
+            records[key] = proc
+    current_keys = set(keys)
+    return {
+        'formato': DELTA_FORMAT,
+        'anterior': previous_date,
+        'chaves': keys,
+        'registos': records,
+        'removidos': [k for k in previous_map if k not in current_keys],
+    }
+
+def apply_delta(previous: List[Dict], delta: Dict) -> List[Dict]:
+    """Reconstrói a lista completa de um dia a partir do dia anterior e do delta"""
+    if delta.get('formato') != DELTA_FORMAT:
+        raise ValueError(f"Formato de delta não suportado: {delta.get('formato')}")
+    previous_map = dict(zip(_record_keys(previous), previous))
+    records = delta['registos']
+    try:
+        return [records[k] if k in records else previous_map[k] for k in delta['chaves']]
+    except KeyError as e:
+        raise ValueError(f"Delta inconsistente com o snapshot {delta.get('anterior')}: chave {e} em falta")
+
+
+class SnapshotStore:
+    """
+    Leitura e escrita dos snapshots diários de uma pasta data/, completos ou em delta
+    """
+    def __init__(self, data_dir: str, keyframe: int = DRE_SNAPSHOT_KEYFRAME,
+                 max_delta: float = DRE_SNAPSHOT_MAX_DELTA):
+        self.data_dir = data_dir
+        self.keyframe = keyframe
+        self.max_delta = max_delta
+        self._cached: Optional[Tuple[str, List[Dict]]] = None
+
+    def _files(self) -> Dict[str, Dict[str, str]]:
+        files: Dict[str, Dict[str, str]] = {}
+        if not os.path.isdir(self.data_dir):
+            return files
+        for filename in os.listdir(self.data_dir):
+            match = SNAPSHOT_PATTERN.match(filename)
+            if match:
+                kind = 'delta' if match.group(2) else 'completo'
+                files.setdefault(match.group(1), {})[kind] = os.path.join(self.data_dir, filename)
+        return files
+
+    def dates(self) -> List[str]:
+        """Dias disponíveis (DD-MM-YYYY), por ordem cronológica"""
+        return sorted(self._files(), key=_sort_key)
+
+    def path(self, date: str) -> Optional[str]:
+        """Ficheiro que guarda o dia (o completo tem prioridade sobre um delta do mesmo dia)"""
+        entry = self._files().get(date)
+        if not entry:
+            return None
+        return entry.get('completo') or entry.get('delta')
+
+    def is_delta(self, date: str) -> bool:
+        path = self.path(date)
+        return bool(path) and path.endswith('.delta.json')
+
+    def _read(self, path: str):
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def load(self, date: str) -> List[Dict]:
+        """
+        Lista completa de procedimentos de um dia, aplicando os deltas desde o último snapshot completo
+        """
+        files = self._files()
+        if date not in files:
+            raise FileNotFoundError(f"Snapshot {date} não encontrado em {self.data_dir}")
+        if self._cached and self._cached[0] == date:
+            return self._cached[1]
+
+        # Recuar até ao snapshot completo mais próximo
+        chain = []
+        current = date
+        while True:
+            entry = files.get(current)
+            if entry is None:
+                raise ValueError(f"Cadeia de deltas interrompida: snapshot {current} em falta")
+            if 'completo' in entry:
+                procedures = self._read(entry['completo'])
+                break
+            if self._cached and self._cached[0] == current:
+                procedures = self._cached[1]
+                break
+            delta = self._read(entry['delta'])
+            chain.append(delta)
+            current = delta['anterior']
+
+        for delta in reversed(chain):
+            procedures = apply_delta(procedures, delta)
+        self._cached = (date, procedures)
+        return procedures
+
+    def iter(self) -> Iterator[Tuple[str, List[Dict]]]:
+        """Percorre todos os dias por ordem, reconstruindo cada delta a partir do dia anterior"""
+        for date in self.dates():
+            yield date, self.load(date)
+
+    def save(self, procedures: List[Dict], date: str) -> Dict:
+        """
+        Guarda o snapshot do dia como delta em relação ao dia anterior ou, quando não compensa
+        (sem dia anterior, a cada `keyframe` dias, delta grande ou dias posteriores que dependem
+        deste), como snapshot completo. Devolve o caminho escrito e os bytes poupados.
+        """
+        dates = [d for d in self.dates() if d != date]
+        earlier = [d for d in dates if _sort_key(d) < _sort_key(date)]
+        later = [d for d in dates if _sort_key(d) > _sort_key(date)]
+        full_text = _dumps(procedures)
+        full_bytes = len(full_text.encode('utf-8'))
+
+        delta_text = None
+        if earlier and not later and self.keyframe > 1:
+            previous = earlier[-1]
+            # Dias desde o último snapshot completo
+            since_full = 0
+            for d in reversed(earlier):
+                if not self.is_delta(d):
+                    break
+                since_full += 1
+            if since_full + 1 < self.keyframe:
+                delta_text = _dumps(build_delta(self.load(previous), procedures, previous))
+                if len(delta_text.encode('utf-8')) > self.max_delta * full_bytes:
+                    delta_text = None
+
+        os.makedirs(self.data_dir, exist_ok=True)
+        full_path = os.path.join(self.data_dir, f"{date}.json")
+        delta_path = os.path.join(self.data_dir, f"{date}.delta.json")
+        path, text, stale = (delta_path, delta_text, full_path) if delta_text else (full_path, full_text, delta_path)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        if os.path.exists(stale):
+            os.remove(stale)
+        self._cached = (date, procedures)
+
+        written = len(text.encode('utf-8'))
+        return {
+            'caminho': path,
+            'tipo': 'delta' if delta_text else 'completo',
+            'bytes': written,
+            'bytes_completo': full_bytes,
+            'bytes_poupados': full_bytes - written,
+        }
+
+    def report(self) -> Dict:
+        """Bytes guardados em disco contra o que ocupariam todos os dias como snapshots completos"""
+        stored = full = 0
+        counts = {'completo': 0, 'delta': 0}
+        for date, procedures in self.iter():
+            path = self.path(date)
+            stored += os.path.getsize(path)
+            full += len(_dumps(procedures).encode('utf-8'))
+            counts['delta' if path.endswith('.delta.json') else 'completo'] += 1
+        return {'dias': sum(counts.values()), 'completos': counts['completo'], 'deltas': counts['delta'],
+                'bytes_guardados': stored, 'bytes_completos': full, 'bytes_poupados': full - stored}
+
+    def compact(self, apply: bool = False) -> Dict:
+        """
+        Converte os snapshots completos existentes em deltas (mantendo um completo a cada `keyframe` dias).
+        Sem apply=True apenas calcula o resultado.
+        """
+        stored_before = stored_after = 0
+        counts = {'completo': 0, 'delta': 0}
+        previous_date, previous, since_full = None, None, 0
+        # Cada dia é lido antes de ser reescrito, por isso a reconstrução continua válida durante a conversão
+        for date, procedures in self.iter():
+            path = self.path(date)
+            stored_before += os.path.getsize(path)
+            full_text = _dumps(procedures)
+            text, kind = full_text, 'completo'
+            if previous is not None and since_full + 1 < self.keyframe:
+                delta_text = _dumps(build_delta(previous, procedures, previous_date))
+                if len(delta_text.encode('utf-8')) <= self.max_delta * len(full_text.encode('utf-8')):
+                    text, kind = delta_text, 'delta'
+            since_full = since_full + 1 if kind == 'delta' else 0
+            counts[kind] += 1
+            stored_after += len(text.encode('utf-8'))
+
+            if apply:
+                target = os.path.join(self.data_dir, f"{date}.delta.json" if kind == 'delta' else f"{date}.json")
+                other = os.path.join(self.data_dir, f"{date}.json" if kind == 'delta' else f"{date}.delta.json")
+                with open(target, 'w', encoding='utf-8') as f:
+                    f.write(text)
+                if os.path.exists(other):
+                    os.remove(other)
+            previous_date, previous = date, procedures
+
+        self._cached = None
+        return {'dias': sum(counts.values()), 'completos': counts['completo'], 'deltas': counts['delta'],
+                'bytes_antes': stored_before, 'bytes_depois': stored_after,
+                'bytes_poupados': stored_before - stored_after}
+
+
+def load_snapshot_file(path: str) -> List[Dict]:
+    """Lê um ficheiro diário, completo ou delta (neste caso reconstruído a partir da pasta onde está)"""
+    match = SNAPSHOT_PATTERN.match(os.path.basename(path))
+    if match and match.group(2):
+        return SnapshotStore(os.path.dirname(path) or '.').load(match.group(1))
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def _mb(value: int) -> str:
+    return f"{value / (1024 * 1024):.1f} MB"
+
+def main():
+    from publicar import get_root_dir
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest='comando', required=True)
+    rep = sub.add_parser('relatorio', help='espaço ocupado pelos snapshots e bytes poupados pelos deltas')
+    rep.add_argument('data_dir', nargs='?')
+    rec = sub.add_parser('reconstruir', help='reconstruir a lista completa de um dia')
+    rec.add_argument('data')
+    rec.add_argument('--data-dir')
+    rec.add_argument('-o', '--output', help='ficheiro de saída (por omissão, stdout)')
+    comp = sub.add_parser('compactar', help='converter os snapshots completos existentes em deltas')
+    comp.add_argument('data_dir', nargs='?')
+    comp.add_argument('--aplicar', action='store_true', help='reescrever os ficheiros (por omissão só simula)')
+    args = parser.parse_args()
+
+    data_dir = args.data_dir or os.path.join(get_root_dir(), 'data')
+    store = SnapshotStore(data_dir)
+
+    if args.comando == 'reconstruir':
+        procedures = store.load(args.data)
+        text = _dumps(procedures)
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                f.write(text)
+            print(f"✅ {len(procedures)} procedimentos de {args.data} escritos em {args.output}")
+        else:
+            print(text)
+    elif args.comando == 'relatorio':
+        r = store.report()
+        print(f"📂 {r['dias']} dias ({r['completos']} completos, {r['deltas']} deltas)")
+        print(f"💾 Em disco: {_mb(r['bytes_guardados'])} (completos seriam {_mb(r['bytes_completos'])}, "
+              f"poupados {_mb(r['bytes_poupados'])})")
+    else:
+        r = store.compact(apply=args.aplicar)
+        prefix = "" if args.aplicar else "[simulação] "
+        print(f"{prefix}{r['dias']} dias: {r['completos']} completos, {r['deltas']} deltas")
+        saved = (r['bytes_poupados'] / r['bytes_antes'] * 100) if r['bytes_antes'] else 0.0
+        print(f"{prefix}{_mb(r['bytes_antes'])} -> {_mb(r['bytes_depois'])} ({saved:.1f}% poupado)")
+
+if __name__ == "__main__":
+    main()
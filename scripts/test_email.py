@@ -1,10 +1,19 @@
+"""
+Envia um email de teste a todos os destinatários configurados (EMAIL_SUBSCRIPTIONS ou EMAIL_RECEIVER).
+
+Sem enviar emails reais, com um servidor SMTP local que apenas mostra as mensagens:
+    python -m aiosmtpd -n -l localhost:1025
+    SMTP_SERVER=localhost SMTP_PORT=1025 SMTP_USER=dre@localhost SMTP_ALLOW_NO_AUTH=1 \\
+        EMAIL_SUBSCRIPTIONS="ana@exemplo.pt=SEED1; rui@exemplo.pt" python test_email.py
+"""
+
 import os
 import sys
 
 # Adicionar o diretório atual ao path para importar notify_new_items
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from notify_new_items import send_notification
+from notify_new_items import SMTP_PORT, SMTP_SERVER, load_subscriptions, send_notification
 
 def test_email():
     print("🧪 Iniciando envio de email de teste...")
@@ -22,9 +31,12 @@ def test_email():
         }
     ]
     
+    print(f"SMTP_SERVER: {SMTP_SERVER}:{SMTP_PORT}")
     print(f"SMTP_USER: {os.environ.get('SMTP_USER')}")
     print(f"EMAIL_RECEIVER: {os.environ.get('EMAIL_RECEIVER')}")
+    print(f"Destinatários: {', '.join(load_subscriptions()) or '-'}")
     
+    # O mesmo email a todos os destinatários, pela mesma ligação
     send_notification(test_items)
     print("✅ Processo de teste concluído.")
 
@@ -1,6 +1,6 @@
 'use client';
 
-import React, { useState, useEffect, useMemo } from 'react';
+import React, { useState, useEffect, useMemo, useRef } from 'react';
 
 // Icons as simple SVG components
 const SearchIcon = () => (
@@ -12,6 +12,9 @@ const RssIcon = () => (
 );
 
 interface Procedimento {
+    id?: string;
+    _pos?: number;
+    publicacao?: string;
     descricao?: string;
     designacao_contrato?: string;
     entidade?: string;
@@ -44,6 +47,104 @@ interface Seed {
     created: string;
 }
 
+// Resumo gerado por scripts/indice_web.py (data/web/resumo.json)
+interface Resumo {
+    versao: string;
+    campos: string[];
+    linhas: string[][];
+    fragmentos: string[];
+}
+
+// Normalização igual à de scripts/normalizacao.py (o índice guarda os termos já normalizados)
+const PLURAL_SUFFIXES: [string, string][] = [
+    ['oes', 'ao'], ['aes', 'ao'], ['ais', 'al'], ['eis', 'el'], ['ois', 'ol'],
+    ['res', 'r'], ['ses', 's'], ['zes', 'z'], ['ns', 'm']
+];
+const MIN_STEM_LENGTH = 4;
+const MARK_RE = new RegExp('\\p{M}', 'gu');
+const LETTERS_RE = new RegExp('^\\p{L}+$', 'u');
+const WORD_RE = new RegExp('[\\p{L}\\p{N}_]+', 'gu');
+
+const foldText = (text: string) => text.toLowerCase().normalize('NFKD').replace(MARK_RE, '');
+
+const stemWord = (word: string) => {
+    if (word.length <= MIN_STEM_LENGTH - 1 || !LETTERS_RE.test(word)) return word;
+    const plural = PLURAL_SUFFIXES.find(([suffix]) => word.endsWith(suffix) && word.length > MIN_STEM_LENGTH);
+    if (plural) {
+        word = word.slice(0, -plural[0].length) + plural[1];
+    } else if (word.endsWith('s') && !word.endsWith('ss')) {
+        word = word.slice(0, -1);
+    }
+    if (word.length > MIN_STEM_LENGTH && 'aeo'.includes(word[word.length - 1])) {
+        word = word.slice(0, -1);
+    }
+    return word;
+};
+
+const tokenizeText = (text?: string) => (foldText(text || '').match(WORD_RE) || []).map(stemWord);
+
+const shardKey = (term: string) => {
+    const key = term.slice(0, 2);
+    return /^[a-z0-9]{1,2}$/.test(key) ? key : '_';
+};
+
+const containsPhrase = (tokens: string[], phrase: string[]) =>
+    phrase.length === 0 || tokens.some((token, i) => token === phrase[0] && phrase.every((word, j) => tokens[i + j] === word));
+
+// Campos (além do título) onde as tags globais são procuradas, como em scripts/seed_matcher.py
+const SEED_OTHER_FIELDS: (keyof Procedimento)[] = ['entidade', 'entidade_adjudicante', 'plataforma_eletronica', 'nipc', 'concelho', 'freguesia'];
+
+// Nome do ficheiro de uma seed em data/web/seeds/ (como seed_file_name em scripts/generate_filtered_rss.py):
+// códigos com outros caracteres levam um hash curto (FNV-1a em UTF-8) para não colidirem
+const seedFileName = (code: string) => {
+    const name = String(code).replace(/[^A-Za-z0-9_-]/gu, '_');
+    if (name === String(code)) return name;
+    let hash = 0x811c9dc5;
+    for (const byte of new TextEncoder().encode(String(code))) {
+        hash = Math.imul(hash ^ byte, 0x01000193) >>> 0;
+    }
+    return `${name}-${hash.toString(16).padStart(8, '0')}`;
+};
+
+const seedDefinitionKey = (seed: Partial<Seed>) =>
+    JSON.stringify([seed.tags || [], seed.titleTags || [], seed.district || '']);
+
+const DetailsPanel = ({ proc }: { proc: Procedimento }) => (
+    <div className="grid grid-cols-1 md:grid-cols-3 gap-8">
+        <div className="detail-subgroup">
+            <div className="detail-title">Informação Adicional</div>
+            <div className="space-y-3">
+                <div><span className="detail-label">NIPC</span><div className="detail-value">{proc.nipc || '--'}</div></div>
+                <div><span className="detail-label">Localização</span><div className="detail-value">{proc.concelho}, {proc.distrito}</div></div>
+                <div><span className="detail-label">Freguesia</span><div className="detail-value">{proc.freguesia || '--'}</div></div>
+                <div><span className="detail-label">N.º Procedimento</span><div className="detail-value">{proc.numero_procedimento}</div></div>
+            </div>
+        </div>
+        <div className="detail-subgroup">
+            <div className="detail-title">Execução e Fundos</div>
+            <div className="space-y-3">
+                <div><span className="detail-label">Prazo de Execução</span><div className="detail-value">{proc.prazo_execucao}</div></div>
+                <div><span className="detail-label">Fundos Comunitários</span><div className="detail-value">{proc.fundos_eu}</div></div>
+                {(proc.site || proc.email) && (
+                    <div>
+                        <span className="detail-label">Contactos</span>
+                        <div className="detail-value text-[10px] break-all">
+                            {proc.site && <div className="text-blue-400">{proc.site}</div>}
+                            {proc.email && <div className="text-blue-400">{proc.email}</div>}
+                        </div>
+                    </div>
+                )}
+            </div>
+        </div>
+        <div className="detail-subgroup items-center flex flex-col gap-4">
+            <a href={proc.link} target="_blank" className="pro-btn-primary w-full text-center py-4">Ver Anúncio Oficial (DRE)</a>
+            {proc.url_procedimento && (
+                <a href={proc.url_procedimento} target="_blank" className="pro-btn-secondary w-full text-center py-4 border-amber-500/30 text-amber-500 hover:bg-amber-500 hover:text-black">Aceder ao Procedimento</a>
+            )}
+        </div>
+    </div>
+);
+
 export default function PortalPage() {
     const [allProcedimentos, setAllProcedimentos] = useState<Procedimento[]>([]);
     const [loading, setLoading] = useState(true);
@@ -53,6 +154,14 @@ export default function PortalPage() {
     const [activeSeeds, setActiveSeeds] = useState<Seed[]>([]);
     const [allSeeds, setAllSeeds] = useState<Seed[]>([]);
     const [expandedRow, setExpandedRow] = useState<number | null>(null);
+    const [details, setDetails] = useState<Record<string, Procedimento | null>>({});
+    const [searchPositions, setSearchPositions] = useState<Set<number> | null>(null);
+    // Ids dos procedimentos de cada seed ativa, calculados pelo pipeline, por código e definição
+    // (null: avaliar no browser)
+    const [seedResults, setSeedResults] = useState<Record<string, Set<string> | null>>({});
+    const indexRef = useRef<{ versao: string; fragmentos: Set<string>; shards: Record<string, Promise<Record<string, number[]>>> }>(
+        { versao: '', fragmentos: new Set(), shards: {} }
+    );
     const [copyStatus, setCopyStatus] = useState<string | null>(null);
 
     // Modal state
@@ -73,10 +182,15 @@ export default function PortalPage() {
 
     const fetchData = async () => {
         try {
-            const response = await fetch('data/ativos.json');
+            // Apenas o resumo; os detalhes de cada procedimento são pedidos ao expandir a linha
+            const response = await fetch('data/web/resumo.json');
             if (!response.ok) throw new Error('Falha ao carregar dados');
-            const data = await response.json();
-            setAllProcedimentos(data);
+            const data: Resumo = await response.json();
+            indexRef.current = { versao: data.versao, fragmentos: new Set(data.fragmentos), shards: {} };
+            // Cada linha passa a objeto com os nomes dos campos; _pos é a posição usada no índice
+            setAllProcedimentos(data.linhas.map((row, pos) =>
+                Object.assign({ _pos: pos } as Procedimento, Object.fromEntries(data.campos.map((field, i) => [field, row[i]])))
+            ));
             setLoading(false);
         } catch (err) {
             console.error(err);
@@ -111,71 +225,134 @@ export default function PortalPage() {
         }
     };
 
-    const extractPublicationDate = (detalhesCompletos?: string) => {
-        if (!detalhesCompletos) return '--';
-        const dateMatch = detalhesCompletos.match(/Data de Envio do Anúncio:\s*(\d{1,2}-\d{1,2}-\d{4})/);
-        if (dateMatch) {
-            return dateMatch[1].replace(/-/g, '/');
-        }
-        return '--';
-    };
+    const extractPublicationDate = (publicacao?: string) => publicacao || '--';
+
+    // Palavras normalizadas do título e do texto completo de cada procedimento (calculadas uma vez)
+    const procedureTokens = useMemo(() => {
+        const cache = new Map<Procedimento, { title: string[]; full: string[] }>();
+        return (proc: Procedimento) => {
+            let tokens = cache.get(proc);
+            if (!tokens) {
+                const title = tokenizeText(proc.descricao || proc.designacao_contrato);
+                const other = tokenizeText(SEED_OTHER_FIELDS.map(field => proc[field]).filter(Boolean).join(' '));
+                tokens = { title, full: title.concat(other) };
+                cache.set(proc, tokens);
+            }
+            return tokens;
+        };
+    }, [allProcedimentos]);
 
+    // Mesmas regras de scripts/seed_matcher.py: sem distinção de acentos, plurais e género
     const procedureMatchesSeed = (proc: Procedimento, seed: Seed) => {
         if (seed.district && seed.district !== '') {
-            if ((proc.distrito || '').toLowerCase() !== seed.district.toLowerCase()) {
+            if (foldText(proc.distrito || '') !== foldText(seed.district)) {
                 return false;
             }
         }
-        const titleText = (proc.descricao || proc.designacao_contrato || '').toLowerCase();
-        const otherText = [
-            proc.entidade || '',
-            proc.entidade_adjudicante || '',
-            proc.plataforma_eletronica || '',
-            proc.nipc || '',
-            proc.concelho || '',
-            proc.freguesia || ''
-        ].join(' ').toLowerCase();
+        const { title, full } = procedureTokens(proc);
 
         if (seed.titleTags && seed.titleTags.length > 0) {
-            if (!seed.titleTags.some(tag => titleText.includes(tag.toLowerCase()))) return false;
+            if (!seed.titleTags.some(tag => containsPhrase(title, tokenizeText(tag)))) return false;
         }
         if (seed.tags && seed.tags.length > 0) {
-            const fullText = titleText + ' ' + otherText;
-            if (!seed.tags.some(tag => fullText.includes(tag.toLowerCase()))) return false;
+            if (!seed.tags.some(tag => containsPhrase(full, tokenizeText(tag)))) return false;
         }
         return true;
     };
 
+    const loadShard = (key: string): Promise<Record<string, number[]>> => {
+        const index = indexRef.current;
+        if (!index.fragmentos.has(key)) return Promise.resolve({});
+        if (!index.shards[key]) {
+            index.shards[key] = fetch(`data/web/indice/${key}.json?v=${index.versao}`)
+                .then(response => response.ok ? response.json() : {})
+                .catch(() => ({}));
+        }
+        return index.shards[key];
+    };
+
+    // Pesquisa no índice: todas as palavras, cada uma como início de um termo normalizado
+    useEffect(() => {
+        const words = tokenizeText(searchTerm);
+        if (words.length === 0) {
+            setSearchPositions(null);
+            return;
+        }
+        let cancelled = false;
+        Promise.all(words.map(word => loadShard(shardKey(word)))).then(shards => {
+            let result: Set<number> | null = null;
+            words.forEach((word, i) => {
+                const found = new Set<number>();
+                Object.entries(shards[i]).forEach(([term, positions]) => {
+                    // Uma palavra de uma letra fica sozinha no seu fragmento: só conta a correspondência exata
+                    if (word.length > 1 ? term.startsWith(word) : term === word) {
+                        positions.forEach(pos => found.add(pos));
+                    }
+                });
+                result = result === null ? found : new Set([...result].filter(pos => found.has(pos)));
+            });
+            if (!cancelled) setSearchPositions(result);
+        });
+        return () => { cancelled = true; };
+    }, [searchTerm, allProcedimentos]);
+
+    // Resultados pré-calculados das seeds ativas (data/web/seeds/), usados se a definição local for igual
+    useEffect(() => {
+        activeSeeds.filter(seed => !(seed.code + seedDefinitionKey(seed) in seedResults)).forEach(seed => {
+            fetch(`data/web/seeds/${seedFileName(seed.code)}.json?v=${indexRef.current.versao}`)
+                .then(response => response.ok ? response.json() : null)
+                .catch(() => null)
+                .then(data => {
+                    const ids = data && seedDefinitionKey(data.definicao || {}) === seedDefinitionKey(seed)
+                        ? new Set<string>(data.ids) : null;
+                    setSeedResults(prev => ({ ...prev, [seed.code + seedDefinitionKey(seed)]: ids }));
+                });
+        });
+    }, [activeSeeds]);
+
     const filteredProcedimentos = useMemo(() => {
         let filtered = allProcedimentos;
-        if (searchTerm) {
-            const term = searchTerm.toLowerCase();
-            filtered = filtered.filter(proc => {
-                const searchableText = [
-                    proc.descricao || '',
-                    proc.designacao_contrato || '',
-                    proc.entidade || '',
-                    proc.entidade_adjudicante || '',
-                    proc.nipc || '',
-                    proc.distrito || '',
-                    proc.concelho || ''
-                ].join(' ').toLowerCase();
-                return searchableText.includes(term);
-            });
+        if (searchPositions) {
+            filtered = filtered.filter(proc => searchPositions.has(proc._pos as number));
         }
         if (activeSeeds.length > 0) {
             filtered = filtered.filter(proc =>
-                activeSeeds.some(seed => procedureMatchesSeed(proc, seed))
+                activeSeeds.some(seed => {
+                    const ids = seedResults[seed.code + seedDefinitionKey(seed)];
+                    return ids ? ids.has(proc.id as string) : procedureMatchesSeed(proc, seed);
+                })
             );
         }
         return [...filtered].sort((a, b) => {
-            const dateA = extractPublicationDate(a.detalhes_completos);
-            const dateB = extractPublicationDate(b.detalhes_completos);
+            const dateA = extractPublicationDate(a.publicacao);
+            const dateB = extractPublicationDate(b.publicacao);
             if (dateA === '--') return 1;
             if (dateB === '--') return -1;
             return new Date(dateB.split('/').reverse().join('-')).getTime() - new Date(dateA.split('/').reverse().join('-')).getTime();
         });
-    }, [allProcedimentos, searchTerm, activeSeeds]);
+    }, [allProcedimentos, searchPositions, activeSeeds, seedResults]);
+
+    const toggleRow = (idx: number, proc: Procedimento) => {
+        if (expandedRow === idx) {
+            setExpandedRow(null);
+            return;
+        }
+        setExpandedRow(idx);
+        // Detalhes completos pedidos apenas na primeira abertura
+        const id = proc.id as string;
+        if (!(id in details)) {
+            fetch(`data/web/detalhes/${id}.json?v=${indexRef.current.versao}`)
+                .then(response => {
+                    if (!response.ok) throw new Error('Detalhes não encontrados');
+                    return response.json();
+                })
+                .then(data => setDetails(prev => ({ ...prev, [id]: data })))
+                .catch(err => {
+                    console.error(err);
+                    setDetails(prev => ({ ...prev, [id]: null }));
+                });
+        }
+    };
 
     const handleApplySeed = (code?: string) => {
         const targetCode = (code || seedSearchTerm).toUpperCase();
@@ -352,13 +529,13 @@ export default function PortalPage() {
                                                     <div className="text-[10px] text-slate-500 line-clamp-1">{proc.descricao || proc.designacao_contrato}</div>
                                                 </td>
                                                 <td className="numeric-cell text-slate-400">{proc.nipc || '--'}</td>
-                                                <td className="numeric-cell text-slate-500">{extractPublicationDate(proc.detalhes_completos)}</td>
+                                                <td className="numeric-cell text-slate-500">{extractPublicationDate(proc.publicacao)}</td>
                                                 <td className="accent-text numeric-cell">{proc.preco_base || '--'}</td>
                                                 <td className="numeric-cell text-rose-500/80 font-bold">{proc.prazo_apresentacao_propostas?.split(' ')[0] || '--'}</td>
                                                 <td className="text-right">
                                                     <button
                                                         className="expand-row-btn"
-                                                        onClick={() => setExpandedRow(expandedRow === idx ? null : idx)}
+                                                        onClick={() => toggleRow(idx, proc)}
                                                     >
                                                         {expandedRow === idx ? '▲' : '▼'}
                                                     </button>
@@ -367,39 +544,13 @@ export default function PortalPage() {
                                             {expandedRow === idx && (
                                                 <tr>
                                                     <td colSpan={7} className="details-panel">
-                                                        <div className="grid grid-cols-1 md:grid-cols-3 gap-8">
-                                                            <div className="detail-subgroup">
-                                                                <div className="detail-title">Informação Adicional</div>
-                                                                <div className="space-y-3">
-                                                                    <div><span className="detail-label">NIPC</span><div className="detail-value">{proc.nipc || '--'}</div></div>
-                                                                    <div><span className="detail-label">Localização</span><div className="detail-value">{proc.concelho}, {proc.distrito}</div></div>
-                                                                    <div><span className="detail-label">Freguesia</span><div className="detail-value">{proc.freguesia || '--'}</div></div>
-                                                                    <div><span className="detail-label">N.º Procedimento</span><div className="detail-value">{proc.numero_procedimento}</div></div>
-                                                                </div>
-                                                            </div>
-                                                            <div className="detail-subgroup">
-                                                                <div className="detail-title">Execução e Fundos</div>
-                                                                <div className="space-y-3">
-                                                                    <div><span className="detail-label">Prazo de Execução</span><div className="detail-value">{proc.prazo_execucao}</div></div>
-                                                                    <div><span className="detail-label">Fundos Comunitários</span><div className="detail-value">{proc.fundos_eu}</div></div>
-                                                                    {(proc.site || proc.email) && (
-                                                                        <div>
-                                                                            <span className="detail-label">Contactos</span>
-                                                                            <div className="detail-value text-[10px] break-all">
-                                                                                {proc.site && <div className="text-blue-400">{proc.site}</div>}
-                                                                                {proc.email && <div className="text-blue-400">{proc.email}</div>}
-                                                                            </div>
-                                                                        </div>
-                                                                    )}
-                                                                </div>
-                                                            </div>
-                                                            <div className="detail-subgroup items-center flex flex-col gap-4">
-                                                                <a href={proc.link} target="_blank" className="pro-btn-primary w-full text-center py-4">Ver Anúncio Oficial (DRE)</a>
-                                                                {proc.url_procedimento && (
-                                                                    <a href={proc.url_procedimento} target="_blank" className="pro-btn-secondary w-full text-center py-4 border-amber-500/30 text-amber-500 hover:bg-amber-500 hover:text-black">Aceder ao Procedimento</a>
-                                                                )}
+                                                        {details[proc.id as string] ? (
+                                                            <DetailsPanel proc={details[proc.id as string] as Procedimento} />
+                                                        ) : (
+                                                            <div className="text-center text-slate-600 text-xs">
+                                                                {details[proc.id as string] === null ? 'Não foi possível carregar os detalhes.' : 'A carregar detalhes...'}
                                                             </div>
-                                                        </div>
+                                                        )}
                                                     </td>
                                                 </tr>
                                             )}
@@ -0,0 +1,44 @@
+"""
+Pesquisa de texto livre no arquivo (arquivo_procedimentos.build_match_query e ProcedureArchive.search).
+"""
+
+import pytest
+
+from arquivo_procedimentos import ProcedureArchive, build_match_query
+
+
+def proc(n: int, designacao: str) -> dict:
+    return {'link': f'https://diariodarepublica.pt/dr/detalhe/contrato-publico/{n}-1',
+            'entidade': 'Município de Braga', 'designacao_contrato': designacao}
+
+
+def test_termos_e_operadores():
+    assert build_match_query('contentores lixo') == '"contentor" "lixo"'
+    assert build_match_query('lixo OR ecoilha') == '"lixo" OR "ecoilh"'
+    assert build_match_query('lixo NOT ecoilha') == '"lixo" NOT "ecoilh"'
+    assert build_match_query('lixo AND NOT ecoilha') == '"lixo" NOT "ecoilh"'
+    assert build_match_query('entidade:lisboa limpez*') == 'entidade : "lisbo" "limpez"*'
+
+
+def test_not_no_fim_e_ignorado():
+    # Não há nada a excluir: a pesquisa fica só com o termo
+    assert build_match_query('lixo NOT') == '"lixo"'
+
+
+def test_not_no_inicio_e_rejeitado():
+    # Ignorar o NOT devolveria exatamente os registos que se queria excluir
+    with pytest.raises(ValueError):
+        build_match_query('NOT lixo')
+    with pytest.raises(ValueError):
+        build_match_query('lixo OR NOT ecoilha')
+
+
+def test_pesquisa_com_not(tmp_path):
+    archive = ProcedureArchive(str(tmp_path / 'arquivo.sqlite'))
+    archive.add_snapshot([proc(1, 'Recolha de lixo urbano'), proc(2, 'Ecoilhas para recolha de lixo')],
+                         '2026-01-01')
+
+    assert [r['link'] for r in archive.search('lixo NOT ecoilhas')] == [proc(1, '')['link']]
+    with pytest.raises(ValueError):
+        archive.search('NOT ecoilhas')
+    archive.close()
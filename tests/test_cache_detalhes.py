@@ -0,0 +1,54 @@
+"""
+Cache de detalhes (cache_detalhes.DetailCache): TTL contado desde a criação e limpeza do ficheiro.
+"""
+
+import time
+
+from cache_detalhes import DetailCache
+
+
+def proc(n: int, **extra) -> dict:
+    return {'link': f'https://diariodarepublica.pt/dr/detalhe/contrato-publico/{n}-1',
+            'detalhes_completos': {'descricao': f'Procedimento {n}'}, **extra}
+
+
+def created(cache: DetailCache, n: int) -> float:
+    return cache.conn.execute("SELECT criado FROM detalhes WHERE chave = ?",
+                              (f'contrato-publico/{n}-1',)).fetchone()[0]
+
+
+def test_put_sem_replace_mantem_a_data_de_criacao(tmp_path):
+    cache = DetailCache(str(tmp_path / 'cache.sqlite'), ttl_days=1)
+    old = time.time() - 2 * 86400
+    cache.put(proc(1), created=old)
+
+    # Um procedimento reaproveitado do ficheiro anterior não renova a entrada...
+    cache.put(proc(1, titulo='novo'), replace=False)
+    assert created(cache, 1) == old
+    assert cache.get(proc(1)['link']) is None  # ...por isso expira na mesma
+
+    cache.put(proc(2), replace=False)
+    assert cache.get(proc(2)['link'])['link'] == proc(2)['link']
+    assert cache.stats['escritas'] == 2
+    cache.close()
+
+
+def test_evict_so_compacta_com_espaco_livre_suficiente(tmp_path):
+    path = tmp_path / 'cache.sqlite'
+    cache = DetailCache(str(path), ttl_days=1, vacuum_free=0.25)
+    old = time.time() - 2 * 86400
+    filler = 'x' * 2000
+    for n in range(100):
+        cache.put(proc(n, texto=filler), created=old if n < 5 else None)
+    cache.conn.commit()
+
+    # Poucas entradas expiradas: as páginas ficam livres para reutilizar, sem reescrever o ficheiro
+    assert cache.evict() == 5
+    assert cache.free_fraction() > 0
+    size = path.stat().st_size
+
+    cache.conn.execute("UPDATE detalhes SET criado = ? WHERE chave NOT IN (SELECT chave FROM detalhes LIMIT 10)", (old,))
+    assert cache.evict() == 85
+    assert cache.free_fraction() == 0
+    assert path.stat().st_size < size / 2
+    cache.close()
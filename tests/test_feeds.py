@@ -0,0 +1,156 @@
+"""
+Leitura condicional dos feeds (feeds_dre.py) contra um servidor HTTP local arrancado no próprio
+processo: 304 com ETag, deteção pelo hash sem validadores, falhas, e o pipeline a terminar logo
+após os pedidos quando nenhum feed mudou.
+"""
+
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import feeds_dre
+import rss_dre_extractor
+from feeds_dre import CHANGED, FAILED, UNCHANGED, fetch_conditional, poll_feeds, save_feed_state
+
+FEED = """<?xml version="1.0" encoding="UTF-8"?>
+<rss version="2.0"><channel><title>DRE</title>
+<item><title>Anúncio de procedimento n.º 4064/2026</title>
+<link>https://diariodarepublica.pt/dr/detalhe/contrato-publico/4064-1055036123</link></item>
+</channel></rss>
+"""
+
+
+class FeedHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        body, validators = server.feeds.get(self.path, (None, False))
+        if body is None or server.fail:
+            status = 404 if body is None else 500
+            server.log.append((self.path, status))
+            self.send_error(status)
+            return
+        etag = '"' + hashlib.sha1(body.encode('utf-8')).hexdigest() + '"'
+        if validators and self.headers.get('If-None-Match') == etag:
+            server.log.append((self.path, 304))
+            self.send_response(304)
+            self.end_headers()
+            return
+        data = body.encode('utf-8')
+        server.log.append((self.path, 200))
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/rss+xml; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        if validators:
+            self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def feed_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FeedHandler)
+    server.feeds = {'/a.xml': (FEED, True), '/b.xml': (FEED.replace('4064', '4065'), False)}
+    server.fail = False
+    server.log = []
+    server.url = lambda path: f"http://127.0.0.1:{server.server_address[1]}{path}"
+    threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def project_dir(tmp_path, monkeypatch):
+    # Estado e conteúdo dos feeds em data/cache/ de uma raiz de projeto temporária
+    (tmp_path / 'data').mkdir()
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def test_304_reutiliza_o_conteudo_em_cache(feed_server):
+    url = feed_server.url('/a.xml')
+    first = fetch_conditional(url, None)
+    assert first['estado'] == CHANGED and first['entrada']['etag']
+
+    second = fetch_conditional(url, first['entrada'])
+    assert second['estado'] == UNCHANGED
+    assert second['conteudo'] == FEED
+    assert feed_server.log == [('/a.xml', 200), ('/a.xml', 304)]
+
+
+def test_sem_validadores_deteta_conteudo_igual_pelo_hash(feed_server):
+    url = feed_server.url('/b.xml')
+    first = fetch_conditional(url, None)
+    second = fetch_conditional(url, first['entrada'])
+
+    assert second['estado'] == UNCHANGED
+    assert feed_server.log == [('/b.xml', 200), ('/b.xml', 200)]
+
+    feed_server.feeds['/b.xml'] = (FEED.replace('4064', '4066'), False)
+    assert fetch_conditional(url, second['entrada'])['estado'] == CHANGED
+
+
+def test_falha_mantem_o_estado_anterior(feed_server):
+    urls = [feed_server.url('/a.xml'), feed_server.url('/b.xml')]
+    _, state = poll_feeds(urls, {})
+
+    feed_server.fail = True
+    results, new_state = poll_feeds(urls, state)
+
+    assert [r['estado'] for r in results] == [FAILED, FAILED]
+    assert all(r['conteudo'] is not None for r in results)
+    assert new_state == state
+
+
+def test_pipeline_termina_se_nenhum_feed_mudou(feed_server, project_dir, monkeypatch):
+    monkeypatch.setattr(feeds_dre, 'DRE_FEEDS', ','.join(feed_server.url(p) for p in ('/a.xml', '/b.xml')))
+    # Uma execução anterior deixou os validadores gravados
+    results, state = poll_feeds()
+    assert {r['estado'] for r in results} == {CHANGED}
+    save_feed_state(state)
+
+    summary = rss_dre_extractor.main()
+
+    assert summary == {'feeds_alterados': 0}
+    assert sorted(feed_server.log[-2:]) == [('/a.xml', 304), ('/b.xml', 200)]
+    # Nada foi extraído nem escrito além do relatório da execução
+    assert not (project_dir / 'RSS').exists()
+    assert sorted(p.name for p in (project_dir / 'data').iterdir()) == ['cache', 'relatorios']
+
+
+def test_daemon_desliga_a_perfilagem_em_cada_ciclo(feed_server, project_dir, monkeypatch):
+    import signal
+    import sys
+    import tracemalloc
+
+    import daemon_dre
+    import instrumentacao
+
+    monkeypatch.setattr(feeds_dre, 'DRE_FEEDS', ','.join(feed_server.url(p) for p in ('/a.xml', '/b.xml')))
+    monkeypatch.setattr(instrumentacao, 'DRE_PROFILE', 'cpu,mem')
+    _, state = poll_feeds()
+    save_feed_state(state)
+
+    # Estado da perfilagem no fim de cada ciclo (ciclos sem feeds alterados terminam cedo)
+    after_cycle = []
+    def run_pipeline(state):
+        summary = rss_dre_extractor.main(state)
+        after_cycle.append((summary, sys.getprofile(), tracemalloc.is_tracing()))
+        return summary
+    monkeypatch.setattr(daemon_dre, 'run_pipeline', run_pipeline)
+
+    # run_daemon instala os seus handlers de SIGTERM/SIGINT: repor os anteriores no fim
+    handlers = {signum: signal.getsignal(signum) for signum in (signal.SIGTERM, signal.SIGINT)}
+    try:
+        status = daemon_dre.run_daemon(interval=0, port=0, max_cycles=2)
+    finally:
+        for signum, handler in handlers.items():
+            signal.signal(signum, handler)
+
+    assert status.cycles == 2 and status.consecutive_failures == 0
+    assert after_cycle == [({'feeds_alterados': 0}, None, False)] * 2
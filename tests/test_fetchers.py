@@ -0,0 +1,162 @@
+"""
+Cadeia de fetchers das páginas de detalhe (HTTP simples primeiro, Selenium como fallback),
+testada offline com páginas do DRE guardadas em tests/fixtures/:
+
+    detalhe_renderizado.html   página com o bloco de detalhes no HTML (resolvida por HTTP)
+    detalhe_shell.html         só a estrutura da aplicação, sem o bloco (tem de escalar para o Selenium)
+"""
+
+import requests
+
+import rss_dre_extractor as extractor
+from conftest import read_fixture
+from rss_dre_extractor import FetcherChain, HttpFetcher, build_fetcher_chain
+
+RENDERIZADO = 'https://diariodarepublica.pt/dr/detalhe/contrato-publico/4064-1055036123'
+SHELL = 'https://diariodarepublica.pt/dr/detalhe/contrato-publico/4065-1055036124'
+EM_FALTA = 'https://diariodarepublica.pt/dr/detalhe/contrato-publico/4066-1055036125'
+
+PAGES = {RENDERIZADO: 'detalhe_renderizado.html', SHELL: 'detalhe_shell.html'}
+
+
+class StubResponse:
+    def __init__(self, status_code: int, text: str = ''):
+        self.status_code = status_code
+        self.text = text
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code}")
+
+
+class StubSession:
+    """Session que responde com as fixtures (404 para os restantes URLs)"""
+    def __init__(self):
+        self.requests = []
+
+    def get(self, url, timeout=None):
+        self.requests.append(url)
+        if url in PAGES:
+            return StubResponse(200, read_fixture(PAGES[url]))
+        return StubResponse(404)
+
+
+class StubSelenium:
+    """Fallback que devolve a página como o Chrome a renderizaria (o bloco de detalhes já presente)"""
+    name = 'selenium'
+
+    def __init__(self, resolve=(RENDERIZADO, SHELL)):
+        self.resolve = resolve
+        self.urls = []
+
+    def fetch(self, url):
+        self.urls.append(url)
+        if url not in self.resolve:
+            return None
+        return extractor.parse_procedure_html(read_fixture('detalhe_renderizado.html'))
+
+
+def http_fetcher(session: StubSession) -> HttpFetcher:
+    fetcher = HttpFetcher(1)
+    fetcher._local.session = session
+    return fetcher
+
+
+def test_http_resolve_pagina_com_bloco_de_detalhes():
+    session = StubSession()
+    selenium = StubSelenium()
+    chain = FetcherChain([http_fetcher(session), selenium])
+
+    details = chain.fetch(RENDERIZADO)
+
+    assert details['entidade'] == 'Banco de Portugal'
+    assert details['nipc'] == '500792771'
+    assert details['detalhes_completos'].startswith('1 - IDENTIFICAÇÃO E CONTACTOS DA ENTIDADE ADJUDICANTE')
+    assert selenium.urls == []
+    assert chain.counters == {'http': 1, 'selenium': 0, 'falhas': 0}
+
+
+def test_pagina_sem_bloco_escala_para_selenium():
+    session = StubSession()
+    selenium = StubSelenium()
+    chain = FetcherChain([http_fetcher(session), selenium])
+
+    # O "Identificação" do menu encontra um bloco, mas sem entidade o HTTP não conta como resolvido
+    assert extractor.fetch_procedure_details_http(session, SHELL) is None
+    details = chain.fetch(SHELL)
+
+    assert details['entidade'] == 'Banco de Portugal'
+    assert selenium.urls == [SHELL]
+    assert chain.counters == {'http': 0, 'selenium': 1, 'falhas': 0}
+
+
+def test_contadores_por_caminho():
+    session = StubSession()
+    selenium = StubSelenium()
+    chain = FetcherChain([http_fetcher(session), selenium])
+
+    for url in [RENDERIZADO, SHELL, RENDERIZADO, EM_FALTA, RENDERIZADO]:
+        chain.fetch(url)
+
+    assert chain.counters == {'http': 3, 'selenium': 1, 'falhas': 1}
+    assert session.requests.count(RENDERIZADO) == 3
+    # Só as páginas que o HTTP não resolveu chegaram ao Selenium
+    assert selenium.urls == [SHELL, EM_FALTA]
+
+
+class StubDriver:
+    def __init__(self):
+        self.page_source = read_fixture('detalhe_renderizado.html')
+
+    def get(self, url):
+        pass
+
+    def execute_script(self, script):
+        return extractor.TARGET_TEXTS[0]
+
+
+class StubHandle:
+    def __init__(self):
+        self.driver = StubDriver()
+        self.slot = 0
+        self.pages = 0
+
+
+class StubPool:
+    """Pool sem Chrome: regista quantos drivers foram pedidos ou pré-arrancados"""
+    size = 3
+
+    def __init__(self):
+        self.acquired = 0
+        self.warmed = []
+
+    def warm(self, n=None):
+        self.warmed.append(n)
+
+    def acquire(self):
+        self.acquired += 1
+        return StubHandle()
+
+    def page_done(self, handle):
+        handle.pages += 1
+
+    def release(self, handle):
+        pass
+
+
+def test_chrome_so_arranca_quando_o_http_nao_resolve():
+    pool = StubPool()
+    chain = build_fetcher_chain(pool, warm=pool.size)
+    chain.fetchers[0]._local.session = StubSession()
+
+    for _ in range(5):
+        assert chain.fetch(RENDERIZADO)
+    assert pool.acquired == 0
+    assert pool.warmed == []
+
+    assert chain.fetch(SHELL)
+    assert chain.fetch(SHELL)
+    assert pool.acquired == 2
+    # Os drivers dos restantes workers arrancam uma única vez, na primeira escalada
+    assert pool.warmed == [3]
+    assert chain.counters == {'http': 5, 'selenium': 2, 'falhas': 0}
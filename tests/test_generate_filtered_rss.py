@@ -0,0 +1,20 @@
+"""
+Nomes dos ficheiros por seed (generate_filtered_rss.seed_file_name), partilhados com scripts.js e page.tsx.
+"""
+
+from generate_filtered_rss import seed_file_name
+
+
+def test_codigos_simples_mantem_o_nome():
+    assert seed_file_name('LIMPEZA_urbana-2') == 'LIMPEZA_urbana-2'
+
+
+def test_codigos_diferentes_nao_partilham_ficheiro():
+    codes = ['A B', 'A_B', 'A/B', 'Água', 'agua', '_gua']
+    assert len({seed_file_name(code) for code in codes}) == len(codes)
+
+
+def test_hash_igual_ao_da_interface():
+    # Valores calculados com seedFileName (scripts.js / src/app/page.tsx)
+    assert seed_file_name('A B') == 'A_B-546d26b2'
+    assert seed_file_name('Água') == '_gua-d016b704'
@@ -0,0 +1,83 @@
+"""
+Índice de ativos (gerir_ativos.ActiveIndex): atualização no lugar e precedência por dia do ficheiro.
+"""
+
+import json
+from datetime import datetime, timedelta
+
+import gerir_ativos
+from gerir_ativos import ActiveIndex, merge_with_existing_ativos
+
+
+def proc(n: int, days_left: int, **extra) -> dict:
+    deadline = datetime.now() + timedelta(days=days_left)
+    return {
+        'link': f'https://diariodarepublica.pt/dr/detalhe/contrato-publico/{n}-1',
+        'prazo_apresentacao_propostas': deadline.strftime('%d-%m-%Y %H:%M'),
+        **extra,
+    }
+
+
+def test_merge_atualiza_o_indice_no_lugar(monkeypatch):
+    index = ActiveIndex.from_ativos([proc(i, 10) for i in range(50)])
+
+    parsed = []
+    original = gerir_ativos.procedure_deadline
+    monkeypatch.setattr(gerir_ativos, 'procedure_deadline', lambda p: parsed.append(p['link']) or original(p))
+
+    ativos = merge_with_existing_ativos([proc(100, 5), proc(3, 20)], index=index)
+
+    # Só os prazos dos procedimentos do dia são convertidos; os existentes já estão no índice
+    assert len(parsed) == 2
+    assert len(ativos) == 51 and len(index) == 51
+    assert index.deadline(proc(3, 0)['link']) > datetime.now() + timedelta(days=19)
+
+
+def test_expira_pela_frente_do_heap():
+    index = ActiveIndex.from_ativos([proc(1, 10), proc(2, 1), proc(3, 3)])
+    assert len(index.procedures(datetime.now() + timedelta(days=2))) == 2
+    assert proc(2, 0)['link'] not in index
+
+
+def test_ficheiro_antigo_nao_substitui_versao_mais_recente(tmp_path):
+    today = datetime.now().date()
+    old_day = today - timedelta(days=3)
+    new_day = today + timedelta(days=1)
+
+    index = ActiveIndex()
+    index.add(proc(1, 10, entidade='atual'))
+
+    old_file = tmp_path / f"{old_day.strftime('%d-%m-%Y')}.json"
+    old_file.write_text(json.dumps([proc(1, 30, entidade='antiga'), proc(2, 30, entidade='nova')]), encoding='utf-8')
+    assert index.add_date_file(str(old_file)) == 1
+    by_link = {p['link']: p for p in index.records()}
+    assert by_link[proc(1, 0)['link']]['entidade'] == 'atual'
+    assert by_link[proc(2, 0)['link']]['entidade'] == 'nova'
+
+    new_file = tmp_path / f"{new_day.strftime('%d-%m-%Y')}.json"
+    new_file.write_text(json.dumps([proc(1, 30, entidade='seguinte')]), encoding='utf-8')
+    assert index.add_date_file(str(new_file)) == 0
+    assert {p['link']: p for p in index.records()}[proc(1, 0)['link']]['entidade'] == 'seguinte'
+
+
+def test_load_usa_o_dia_guardado_e_nao_o_mtime(tmp_path, monkeypatch):
+    (tmp_path / 'data').mkdir()
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(gerir_ativos, 'write_web_index', lambda procs, data_dir: None)
+    today = datetime.now().date()
+
+    # ativos.json com dados de há 5 dias, acabado de sair de um checkout (mtime de hoje)
+    index = ActiveIndex.from_ativos([proc(1, 10, entidade='antiga')], (today - timedelta(days=5)).isoformat())
+    gerir_ativos.save_ativos(index.records(), index.latest_day())
+    assert ActiveIndex.load().latest_day() == (today - timedelta(days=5)).isoformat()
+
+    # Um ficheiro diário de há 2 dias é mais recente e substitui o registo
+    day_file = tmp_path / 'data' / f"{(today - timedelta(days=2)).strftime('%d-%m-%Y')}.json"
+    day_file.write_text(json.dumps([proc(1, 10, entidade='nova')]), encoding='utf-8')
+    index = ActiveIndex.load()
+    index.add_date_file(str(day_file))
+    assert index.records()[0]['entidade'] == 'nova'
+
+    # Sem ativos_estado.json (ficheiros anteriores) conta o último ficheiro diário
+    (tmp_path / 'data' / gerir_ativos.ATIVOS_STATE_FILENAME).unlink()
+    assert ActiveIndex.load().latest_day() == (today - timedelta(days=2)).isoformat()
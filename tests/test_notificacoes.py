@@ -0,0 +1,153 @@
+"""
+Envio dos resumos por email (notify_new_items.SMTPBatchSender) contra um servidor SMTP local
+arrancado no próprio processo: uma ligação por lote, novas tentativas nos erros 4xx e registo
+de notificações que impede reenvios.
+"""
+
+import socketserver
+import threading
+
+import pytest
+
+import notify_new_items as notify
+from notify_new_items import SMTPBatchSender, notify_new_items, send_digests
+from registo_notificacoes import NotificationLedger
+
+SEEDS = [{'code': 'SEEDLIMPEZA', 'name': 'Limpeza', 'tags': ['limpeza'], 'titleTags': [], 'district': None}]
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line: str):
+        self.wfile.write(f"{line}\r\n".encode('ascii'))
+
+    def handle(self):
+        server = self.server
+        with server.lock:
+            server.connections += 1
+        self.reply("220 localhost SMTP de teste")
+        recipients = []
+        while True:
+            line = self.rfile.readline().decode('utf-8', 'replace').strip()
+            if not line:
+                return
+            command = line.split(' ', 1)[0].upper()
+            if command == 'EHLO':
+                self.reply("250-localhost")
+                self.reply("250 8BITMIME")
+            elif command == 'RCPT':
+                address = line.split(':', 1)[1].strip().strip('<>')
+                with server.lock:
+                    queued = server.rcpt_replies.get(address)
+                    code = queued.pop(0) if queued else 250
+                if code == 250:
+                    recipients.append(address)
+                self.reply(f"{code} {'OK' if code == 250 else 'recusado'}")
+            elif command == 'DATA':
+                self.reply("354 fim com <CRLF>.<CRLF>")
+                while self.rfile.readline() not in (b'.\r\n', b''):
+                    pass
+                with server.lock:
+                    server.messages.extend(recipients)
+                recipients = []
+                self.reply("250 OK")
+            elif command == 'QUIT':
+                self.reply("221 adeus")
+                return
+            else:  # MAIL, RSET, NOOP, HELO
+                if command == 'RSET':
+                    recipients = []
+                self.reply("250 OK")
+
+
+class SMTPStandIn(socketserver.ThreadingTCPServer):
+    """Servidor SMTP mínimo: conta ligações e destinatários entregues; rcpt_replies força respostas ao RCPT"""
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), SMTPHandler)
+        self.lock = threading.Lock()
+        self.connections = 0
+        self.messages = []
+        self.rcpt_replies = {}
+
+
+@pytest.fixture
+def smtp_server():
+    server = SMTPStandIn()
+    threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def email_config(monkeypatch):
+    monkeypatch.setattr(notify, 'SMTP_USER', 'dre@localhost')
+    monkeypatch.setattr(notify, 'SMTP_ALLOW_NO_AUTH', True)
+    monkeypatch.setattr(notify, 'EMAIL_SUBSCRIPTIONS', 'ana@exemplo.pt; rui@exemplo.pt=SEEDLIMPEZA')
+    monkeypatch.setattr(notify, 'load_seeds', lambda: SEEDS)
+
+
+def make_sender(server: SMTPStandIn, **options) -> SMTPBatchSender:
+    options = {'password': None, 'allow_no_auth': True, 'interval': 0, 'retry_delay': 0.01, **options}
+    return SMTPBatchSender('127.0.0.1', server.server_address[1], user='dre@localhost', **options)
+
+
+def item(n: int, descricao: str = 'Prestação de serviços de limpeza') -> dict:
+    return {'link': f'https://diariodarepublica.pt/dr/detalhe/contrato-publico/{n}-1', 'descricao': descricao,
+            'entidade': 'Município de Exemplo'}
+
+
+def test_um_lote_usa_uma_ligacao(smtp_server):
+    digests = {f'destino{i}@exemplo.pt': [item(i)] for i in range(5)}
+
+    stats = send_digests(digests, make_sender(smtp_server))
+
+    assert stats['enviados'] == 5 and stats['falhados'] == 0
+    assert smtp_server.connections == 1
+    assert sorted(smtp_server.messages) == sorted(digests)
+
+
+def test_destinatario_recusado_com_4xx_e_repetido(smtp_server):
+    smtp_server.rcpt_replies['ana@exemplo.pt'] = [450]
+
+    stats = send_digests({'ana@exemplo.pt': [item(1)]}, make_sender(smtp_server))
+
+    assert stats['enviados'] == 1 and stats['repeticoes'] == 1
+    assert smtp_server.messages == ['ana@exemplo.pt']
+
+
+def test_destinatario_recusado_com_5xx_so_falha_esse(smtp_server):
+    smtp_server.rcpt_replies['ana@exemplo.pt'] = [550]
+
+    stats = send_digests({'ana@exemplo.pt': [item(1)], 'rui@exemplo.pt': [item(1)]}, make_sender(smtp_server))
+
+    assert stats['enviados'] == 1 and stats['falhados'] == 1 and stats['repeticoes'] == 0
+    assert smtp_server.messages == ['rui@exemplo.pt']
+    assert smtp_server.connections == 1
+
+
+def test_sem_palavra_passe_nao_envia(smtp_server):
+    stats = send_digests({'ana@exemplo.pt': [item(1)]}, make_sender(smtp_server, allow_no_auth=False))
+
+    assert stats['enviados'] == 0 and stats['falhados'] == 1
+    assert smtp_server.connections == 0
+
+
+def test_registo_impede_reenvios(smtp_server, tmp_path):
+    ledger = NotificationLedger(str(tmp_path / 'notificacoes.sqlite'))
+    try:
+        current = [item(1), item(2, 'Aquisição de software')]
+        notify_new_items(current, [], ledger, make_sender(smtp_server))
+        # Só o procedimento de limpeza corresponde à seed: um email por destinatário
+        assert sorted(smtp_server.messages) == ['ana@exemplo.pt', 'rui@exemplo.pt']
+
+        notify_new_items(current, current, ledger, make_sender(smtp_server))
+        assert len(smtp_server.messages) == 2
+
+        notify_new_items(current + [item(3)], current, ledger, make_sender(smtp_server))
+        assert len(smtp_server.messages) == 4
+        assert smtp_server.connections == 2
+    finally:
+        ledger.close()
@@ -0,0 +1,37 @@
+"""
+Snapshots diários em delta (snapshots.SnapshotStore): completo → delta → load devolve exatamente o dia.
+"""
+
+import json
+
+from snapshots import SnapshotStore, apply_delta, build_delta
+
+
+def proc(n: int, **extra) -> dict:
+    return {'link': f'https://diariodarepublica.pt/dr/detalhe/contrato-publico/{n}-1',
+            'descricao': f'Procedimento {n}', **extra}
+
+
+def test_delta_preserva_links_repetidos():
+    previous = [proc(1), proc(2), proc(1, preco='10')]
+    current = [proc(1), proc(1, preco='12'), proc(2), proc(1, preco='10'), {'descricao': 'sem link'}]
+
+    delta = build_delta(previous, current, '01-01-2026')
+
+    assert apply_delta(previous, delta) == current
+    assert len(delta['chaves']) == len(set(delta['chaves'])) == len(current)
+
+
+def test_completo_delta_load_com_links_repetidos(tmp_path):
+    store = SnapshotStore(str(tmp_path), keyframe=7, max_delta=1.0)
+    day1 = [proc(i) for i in range(20)] + [proc(3, preco='5')]
+    day2 = day1 + [proc(3, preco='7'), proc(20)]
+
+    assert store.save(day1, '01-01-2026')['tipo'] == 'completo'
+    assert store.save(day2, '02-01-2026')['tipo'] == 'delta'
+
+    # Um SnapshotStore novo não tem cache: o dia é reconstruído a partir do ficheiro
+    reloaded = SnapshotStore(str(tmp_path))
+    assert reloaded.load('02-01-2026') == day2
+    with open(tmp_path / '02-01-2026.delta.json', encoding='utf-8') as f:
+        assert len(json.load(f)['registos']) == 2